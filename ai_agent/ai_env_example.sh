@@ -5,6 +5,10 @@ OLLAMA_BASE_URL=http://localhost:11434
 OLLAMA_MODEL=llama3.2
 OLLAMA_TIMEOUT=120
 OLLAMA_MAX_RETRIES=3
+# How long Ollama keeps the model and its cached prompt prefix loaded between requests
+OLLAMA_KEEP_ALIVE=30m
+# Context window (tokens); chat history is trimmed to fit alongside the response budget
+OLLAMA_NUM_CTX=4096
 
 # Service Configuration
 AI_AGENT_HOST=0.0.0.0
@@ -16,6 +20,10 @@ AI_AGENT_DEBUG=false
 SESSION_TIMEOUT=3600
 MAX_SESSIONS=1000
 CLEANUP_INTERVAL=300
+# Session backend: "memory" (per-replica LRU) or "redis" (shared across replicas, uses REDIS_URL)
+SESSION_STORE=memory
+# Messages retained per session
+SESSION_MAX_MESSAGES=100
 
 # Logging Configuration
 LOG_LEVEL=INFO
@@ -42,12 +50,17 @@ CORS_ORIGINS=http://localhost:3000,http://localhost:8000
 
 # Performance Tuning
 RESPONSE_CACHE_TTL=300
+# Per-user business metrics context cache (seconds); refreshed in the background
+# once an entry is older than CONTEXT_CACHE_TTL * CONTEXT_REFRESH_AHEAD.
+CONTEXT_CACHE_TTL=300
+CONTEXT_REFRESH_AHEAD=0.8
 MAX_RESPONSE_LENGTH=4000
 CONCURRENT_REQUESTS_LIMIT=100
 
 # Model Configuration
 DEFAULT_TEMPERATURE=0.7
 DEFAULT_MAX_TOKENS=2000
+# Maximum history messages sent per request (further trimmed by token budget)
 CONTEXT_WINDOW_SIZE=10
 ENABLE_STREAMING=true
 
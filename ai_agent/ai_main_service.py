@@ -15,6 +15,7 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 
 from llama_service.ai_handlers import AIAgentHandler
+from llama_service.context_provider import ContextProvider
 from llama_service.llama_service import OllamaClient, DEFAULT_CONFIG
 
 # --- Setup ---
@@ -45,9 +46,21 @@ async def lifespan(app: FastAPI):
     logger.info("Starting AI Agent service...")
     async with OllamaClient(
         base_url=os.getenv("OLLAMA_BASE_URL", DEFAULT_CONFIG["ollama_base_url"]),
-        model_name=os.getenv("OLLAMA_MODEL", DEFAULT_CONFIG["model_name"])
+        model_name=os.getenv("OLLAMA_MODEL", DEFAULT_CONFIG["model_name"]),
+        keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", DEFAULT_CONFIG["keep_alive"]),
+        num_ctx=int(os.getenv("OLLAMA_NUM_CTX", DEFAULT_CONFIG["num_ctx"])),
+        max_history_messages=int(os.getenv("CONTEXT_WINDOW_SIZE", DEFAULT_CONFIG["context_window_size"]))
     ) as client:
-        ai_handler = AIAgentHandler(ollama_client=client)
+        ai_handler = AIAgentHandler(
+            ollama_client=client,
+            session_timeout=int(os.getenv("SESSION_TIMEOUT", DEFAULT_CONFIG["session_timeout"])),
+            max_sessions=int(os.getenv("MAX_SESSIONS", DEFAULT_CONFIG["max_sessions"])),
+            cleanup_interval=int(os.getenv("CLEANUP_INTERVAL", "300")),
+            context_provider=ContextProvider(
+                ttl=float(os.getenv("CONTEXT_CACHE_TTL", "300")),
+                refresh_ahead=float(os.getenv("CONTEXT_REFRESH_AHEAD", "0.8"))
+            )
+        )
         await ai_handler.start()
         yield
     logger.info("Shutting down AI Agent service...")
@@ -73,7 +86,7 @@ async def create_session(req: SessionRequest, handler: AIAgentHandler = Depends(
 
 @app.get("/sessions/{session_id}/history")
 async def get_session_history(session_id: str, handler: AIAgentHandler = Depends(get_ai_handler)):
-    session = handler.get_chat_session(session_id)
+    session = await handler.get_chat_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     return {"history": [{"role": msg.role, "content": msg.content} for msg in session.messages]}
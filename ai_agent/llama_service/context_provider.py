@@ -0,0 +1,124 @@
+"""
+Financial context provider for the AI agent.
+
+Fetches business metrics from the backend through one pooled aiohttp session and
+caches the resulting FinanceContext per user, so every chat session of a user
+shares one entry. Concurrent misses for the same user are coalesced into a single
+request, and entries close to expiry are refreshed in the background while the
+cached value keeps being served.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+from llama_service.llama_service import FinanceContext
+
+logger = logging.getLogger(__name__)
+
+BACKEND_API_URL = os.getenv("BACKEND_API_URL", "http://backend:8000/api/v1")
+
+
+class ContextProvider:
+    def __init__(
+        self,
+        base_url: str = BACKEND_API_URL,
+        ttl: float = 300,
+        refresh_ahead: float = 0.8,
+        max_entries: int = 5000,
+        timeout: float = 10,
+        pool_size: int = 20
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+        # Entries older than ttl * refresh_ahead are served but refreshed in the background.
+        self.refresh_after = ttl * refresh_ahead
+        self.max_entries = max_entries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.pool_size = pool_size
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._cache: "OrderedDict[str, Tuple[float, FinanceContext]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(timeout=self.timeout, connector=connector)
+
+    async def close(self):
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def get(self, user_id: str) -> Optional[FinanceContext]:
+        """Return the user's context, fetching it only on a miss or after expiry."""
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            fetched_at, context = cached
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                self._cache.move_to_end(user_id)
+                if age >= self.refresh_after:
+                    self._fetch_coalesced(user_id)
+                return context
+
+        try:
+            # Shield so one cancelled caller doesn't cancel the fetch others are waiting on.
+            return await asyncio.shield(self._fetch_coalesced(user_id))
+        except Exception as e:
+            logger.error(f"Context fetch error for user {user_id}: {e}", exc_info=True)
+            # Serve the stale entry rather than nothing if the backend is unavailable.
+            return cached[1] if cached else None
+
+    def invalidate(self, user_id: str):
+        self._cache.pop(user_id, None)
+
+    def _fetch_coalesced(self, user_id: str) -> asyncio.Task:
+        """Start a fetch for user_id unless one is already running, and return it."""
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch(user_id))
+            self._inflight[user_id] = task
+            task.add_done_callback(lambda t, uid=user_id: self._on_fetch_done(uid, t))
+        return task
+
+    def _on_fetch_done(self, user_id: str, task: asyncio.Task):
+        self._inflight.pop(user_id, None)
+        # Retrieve background refresh failures so they don't surface as "never retrieved".
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Context refresh failed for user {user_id}: {task.exception()}")
+
+    async def _fetch(self, user_id: str) -> Optional[FinanceContext]:
+        await self.start()
+        api_url = f"{self.base_url}/metrics/business_metrics"
+        async with self.session.get(api_url, params={"user_id": user_id, "limit": 1}) as response:
+            if response.status != 200:
+                raise RuntimeError(f"metrics request returned status {response.status}")
+            data = await response.json()
+
+        metrics = data[0] if data else {}
+        context = FinanceContext(
+            revenue_data={"total": metrics.get("monthly_revenue", 0)},
+            expense_data={"total": metrics.get("monthly_expenses", 0)},
+            cash_flow={"avg_transaction": metrics.get("avg_order_value", 0)},
+            trends={"profit_margin": metrics.get("profit_margin", 0)},
+            kpis={
+                "credit_score": metrics.get("credit_score", "N/A"),
+                "customer_count": metrics.get("customer_count", 0)
+            },
+            user_profile={"business_name": "Your Business"} # Placeholder
+        )
+        self._cache[user_id] = (time.monotonic(), context)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        logger.info(f"Fetched context for user {user_id}.")
+        return context
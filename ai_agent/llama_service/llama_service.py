@@ -4,7 +4,6 @@ Handles communication with Ollama service for generating context-aware responses
 """
 
 import asyncio
-import json
 import logging
 import aiohttp
 from typing import Dict, List, Optional, Any
@@ -13,6 +12,8 @@ from datetime import datetime
 import os
 from pathlib import Path
 
+from llama_service.prompt_builder import PromptBuilder
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_CONFIG = {
@@ -23,10 +24,13 @@ DEFAULT_CONFIG = {
     "startup_delay": 3,
     "timeout": 60,
     "session_timeout": 3600,
-    "max_sessions": 1000
+    "max_sessions": 1000,
+    "keep_alive": "30m",
+    "num_ctx": 4096,
+    "context_window_size": 10
 }
 
-@dataclass
+@dataclass(slots=True)
 class ChatMessage:
     """Represents a chat message with role and content."""
     role: str
@@ -56,7 +60,10 @@ class OllamaClient:
         max_retries: int = 3,
         timeout: int = 120,
         startup_retries: int = 5,
-        startup_delay: int = 3
+        startup_delay: int = 3,
+        keep_alive: str = DEFAULT_CONFIG["keep_alive"],
+        num_ctx: int = DEFAULT_CONFIG["num_ctx"],
+        max_history_messages: int = DEFAULT_CONFIG["context_window_size"]
     ):
         self.base_url = base_url.rstrip('/')
         self.model_name = model_name
@@ -69,6 +76,12 @@ class OllamaClient:
         
         self.prompts_dir = Path(__file__).parent / "prompts"
         self.system_prompts = self._load_system_prompts()
+        # keep_alive holds the model (and its cached prompt prefix) in memory between requests.
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        self.prompt_builder = PromptBuilder(
+            self.system_prompts, num_ctx=num_ctx, max_history_messages=max_history_messages
+        )
         
     async def __aenter__(self):
         """Async context manager entry, now more resilient."""
@@ -146,12 +159,7 @@ class OllamaClient:
             return "I'm sorry, but I'm currently unable to connect to my core AI service. Please try again later."
         
         try:
-            system_message = self._build_system_message(context)
-            
-            # Convert ChatMessage objects to dictionaries for the API call, excluding timestamp
-            dict_messages = [{"role": msg.role, "content": msg.content} for msg in messages]
-
-            formatted_messages = [{"role": "system", "content": system_message}] + dict_messages
+            formatted_messages = self.prompt_builder.build(messages, context, max_tokens=max_tokens)
             
             payload = {
                 "model": self.model_name,
@@ -159,7 +167,9 @@ class OllamaClient:
                 "options": {
                     "temperature": temperature,
                     "num_predict": max_tokens,
+                    "num_ctx": self.num_ctx,
                 },
+                "keep_alive": self.keep_alive,
                 "stream": stream
             }
             
@@ -177,30 +187,4 @@ class OllamaClient:
 
     def _build_system_message(self, context: Optional[FinanceContext] = None) -> str:
         """Builds the system prompt based on whether financial context is available."""
-        
-        base_prompt = self.system_prompts.get('finance_insights_prompt', "You are a helpful assistant.")
-
-        if not context:
-            return (
-                f"{base_prompt} "
-                "You do not have financial data. Inform the user you are waiting for data."
-            )
-
-        stats = {
-            "business": context.user_profile.get("business_name", "the business"),
-            "total_revenue_zmw": context.revenue_data.get("total"),
-            "transaction_count": context.expense_data.get("total"),
-            "avg_sale_zmw": context.cash_flow.get("avg_transaction"),
-            "credit_score": context.kpis.get("credit_score", "N/A")
-        }
-
-        valid_stats = {k: v for k, v in stats.items() if v is not None}
-        
-        context_prompt = (
-            "Use ONLY the following real-time data to answer questions. Do not invent values.\n"
-            f"DATABASE_VALUES: {json.dumps(valid_stats)}"
-        )
-
-        rules = self.system_prompts.get('analytics_questions_prompt', "Be accurate.")
-
-        return f"""{base_prompt}\n{context_prompt}\n\n{rules}\n"""
+        return self.prompt_builder.system_message(context)
@@ -0,0 +1,103 @@
+"""
+Prompt assembly for OllamaClient.
+
+The system message is laid out static-first: the file-loaded instructions are
+joined once and always lead the prompt, followed by the per-user data block.
+Keeping that prefix byte-identical across requests lets Ollama reuse its KV cache
+for it (together with keep_alive), so only the data block and new turns need
+evaluating. Chat history is trimmed newest-first to fit a token budget.
+"""
+
+import json
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:  # llama_service imports this module
+    from llama_service.llama_service import ChatMessage, FinanceContext
+
+# Rough average for English text with LLaMA-family tokenizers.
+CHARS_PER_TOKEN = 4
+# Role markers and separators the chat template adds around each message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class PromptBuilder:
+    def __init__(
+        self,
+        system_prompts: Dict[str, str],
+        num_ctx: int = 4096,
+        max_history_messages: int = 10,
+        context_cache_size: int = 256
+    ):
+        self.num_ctx = num_ctx
+        self.max_history_messages = max_history_messages
+        self.context_cache_size = context_cache_size
+
+        base_prompt = system_prompts.get('finance_insights_prompt', "You are a helpful assistant.")
+        rules = system_prompts.get('analytics_questions_prompt', "Be accurate.")
+        self.static_prefix = f"{base_prompt}\n\n{rules}\n"
+        self._no_context_message = (
+            f"{self.static_prefix}\n"
+            "You do not have financial data. Inform the user you are waiting for data."
+        )
+        # Keyed by id(context); the context is kept in the value so its id cannot be reused.
+        self._system_cache: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def system_message(self, context: Optional["FinanceContext"] = None) -> str:
+        if not context:
+            return self._no_context_message
+
+        cached = self._system_cache.get(id(context))
+        if cached is not None and cached[0] is context:
+            self._system_cache.move_to_end(id(context))
+            return cached[1]
+
+        stats = {
+            "business": context.user_profile.get("business_name", "the business"),
+            "total_revenue_zmw": context.revenue_data.get("total"),
+            "transaction_count": context.expense_data.get("total"),
+            "avg_sale_zmw": context.cash_flow.get("avg_transaction"),
+            "credit_score": context.kpis.get("credit_score", "N/A")
+        }
+        valid_stats = {k: v for k, v in stats.items() if v is not None}
+        message = (
+            f"{self.static_prefix}\n"
+            "Use ONLY the following real-time data to answer questions. Do not invent values.\n"
+            f"DATABASE_VALUES: {json.dumps(valid_stats)}\n"
+        )
+
+        self._system_cache[id(context)] = (context, message)
+        if len(self._system_cache) > self.context_cache_size:
+            self._system_cache.popitem(last=False)
+        return message
+
+    def trim_history(self, messages: List["ChatMessage"], budget_tokens: int) -> List["ChatMessage"]:
+        """Keep the newest messages that fit in budget_tokens; the latest is always kept."""
+        kept: List["ChatMessage"] = []
+        used = 0
+        for msg in reversed(messages[-self.max_history_messages:]):
+            cost = estimate_tokens(msg.content) + MESSAGE_OVERHEAD_TOKENS
+            if kept and used + cost > budget_tokens:
+                break
+            kept.append(msg)
+            used += cost
+        kept.reverse()
+        return kept
+
+    def build(
+        self,
+        messages: List["ChatMessage"],
+        context: Optional["FinanceContext"] = None,
+        max_tokens: int = 2000
+    ) -> List[Dict[str, str]]:
+        """Return the Ollama /api/chat message list within num_ctx minus the response budget."""
+        system_message = self.system_message(context)
+        budget = self.num_ctx - max_tokens - estimate_tokens(system_message) - MESSAGE_OVERHEAD_TOKENS
+        history = self.trim_history(messages, max(budget, 0))
+        return [{"role": "system", "content": system_message}] + [
+            {"role": msg.role, "content": msg.content} for msg in history
+        ]
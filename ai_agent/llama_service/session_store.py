@@ -0,0 +1,190 @@
+"""
+Chat session storage for the AI agent.
+
+Two backends share the same async interface:
+ - InMemorySessionStore: per-process LRU bounded by max_sessions, with idle-timeout eviction.
+ - RedisSessionStore: sessions serialized to Redis with a sliding TTL, so any agent
+   replica behind a load balancer can serve any session.
+
+Select the backend with SESSION_STORE=memory|redis (see create_session_store).
+"""
+
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from llama_service.llama_service import ChatMessage, FinanceContext
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class ChatSession:
+    session_id: str
+    user_id: str
+    messages: List[ChatMessage] = field(default_factory=list)
+    context: Optional[FinanceContext] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    last_activity: datetime = field(default_factory=datetime.utcnow)
+    preferences: Dict[str, Any] = field(default_factory=dict)
+
+    def touch(self) -> None:
+        self.last_activity = datetime.utcnow()
+
+    def idle_seconds(self, now: Optional[datetime] = None) -> float:
+        return ((now or datetime.utcnow()) - self.last_activity).total_seconds()
+
+
+def _session_to_json(session: ChatSession, max_messages: int) -> str:
+    return json.dumps({
+        "session_id": session.session_id,
+        "user_id": session.user_id,
+        "messages": [
+            [m.role, m.content, m.timestamp.isoformat() if m.timestamp else None]
+            for m in session.messages[-max_messages:]
+        ],
+        "context": asdict(session.context) if session.context else None,
+        "created_at": session.created_at.isoformat(),
+        "last_activity": session.last_activity.isoformat(),
+        "preferences": session.preferences,
+    }, separators=(",", ":"), default=str)
+
+
+def _session_from_json(raw: str) -> ChatSession:
+    data = json.loads(raw)
+    return ChatSession(
+        session_id=data["session_id"],
+        user_id=data["user_id"],
+        messages=[
+            ChatMessage(role=role, content=content, timestamp=datetime.fromisoformat(ts) if ts else None)
+            for role, content, ts in data.get("messages", [])
+        ],
+        context=FinanceContext(**data["context"]) if data.get("context") else None,
+        created_at=datetime.fromisoformat(data["created_at"]),
+        last_activity=datetime.fromisoformat(data["last_activity"]),
+        preferences=data.get("preferences") or {},
+    )
+
+
+class InMemorySessionStore:
+    """LRU session store; least recently used sessions are evicted past max_sessions."""
+
+    def __init__(self, session_timeout: int = 3600, max_sessions: int = 1000, max_messages: int = 100):
+        self.session_timeout = session_timeout
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+
+    async def get(self, session_id: str) -> Optional[ChatSession]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if session.idle_seconds() > self.session_timeout:
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    async def save(self, session: ChatSession) -> None:
+        if len(session.messages) > self.max_messages:
+            del session.messages[:-self.max_messages]
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, _ = self._sessions.popitem(last=False)
+            logger.debug(f"Evicted least recently used session {evicted_id}")
+
+    async def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    async def evict_expired(self) -> int:
+        """Drop idle sessions. The dict is in LRU order, so stop at the first live one."""
+        now = datetime.utcnow()
+        evicted = 0
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.idle_seconds(now) <= self.session_timeout:
+                break
+            del self._sessions[session_id]
+            evicted += 1
+        return evicted
+
+    async def count(self) -> int:
+        return len(self._sessions)
+
+    async def close(self) -> None:
+        self._sessions.clear()
+
+
+class RedisSessionStore:
+    """Redis-backed session store; the key TTL is the idle timeout and slides on every save."""
+
+    key_prefix = "ai_agent:session:"
+
+    def __init__(self, redis_url: str, session_timeout: int = 3600, max_messages: int = 100):
+        import redis.asyncio as aioredis
+
+        self.session_timeout = session_timeout
+        self.max_messages = max_messages
+        self._redis = aioredis.from_url(redis_url, decode_responses=True)
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}{session_id}"
+
+    async def get(self, session_id: str) -> Optional[ChatSession]:
+        raw = await self._redis.get(self._key(session_id))
+        if raw is None:
+            return None
+        try:
+            return _session_from_json(raw)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Discarding unreadable session {session_id}: {e}")
+            await self.delete(session_id)
+            return None
+
+    async def save(self, session: ChatSession) -> None:
+        await self._redis.set(
+            self._key(session.session_id),
+            _session_to_json(session, self.max_messages),
+            ex=self.session_timeout,
+        )
+
+    async def delete(self, session_id: str) -> None:
+        await self._redis.delete(self._key(session_id))
+
+    async def evict_expired(self) -> int:
+        # Redis expires idle sessions itself.
+        return 0
+
+    async def count(self) -> int:
+        count = 0
+        async for _ in self._redis.scan_iter(match=f"{self.key_prefix}*", count=500):
+            count += 1
+        return count
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+def create_session_store(session_timeout: int = 3600, max_sessions: int = 1000):
+    """Build the store selected by SESSION_STORE, falling back to memory if Redis is unavailable."""
+    backend = os.getenv("SESSION_STORE", "memory").lower()
+    max_messages = int(os.getenv("SESSION_MAX_MESSAGES", "100"))
+    if backend == "redis":
+        try:
+            store = RedisSessionStore(
+                redis_url=os.getenv("REDIS_URL", "redis://localhost:6379"),
+                session_timeout=session_timeout,
+                max_messages=max_messages,
+            )
+            logger.info("Using Redis session store")
+            return store
+        except ImportError:
+            logger.error("SESSION_STORE=redis but the redis package is not installed; using in-memory sessions.")
+    return InMemorySessionStore(
+        session_timeout=session_timeout, max_sessions=max_sessions, max_messages=max_messages
+    )
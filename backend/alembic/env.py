@@ -24,6 +24,7 @@ import app.models.user           # Contains your User model
 import app.models.financing      # If this file contains models
 import app.models.models_init    # If this file contains models (less common name, but include if it has models)
 import app.models.transaction    # If this file contains models
+import app.models.fx             # FX rates
 # If you have any other Python files in app/models/ that define SQLAlchemy tables,
 # you must add an 'import app.models.your_file_name' line for each of them here.
 # --- END NEW ADDITIONS ---
@@ -0,0 +1,42 @@
+"""one business metrics row per user and period, with source watermark
+
+Revision ID: metrics_period_key_001
+Revises: loan_app_idempotency_001
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'metrics_period_key_001'
+down_revision = 'loan_app_idempotency_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the most recently calculated row of each (user_id, period_start).
+    op.execute("""
+        DELETE FROM business_metrics b
+        USING (
+            SELECT id,
+                   row_number() OVER (
+                       PARTITION BY user_id, period_start ORDER BY calculated_at DESC NULLS LAST, id
+                   ) AS rn
+            FROM business_metrics
+        ) ranked
+        WHERE b.id = ranked.id AND ranked.rn > 1
+    """)
+    op.add_column('business_metrics', sa.Column('source_watermark', sa.DateTime(timezone=True), nullable=True))
+    op.create_unique_constraint(
+        'uq_business_metrics_user_period', 'business_metrics', ['user_id', 'period_start']
+    )
+    # Incremental metrics find transactions written since the watermark.
+    op.create_index('ix_transactions_user_updated_at', 'transactions', ['user_id', 'updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_transactions_user_updated_at', table_name='transactions')
+    op.drop_constraint('uq_business_metrics_user_period', 'business_metrics', type_='unique')
+    op.drop_column('business_metrics', 'source_watermark')
@@ -0,0 +1,30 @@
+"""add credit score timestamp and factors
+
+Revision ID: add_scored_at_001
+Revises: add_tx_external_ref_001
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_scored_at_001'
+down_revision = 'add_tx_external_ref_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('business_metrics', sa.Column('score_factors', sa.JSON(), nullable=True))
+    op.add_column('business_metrics', sa.Column('scored_at', sa.DateTime(), nullable=True))
+    # Batch scoring reads the latest metrics row per user.
+    op.create_index(
+        'ix_business_metrics_user_calculated_at', 'business_metrics', ['user_id', 'calculated_at']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_business_metrics_user_calculated_at', table_name='business_metrics')
+    op.drop_column('business_metrics', 'scored_at')
+    op.drop_column('business_metrics', 'score_factors')
@@ -0,0 +1,46 @@
+"""unique financing offer per user, lender and status
+
+Revision ID: offer_unique_key_001
+Revises: add_scored_at_001
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'offer_unique_key_001'
+down_revision = 'add_scored_at_001'
+branch_labels = None
+depends_on = None
+
+# Earliest offer of each (user_id, lender_name, status) group is kept.
+RANKED_OFFERS = """
+    WITH ranked AS (
+        SELECT id,
+               first_value(id) OVER (
+                   PARTITION BY user_id, lender_name, status ORDER BY created_at, id
+               ) AS keep_id
+        FROM financing_offers
+    )
+"""
+
+
+def upgrade():
+    # Point applications at the surviving offer before removing duplicates.
+    op.execute(RANKED_OFFERS + """
+        UPDATE loan_applications la SET offer_id = r.keep_id
+        FROM ranked r
+        WHERE la.offer_id = r.id AND r.id <> r.keep_id
+    """)
+    op.execute(RANKED_OFFERS + """
+        DELETE FROM financing_offers f
+        USING ranked r
+        WHERE f.id = r.id AND r.id <> r.keep_id
+    """)
+    op.create_unique_constraint(
+        'uq_financing_offers_user_lender_status', 'financing_offers', ['user_id', 'lender_name', 'status']
+    )
+
+
+def downgrade():
+    op.drop_constraint('uq_financing_offers_user_lender_status', 'financing_offers', type_='unique')
@@ -0,0 +1,39 @@
+"""add fx rates table
+
+Revision ID: add_fx_rates_001
+Revises: metrics_period_key_001
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_fx_rates_001'
+down_revision = 'metrics_period_key_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    fx_rates = op.create_table(
+        'fx_rates',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('currency', sa.String(length=3), nullable=False),
+        sa.Column('effective_date', sa.Date(), nullable=False),
+        sa.Column('rate_to_base', sa.Numeric(18, 8), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('currency', 'effective_date', name='uq_fx_rates_currency_effective_date'),
+    )
+    # Seed with the approximate ZMW rates previously hard-coded in the insights context.
+    op.bulk_insert(fx_rates, [
+        {'currency': 'USD', 'effective_date': date(2020, 1, 1), 'rate_to_base': 27.0, 'source': 'stub'},
+        {'currency': 'EUR', 'effective_date': date(2020, 1, 1), 'rate_to_base': 29.0, 'source': 'stub'},
+    ])
+
+
+def downgrade():
+    op.drop_table('fx_rates')
@@ -0,0 +1,39 @@
+"""add insight checkpoints and batch scan keys
+
+Revision ID: add_insight_checkpoints_001
+Revises: add_fx_rates_001
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_insight_checkpoints_001'
+down_revision = 'add_fx_rates_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'insight_checkpoints',
+        sa.Column('job', sa.String(length=50), primary_key=True),
+        sa.Column('watermark_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('watermark_id', sa.String(), nullable=True),
+        sa.Column('model_version', sa.String(length=50), nullable=True),
+        sa.Column('rows_scored', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    # Keyset scan of new and changed transactions by the batch insight job.
+    op.create_index('ix_transactions_updated_at_id', 'transactions', ['updated_at', 'id'])
+    # Re-scoring a transaction replaces its insight of the same type.
+    op.create_unique_constraint(
+        'uq_transaction_insights_transaction_type', 'transaction_insights', ['transaction_id', 'insight_type']
+    )
+
+
+def downgrade():
+    op.drop_constraint('uq_transaction_insights_transaction_type', 'transaction_insights', type_='unique')
+    op.drop_index('ix_transactions_updated_at_id', table_name='transactions')
+    op.drop_table('insight_checkpoints')
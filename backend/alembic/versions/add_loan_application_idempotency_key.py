@@ -0,0 +1,27 @@
+"""add idempotency key to loan applications
+
+Revision ID: loan_app_idempotency_001
+Revises: offer_unique_key_001
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'loan_app_idempotency_001'
+down_revision = 'offer_unique_key_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('loan_applications', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    op.create_unique_constraint(
+        'uq_loan_applications_user_idempotency_key', 'loan_applications', ['user_id', 'idempotency_key']
+    )
+
+
+def downgrade():
+    op.drop_constraint('uq_loan_applications_user_idempotency_key', 'loan_applications', type_='unique')
+    op.drop_column('loan_applications', 'idempotency_key')
@@ -0,0 +1,43 @@
+"""key loan application offers by application
+
+Revision ID: offer_application_key_001
+Revises: add_insight_checkpoints_001
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'offer_application_key_001'
+down_revision = 'add_insight_checkpoints_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('financing_offers', sa.Column('application_id', sa.String(), nullable=True))
+    op.create_foreign_key(
+        'fk_financing_offers_application_id', 'financing_offers', 'loan_applications',
+        ['application_id'], ['id'],
+    )
+    # Application offers get their own key, so the (user, lender, status) key
+    # only covers materialized offers.
+    op.drop_constraint('uq_financing_offers_user_lender_status', 'financing_offers', type_='unique')
+    op.create_index(
+        'uq_financing_offers_user_lender_status', 'financing_offers', ['user_id', 'lender_name', 'status'],
+        unique=True, postgresql_where=sa.text('application_id IS NULL'),
+    )
+    op.create_unique_constraint(
+        'uq_financing_offers_application_lender', 'financing_offers', ['application_id', 'lender_name']
+    )
+
+
+def downgrade():
+    op.drop_constraint('uq_financing_offers_application_lender', 'financing_offers', type_='unique')
+    op.drop_index('uq_financing_offers_user_lender_status', table_name='financing_offers')
+    op.create_unique_constraint(
+        'uq_financing_offers_user_lender_status', 'financing_offers', ['user_id', 'lender_name', 'status']
+    )
+    op.drop_constraint('fk_financing_offers_application_id', 'financing_offers', type_='foreignkey')
+    op.drop_column('financing_offers', 'application_id')
@@ -0,0 +1,38 @@
+"""add transaction source and external id
+
+Revision ID: add_tx_external_ref_001
+Revises: add_credit_score_001
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_tx_external_ref_001'
+down_revision = 'add_credit_score_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('transactions', sa.Column('source', sa.String(length=20), nullable=True))
+    op.add_column('transactions', sa.Column('wallet_number', sa.String(length=20), nullable=True))
+    op.add_column('transactions', sa.Column('external_id', sa.String(length=100), nullable=True))
+    # A transfer between two wallets on the platform carries the same provider id
+    # in both statements, so the id is only unique per merchant and wallet.
+    op.create_unique_constraint(
+        'uq_transactions_user_wallet_external_id', 'transactions',
+        ['user_id', 'source', 'wallet_number', 'external_id'],
+    )
+    # Airtel's raw "TS" status was stored verbatim by earlier imports, and CSV and
+    # manual uploads kept whatever casing they were given.
+    op.execute("UPDATE transactions SET status = 'completed' WHERE upper(status) = 'TS'")
+    op.execute("UPDATE transactions SET status = lower(status) WHERE status <> lower(status)")
+
+
+def downgrade():
+    op.drop_constraint('uq_transactions_user_wallet_external_id', 'transactions', type_='unique')
+    op.drop_column('transactions', 'external_id')
+    op.drop_column('transactions', 'wallet_number')
+    op.drop_column('transactions', 'source')
@@ -1,99 +1,54 @@
 """
 FastAPI dependency injection utilities.
 Handles authentication, database sessions, and common dependencies.
+
+Authentication lives in app.core.auth; it is re-exported here for routes
+that import their dependencies from this module.
 """
 
-from typing import Optional, AsyncGenerator
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
+from typing import Optional
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
-from app.core.config import settings
-from app.database import get_async_session
+from app.core.auth import Principal, get_current_principal, get_current_user
+from app.database import get_db
 from app.models.user import User
-from app.redis_client import get_redis, RedisClient
-from app.core.logging import get_logger
 
-logger = get_logger(__name__)
-http_bearer_security = HTTPBearer()
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login-json", auto_error=False)
 
+__all__ = [
+    "Principal",
+    "get_current_principal",
+    "get_current_user",
+    "get_db",
+    "get_optional_principal",
+    "get_optional_user",
+]
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(http_bearer_security),
-    db: AsyncSession = Depends(get_async_session),
-    redis_client = Depends(get_redis)
-) -> User:
-    """Get current authenticated user from JWT token."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
 
+async def get_optional_principal(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[Principal]:
+    """
+    Get the caller's principal if authenticated, None otherwise.
+    """
+    if not token:
+        return None
     try:
-        # First try Redis for cached session
-        try:
-            session = await redis_client.get_user_session(credentials.credentials)
-            if session:
-                return User(**session)
-        except Exception as redis_error:
-            logger.warning("Redis unavailable, falling back to JWT: %s", redis_error)
-
-        # Fallback to JWT validation
-        token = credentials.credentials.strip()
-        if not token or len(token.split('.')) != 3:
-            logger.error(f"Invalid JWT token format: {token[:20]}...")
-            raise credentials_exception
-
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
-        if user is None:
-            logger.warning(f"User not found for ID: {user_id}")
-            raise credentials_exception
-
-        # Cache user session
-        user_data = user.to_dict()
-        await redis_client.set_user_session(
-            credentials.credentials,
-            user_data,
-            expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
-        )
-
-        return user
-
-    except JWTError as e:
-        logger.error(f"JWT validation error: {e}")
-        raise credentials_exception
-    except Exception as e:
-        logger.error(f"Authentication error: {e}", exc_info=True)
-        raise credentials_exception
+        return await get_current_principal(token)
+    except HTTPException:
+        return None
 
 
 async def get_optional_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(http_bearer_security),
-    db: AsyncSession = Depends(get_async_session),
-    redis_client: RedisClient = Depends(get_redis)
+    principal: Optional[Principal] = Depends(get_optional_principal),
+    db: AsyncSession = Depends(get_db),
 ) -> Optional[User]:
     """
     Get current user if authenticated, None otherwise.
     """
-    if not credentials:
+    if principal is None:
         return None
-
     try:
-        return await get_current_user(credentials, db, redis_client)
+        return await principal.load_user(db)
     except HTTPException:
         return None
-
-# ... (The rest of the file remains the same) ...
@@ -12,6 +12,8 @@ import logging
 
 from app.database import get_db
 from app.models.transaction import Transaction
+from app.services.analytics_engine import SUCCESS_STATUSES
+from app.services.fx import FxConversion
 from app.models.user import User
 from app.core.auth import get_current_user
 
@@ -35,16 +37,19 @@ def get_analytics_data(
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
 
+        # Revenue is summed in the reporting currency
+        fx = FxConversion()
+
         # Time-series points (one per day)
         points: List[Dict] = []
         for i in range(days):
             day_start = start_date + timedelta(days=i)
             day_end = day_start + timedelta(days=1)
-            q = db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
+            q = fx.join(db.query(func.coalesce(func.sum(fx.amount), 0)).select_from(Transaction)).filter(
                 Transaction.user_id == current_user.id,
                 Transaction.created_at >= day_start,
                 Transaction.created_at < day_end,
-                or_(Transaction.status.ilike("completed"), Transaction.status.ilike("ts")),
+                func.lower(Transaction.status).in_(SUCCESS_STATUSES),
             )
             day_revenue = float(q.scalar() or 0)
             q_tx = db.query(func.count(Transaction.id)).filter(
@@ -104,9 +109,10 @@ def get_dashboard(
     try:
         start_date = datetime.utcnow() - timedelta(days=period)
 
-        total_revenue = db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
+        fx = FxConversion()
+        total_revenue = fx.join(db.query(func.coalesce(func.sum(fx.amount), 0)).select_from(Transaction)).filter(
             Transaction.user_id == current_user.id,
-            or_(Transaction.status.ilike("completed"), Transaction.status.ilike("ts")),
+            func.lower(Transaction.status).in_(SUCCESS_STATUSES),
             Transaction.created_at >= start_date,
         ).scalar() or 0
 
@@ -140,14 +146,14 @@ def get_dashboard(
 
         completed_count = db.query(func.count(Transaction.id)).filter(
             Transaction.user_id == current_user.id,
-            or_(Transaction.status.ilike("completed"), Transaction.status.ilike("ts")),
+            func.lower(Transaction.status).in_(SUCCESS_STATUSES),
             Transaction.created_at >= start_date,
         ).scalar() or 0
         conversion_rate = (completed_count / total_transactions) if total_transactions > 0 else 0.0
 
         # MRR proxy (transaction_type == 'recurring' if present)
         try:
-            mrr = db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
+            mrr = fx.join(db.query(func.coalesce(func.sum(fx.amount), 0)).select_from(Transaction)).filter(
                 Transaction.user_id == current_user.id,
                 Transaction.created_at >= start_date,
                 Transaction.transaction_type == "recurring",
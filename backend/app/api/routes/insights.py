@@ -15,7 +15,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from celery.result import AsyncResult
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, get_db
@@ -33,11 +33,11 @@ from app.models.transaction import Transaction
 from app.models.financing import FinancingOffer, LoanApplication, BusinessMetrics
 from app.services.ai_agent import AIAgentService
 from app.services.analytics_engine import AnalyticsEngine
-from app.core.config import settings
 from app.core.logging import get_logger
 from app.celery_worker import process_ai_insights, generate_analytics
-from app.redis_client import redis_client
-import json
+from app.services.insights_state import insights_state
+from app.services.conversation_store import ConversationHistory, conversation_store
+from app.services.fx import FxConversion, fx_cache
 
 # Initialize router and dependencies
 # NOTE: Do not add a module-level path prefix here because main.py already
@@ -56,7 +56,6 @@ analytics_engine = AnalyticsEngine(db, ai_agent)
 @router.post("/generate", response_model=InsightResponse)
 async def generate_insights(
     request: InsightRequest,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -79,10 +78,8 @@ async def generate_insights(
                 detail="Invalid focus area. Must be one of: revenue, cashflow, customer_behavior, inventory, financing, growth, risk_analysis, market_trends"
             )
         
-        # Check rate limiting
-        rate_limit_key = f"insights:rate_limit:{current_user.id}"
-        current_requests = redis_client.get(rate_limit_key)
-        if current_requests and int(current_requests) >= settings.INSIGHTS_RATE_LIMIT:
+        # Rate limiting: decided on the atomic increment, so concurrent requests cannot overshoot
+        if await insights_state.count_request(current_user.id) > insights_state.rate_limit:
             raise HTTPException(
                 status_code=429,
                 detail="Rate limit exceeded. Please wait before requesting more insights."
@@ -105,11 +102,7 @@ async def generate_insights(
             )
             
             # Store task info in Redis
-            redis_client.setex(
-                f"insights:task:{task_id}",
-                3600,  # 1 hour expiry
-                task.id
-            )
+            await insights_state.track_task(task_id, task.id, current_user.id)
             
             return InsightResponse(
                 task_id=task_id,
@@ -125,13 +118,8 @@ async def generate_insights(
             parameters=request.parameters or {}
         )
         
-        # Update rate limiting
-        redis_client.incr(rate_limit_key)
-        redis_client.expire(rate_limit_key, 3600)  # Reset every hour
-        
-        # Log insight generation for analytics
-        background_tasks.add_task(
-            _log_insight_usage,
+        # Log insight generation for analytics (buffered, written in bulk)
+        _log_insight_usage(
             user_id=current_user.id,
             focus_area=request.focus_area,
             response_length=len(str(insights))
@@ -146,6 +134,8 @@ async def generate_insights(
             data_points_analyzed=user_data.get("transaction_count", 0)
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating insights: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -164,12 +154,12 @@ async def get_insight_status(
     """
     try:
         # Get Celery task ID from Redis
-        celery_task_id = redis_client.get(f"insights:task:{task_id}")
-        if not celery_task_id:
+        task = await insights_state.get_task(task_id)
+        if task is None or task.user_id != str(current_user.id):
             raise HTTPException(status_code=404, detail="Task not found")
         
         # Check task status
-        result = AsyncResult(celery_task_id.decode())
+        result = AsyncResult(task.celery_task_id)
         
         if result.state == "PENDING":
             return {"status": "processing", "message": "Task is being processed"}
@@ -188,6 +178,8 @@ async def get_insight_status(
         else:
             return {"status": result.state.lower()}
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error checking task status: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to check task status")
@@ -240,7 +232,8 @@ async def chat_with_ai(
                     "business_name": current_user.business_name,
                     "industry": getattr(current_user, "industry", None),
                 },
-                "conversation_context": conversation_context,
+                "conversation_context": conversation_context.turns,
+                "conversation_summary": conversation_context.summary,
                 "data": user_data,
             }
         )
@@ -378,19 +371,13 @@ async def get_insights_history(
     Retrieve user's insights generation history.
     """
     try:
-        # Get insights history from Redis/Database
-        history_key = f"insights:history:{current_user.id}"
-        
         # This would typically come from a database table
         # For now, using Redis for demonstration
-        history_data = redis_client.lrange(history_key, offset, offset + limit - 1)
-        
-        insights_history = []
-        for item in history_data:
-            import json
-            insight_data = json.loads(item.decode())
-            if not focus_area or insight_data.get("focus_area") == focus_area:
-                insights_history.append(insight_data)
+        insights_history = [
+            insight_data
+            for insight_data in await insights_state.history(current_user.id, offset, limit)
+            if not focus_area or insight_data.get("focus_area") == focus_area
+        ]
         
         return {
             "insights": insights_history,
@@ -424,7 +411,7 @@ async def get_chat_history(
         
         # Format messages for frontend
         messages = []
-        for turn in conversation_context:
+        for turn in conversation_context.turns:
             if turn.get("user"):
                 messages.append({
                     "role": "user",
@@ -499,23 +486,16 @@ async def _gather_user_context(user: User, db: AsyncSession, date_range: Optiona
         # Limit transaction list to last 500 for context size, but use all for calculations
         transaction_sample = all_transactions[:500] if len(all_transactions) > 500 else all_transactions
         
-        # Calculate key metrics from ALL transactions (not just sample)
+        # Revenue over ALL transactions (not just sample), in the reporting currency,
+        # converted and summed in SQL at the rate in force on each transaction's date.
         # Include both "payment" and "sale" transaction types for revenue
-        # Convert to ZMW (Zambian Kwacha) for consistent analysis
-        # Exchange rates (approximate): 1 USD = 27 ZMW, 1 EUR = 29 ZMW
-        total_revenue = 0
-        for t in all_transactions:
-            if t.status == "completed" and t.transaction_type in ["payment", "sale"]:
-                amount = float(t.amount)
-                currency = getattr(t, "currency", "ZMW") or "ZMW"
-                
-                if currency.upper() == "USD":
-                    amount = amount * 27.0
-                elif currency.upper() == "EUR":
-                    amount = amount * 29.0
-                # Assume other currencies are ZMW or 1:1 for now
-                
-                total_revenue += amount
+        fx = FxConversion()
+        revenue_query = fx.join(select(func.coalesce(func.sum(fx.amount), 0)).select_from(Transaction)).where(
+            *filters,
+            Transaction.status == "completed",
+            Transaction.transaction_type.in_(["payment", "sale"]),
+        )
+        total_revenue = float((await db.execute(revenue_query)).scalar() or 0)
                 
         total_transactions = len(all_transactions)
         avg_transaction = total_revenue / total_transactions if total_transactions > 0 else 0
@@ -534,12 +514,21 @@ async def _gather_user_context(user: User, db: AsyncSession, date_range: Optiona
                 revenue_by_period["earliest_transaction"] = earliest_date.isoformat() if earliest_date else None
                 revenue_by_period["total_days_in_data"] = (end_date - earliest_date).days if earliest_date else None
         
+        await fx_cache.refresh(db)
+        sample_converted = fx_cache.convert(
+            [float(t.amount) for t in transaction_sample],
+            [t.currency for t in transaction_sample],
+            [t.created_at or end_date for t in transaction_sample],
+            to=fx.reporting_currency,
+        )
+
         context_data = {
             "user_id": user.id,
             "business_name": user.business_name,
             "industry": user.industry,
             "transaction_count": total_transactions,
             "total_revenue": total_revenue,
+            "currency": fx.reporting_currency,
             "average_transaction": avg_transaction,
             "date_range": date_range_info,
             "transaction_summary": {
@@ -554,14 +543,12 @@ async def _gather_user_context(user: User, db: AsyncSession, date_range: Optiona
                     "id": str(t.id),
                     "amount": float(t.amount),
                     "currency": getattr(t, "currency", "ZMW"),
-                    "amount_zmw": (float(t.amount) * 27.0 if getattr(t, "currency", "ZMW") == "USD" else 
-                                  float(t.amount) * 29.0 if getattr(t, "currency", "ZMW") == "EUR" else 
-                                  float(t.amount)),
+                    f"amount_{fx.reporting_currency.lower()}": round(float(converted), 2),
                     "type": t.transaction_type,
                     "status": t.status,
                     "date": t.created_at.isoformat() if t.created_at else None,
                     "description": t.description
-                } for t in transaction_sample  # Sample for context size
+                } for t, converted in zip(transaction_sample, sample_converted)  # Sample for context size
             ],
             "note": f"Analyzing {'all available data' if date_range is None else f'{date_range} days'} with {total_transactions} total transactions"
         }
@@ -605,7 +592,7 @@ async def _gather_user_context(user: User, db: AsyncSession, date_range: Optiona
             from app.models.financing import BusinessMetrics
             metrics_query = select(BusinessMetrics).where(
                 BusinessMetrics.user_id == user.id
-            ).order_by(BusinessMetrics.calculated_at.desc()).limit(1)
+            ).order_by(BusinessMetrics.period_start.desc()).limit(1)
             metrics_result = await db.execute(metrics_query)
             latest_metrics = metrics_result.scalars().first()
             
@@ -678,29 +665,21 @@ async def _gather_contextual_data(user: User, db: AsyncSession, message: str) ->
     return await _gather_user_context(user, db, date_range)
 
 
-async def _get_conversation_context(user_id: str, conversation_id: str | None):
-    """Fetch prior conversation turns for a user and conversation id."""
-    conv_id = conversation_id or "default"
-    key = f"conv:{user_id}:{conv_id}"
+async def _get_conversation_context(user_id: str, conversation_id: str | None) -> ConversationHistory:
+    """Fetch the recent turns and rolling summary for a user and conversation id."""
     try:
-        messages = await asyncio.wait_for(redis_client.lrange(key, 0, -1), timeout=0.3)
-        return [json.loads(m) for m in messages]
+        return await asyncio.wait_for(conversation_store.load(user_id, conversation_id), timeout=0.3)
     except Exception as e:
         logger.exception("Error getting conversation context: %s", e)
-        return []
+        return ConversationHistory()
 
 
 async def _store_conversation_turn(user_id: str, conversation_id: str | None, user_text: str, ai_text: str):
     """Append a conversation turn to Redis for context."""
-    conv_id = conversation_id or "default"
-    key = f"conv:{user_id}:{conv_id}"
-    turn = {
-        "user": user_text,
-        "ai": ai_text,
-        "ts": datetime.utcnow().isoformat()
-    }
     try:
-        await asyncio.wait_for(redis_client.lpush(key, json.dumps(turn)), timeout=0.3)
+        await asyncio.wait_for(
+            conversation_store.append(user_id, conversation_id, user_text, ai_text), timeout=0.3
+        )
     except Exception as e:
         logger.exception("Error storing conversation turn: %s", e)
 
@@ -730,19 +709,11 @@ async def _contains_inappropriate_content(content: str) -> bool:
     return any(keyword in content.lower() for keyword in inappropriate_keywords)
 
 
-async def _log_insight_usage(user_id: int, focus_area: str, response_length: int):
+def _log_insight_usage(user_id: int, focus_area: str, response_length: int):
     """Log insight usage for analytics and billing."""
     try:
-        import json
-        usage_data = {
-            "user_id": user_id,
-            "focus_area": focus_area,
-            "response_length": response_length,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        
-        # Store in Redis for processing
-        redis_client.lpush("insights:usage_log", json.dumps(usage_data))
+        # Buffered and written to the hourly usage log in bulk
+        insights_state.record_usage(user_id, focus_area, response_length)
         
     except Exception as e:
         logger.error(f"Error logging insight usage: {str(e)}")
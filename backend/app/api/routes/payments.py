@@ -11,10 +11,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import desc, and_, or_, select, func
 from datetime import datetime, timedelta
 from app.database import get_async_session
+from app.services.anomaly_detector import anomaly_detector, observation
 from app.services.data_sync import DataSyncService
+from app.core.config import settings
+from app.services.fx import FxConversion, has_rates
 from app.core.auth import get_current_user
 from app.models.user import User
 from app.models.transaction import Transaction, PaymentMethod
+from app.services.metrics_scheduler import metrics_scheduler
+from app.services.score_cache import score_cache
 from app.schemas.payments import (
     TransactionResponse,
     PaymentMethodCreate,
@@ -112,54 +117,71 @@ async def get_transactions(
 @router.get("/transactions/summary")
 async def get_transaction_summary(
     days: Optional[int] = None,
+    currency: Optional[str] = None,
     db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ) -> Any:
-    """Get transaction summary statistics. If days is None or 0, returns all-time stats."""
-    
-    query = select(Transaction).filter(Transaction.user_id == current_user.id)
-    
+    """
+    Get transaction summary statistics. If days is None or 0, returns all-time stats.
+    Revenue is reported per currency and as one total in the reporting currency.
+    """
+    if currency and not await has_rates(db, currency):
+        raise HTTPException(status_code=400, detail=f"No exchange rates for currency {currency.upper()}")
+
+    filters = [Transaction.user_id == current_user.id]
     if days and days > 0:
         start_date = datetime.utcnow() - timedelta(days=days)
-        query = query.filter(Transaction.created_at >= start_date)
-    
-    # Calculate summary statistics
-    result = await db.execute(query)
-    transactions = result.scalars().all()
-    
-    # Group totals by currency
-    totals_by_currency = {}
-    total_count = len(transactions)
-    
-    # Group by status
-    by_status = {}
-    successful_count = 0
-    
+        filters.append(Transaction.created_at >= start_date)
+
     successful_statuses = ['completed', 'successful', 'succeeded', 'ts', 'success']
-    
-    for transaction in transactions:
-        # Currency totals (only for successful payment transactions)
-        status = transaction.status.lower() if transaction.status else ""
-        if status in successful_statuses and transaction.amount and transaction.transaction_type == 'payment':
-            currency = transaction.currency or 'USD'
-            if currency not in totals_by_currency:
-                totals_by_currency[currency] = 0.0
-            totals_by_currency[currency] += float(transaction.amount)
+    status_expr = func.lower(func.coalesce(Transaction.status, ''))
+    revenue_filter = and_(
+        status_expr.in_(successful_statuses),
+        Transaction.transaction_type == 'payment',
+        Transaction.amount.isnot(None),
+    )
+
+    # Group by status
+    status_rows = (await db.execute(
+        select(status_expr, func.count(Transaction.id), func.coalesce(func.sum(Transaction.amount), 0))
+        .where(*filters)
+        .group_by(status_expr)
+    )).all()
+    by_status = {row[0]: {"count": row[1], "amount": float(row[2])} for row in status_rows}
+    total_count = sum(v["count"] for v in by_status.values())
+    successful_count = sum(v["count"] for k, v in by_status.items() if k in successful_statuses)
+
+    # Currency totals (only for successful payment transactions)
+    currency_expr = func.upper(func.coalesce(Transaction.currency, settings.FX_BASE_CURRENCY))
+    currency_rows = (await db.execute(
+        select(currency_expr, func.sum(Transaction.amount))
+        .where(*filters, revenue_filter)
+        .group_by(currency_expr)
+    )).all()
+    totals_by_currency = {row[0]: float(row[1]) for row in currency_rows}
+
+    fx = FxConversion(currency)
+    total_revenue, unconverted_count = (await db.execute(
+        fx.join(select(
+            func.coalesce(func.sum(fx.amount), 0),
+            func.count(Transaction.id).filter(fx.unconverted),
+        ).select_from(Transaction))
+        .where(*filters, revenue_filter)
+    )).one()
+    if unconverted_count:
+        logger.warning(
+            "Revenue total for user %s leaves out %s transactions in currencies without FX rates",
+            current_user.id, unconverted_count,
+        )
 
-        # Status counts
-        if status not in by_status:
-            by_status[status] = {"count": 0, "amount": 0}
-        by_status[status]["count"] += 1
-        by_status[status]["amount"] += float(transaction.amount or 0)
-        
-        if status in successful_statuses:
-            successful_count += 1
-            
     success_rate = successful_count / total_count if total_count > 0 else 0
     
     return {
         "period_days": days,
         "totals_by_currency": totals_by_currency,
+        "total_revenue": float(total_revenue),
+        "reporting_currency": fx.reporting_currency,
+        "unconverted_count": unconverted_count,
         "total_count": total_count,
         "success_rate": float(success_rate),
         "by_status": by_status
@@ -296,6 +318,9 @@ async def create_transaction(
         db.add(new_transaction)
         await db.commit()
         await db.refresh(new_transaction)
+        await score_cache.invalidate_transactions([current_user.id])
+        await metrics_scheduler.mark_dirty(current_user.id)
+        await anomaly_detector.observe(db, current_user.id, [observation(new_transaction)])
         
         logger.info(
             f"Transaction created manually",
@@ -382,15 +407,10 @@ async def bulk_upload_transactions(
         if transactions_to_add:
             db.add_all(transactions_to_add)
             await db.commit()
-            
-            # Trigger metrics update
-            try:
-                from app.services.analytics_engine import AnalyticsEngine
-                from app.services.ai_agent import AIAgentService
-                analytics = AnalyticsEngine(db, AIAgentService())
-                await analytics.update_business_metrics(str(current_user.id))
-            except Exception as e:
-                logger.error(f"Failed to update metrics after bulk upload: {e}")
+            await score_cache.invalidate_transactions([current_user.id])
+            # Metrics are recomputed in the background, once per burst of uploads.
+            await metrics_scheduler.mark_dirty(current_user.id)
+            await anomaly_detector.observe(db, current_user.id, [observation(t) for t in transactions_to_add])
 
         return {
             "status": "success",
@@ -1,7 +1,17 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from datetime import datetime, timedelta
 
+from app.api.deps import Principal, get_current_principal
+from app.core.config import settings
+from app.database import get_db
+from app.ml.batch_inference import RISK_INSIGHT, TREND_INSIGHT
+from app.ml.registry import ModelNotFound
+from app.models.transaction import Transaction, TransactionInsight
+from app.services.forecasting import RevenueForecastService
+
 router = APIRouter()
 
 @router.get("/analytics")
@@ -38,4 +48,77 @@ async def analytics(timeframe: Optional[str] = Query("30d")):
             {"channel": "Social", "spend": 1000, "revenue": 3500, "roi": 250}
         ]
     }
-    return response
\ No newline at end of file
+    return response
+
+
+@router.get("/forecast")
+async def revenue_forecast(
+    horizon: int = Query(7, ge=1, le=settings.FORECAST_MAX_HORIZON_DAYS),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Daily revenue forecast for the next `horizon` days with prediction intervals.
+    Served from the nightly precompute when it is current.
+    """
+    try:
+        return await RevenueForecastService(db).get_forecast(str(current_user.id), horizon)
+    except ModelNotFound:
+        raise HTTPException(status_code=503, detail="Revenue forecasting model is not trained yet")
+
+
+@router.get("/insights")
+async def transaction_insights(
+    days: int = Query(30, ge=1, le=365),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Risk and trend insights precomputed by the batch insight job: a risk
+    summary over the last `days`, the riskiest transactions and the latest trend.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    mine = (
+        select(TransactionInsight)
+        .join(Transaction, Transaction.id == TransactionInsight.transaction_id)
+        .where(Transaction.user_id == current_user.id, Transaction.created_at >= since)
+    )
+    risk = mine.where(TransactionInsight.insight_type == RISK_INSIGHT).subquery()
+    probability = risk.c.insight_data["risk_probability"].as_float()
+    scored, mean_risk, high = (await db.execute(select(
+        func.count(),
+        func.avg(probability),
+        func.count().filter(risk.c.insight_data["risk_level"].as_string() == "high"),
+    ).select_from(risk))).one()
+
+    riskiest = (await db.execute(
+        mine.where(TransactionInsight.insight_type == RISK_INSIGHT)
+        .order_by(desc(TransactionInsight.insight_data["risk_probability"].as_float()))
+        .limit(limit)
+    )).scalars().all()
+    trend = (await db.execute(
+        mine.where(TransactionInsight.insight_type == TREND_INSIGHT)
+        .order_by(desc(TransactionInsight.generated_at))
+        .limit(1)
+    )).scalars().first()
+
+    return {
+        "days": days,
+        "risk": {
+            "scored": scored,
+            "averageProbability": round(float(mean_risk), 4) if mean_risk is not None else None,
+            "highRiskCount": high,
+        },
+        "riskiest": [
+            {
+                "transactionId": insight.transaction_id,
+                **insight.insight_data,
+                "modelVersion": insight.ai_model_version,
+                "generatedAt": insight.generated_at.isoformat() if insight.generated_at else None,
+            }
+            for insight in riskiest
+            if insight.insight_data.get("risk_level") != "low"
+        ],
+        "trend": trend.insight_data if trend else None,
+    }
@@ -16,7 +16,7 @@ from app.schemas.auth import (
     RefreshTokenRequest, LogoutRequest
 )
 from app.core.auth import (
-    authenticate_user, verify_password, get_password_hash,
+    authenticate_user, hash_password, create_demo_user,
     create_access_token, create_refresh_token, verify_refresh_token,
     get_current_user, update_last_login
 )
@@ -51,7 +51,7 @@ async def register_user(
             detail="Email already registered",
         )
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     new_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -111,10 +111,9 @@ async def login_user(
     """
     logger.info("Attempting form login", extra={"email": form_data.username})
 
-    user = await db.execute(select(User).filter(User.email == form_data.username))
-    user = user.scalars().first()
+    user = await authenticate_user(db, form_data.username, form_data.password)
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user:
         logger.warning("Failed form login attempt: Incorrect credentials", extra={"email": form_data.username})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -196,10 +195,9 @@ async def login_json(
     """
     logger.info("Attempting JSON login", extra={"email": login_data.email})
 
-    user = await db.execute(select(User).filter(User.email == login_data.email))
-    user = user.scalars().first()
+    user = await authenticate_user(db, login_data.email, login_data.password)
 
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user:
         logger.warning("Failed JSON login attempt: Incorrect credentials", extra={"email": login_data.email})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -401,12 +399,12 @@ async def create_demo_user_endpoint(
     """
     logger.info("Attempting to create/retrieve demo user")
     try:
-        demo_user = create_demo_user(db)
+        demo_user = await create_demo_user(db)
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         refresh_token_expires = timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(data={"sub": str(demo_user.id)}, expires_delta=access_token_expires)
         refresh_token = create_refresh_token(data={"sub": str(demo_user.id)}, expires_delta=refresh_token_expires)
-        update_last_login(db, demo_user)
+        await update_last_login(db, demo_user)
         logger.info("Demo user created/logged in successfully", extra={
             "user_id": str(demo_user.id),
             "email": demo_user.email,
@@ -418,6 +416,8 @@ async def create_demo_user_endpoint(
             token_type="bearer",
             refresh_token=refresh_token,
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Failed to create/retrieve demo user: " + str(e), extra={
             "status": "failed"
@@ -1,37 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from app.database import get_db
-from app.api.deps import get_current_user
-from app.models.user import User
-from app.models.financing import FinancingOffer
+from app.api.deps import Principal, get_current_principal
+from app.schemas.financing import LoanApplicationRequest, PaymentSchedule, PricingGridResponse
 from app.services.credit_score import CreditScoreService
+from app.services.financing import FinancingService
 from app.services.loan_provider import LoanProviderService
-from datetime import datetime, timedelta
-import uuid
+from app.services.loan_pricing import payment_schedule, price_grid
+from app.services.offer_materializer import materialize_offers
 
 router = APIRouter()
 
 @router.get("/score")
 async def get_credit_score(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Get the current user's business credit score.
     """
     try:
         service = CreditScoreService(db)
-        score_data = await service.calculate_score(str(current_user.id))
+        score_data = await service.get_score(str(current_user.id))
         return score_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/score/refresh", status_code=202)
+async def refresh_credit_score(
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Queue a re-score of the current user's business credit score.
+    """
+    from app.celery_worker import score_merchants
+    task = score_merchants.delay(user_ids=[str(current_user.id)])
+    return {"status": "queued", "task_id": task.id}
+
 @router.get("/offers")
 async def get_loan_offers(
     score: int = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Get available loan offers based on credit score.
@@ -41,70 +53,81 @@ async def get_loan_offers(
         # 1. Calculate Score if needed
         if score is None:
             score_service = CreditScoreService(db)
-            score_data = await score_service.calculate_score(str(current_user.id))
+            score_data = await score_service.get_score(str(current_user.id))
             score = score_data["score"]
             
         # 2. Get Simulated Offers
         provider = LoanProviderService()
         raw_offers = provider.get_offers(score)
         
-        # 3. Persist Offers to DB
-        saved_offers = []
-        for offer_data in raw_offers:
-            # Check if this specific offer already exists for the user (deduplication)
-            # We assume unique combination of lender_name and loan_name for now
-            stmt = select(FinancingOffer).where(
-                FinancingOffer.user_id == current_user.id,
-                FinancingOffer.lender_name == offer_data["provider"],
-                # We could add more checks but this is a simple heuristic
-                FinancingOffer.status == "pending"
-            )
-            result = await db.execute(stmt)
-            existing_offer = result.scalars().first()
-            
-            if not existing_offer:
-                # Map raw offer to DB model
-                # We take the max amount and max term as the "offer" limits
-                new_offer = FinancingOffer(
-                    id=str(uuid.uuid4()),
-                    user_id=current_user.id,
-                    offer_type="term_loan", # Defaulting to term loan
-                    amount=offer_data["amount_range"]["max"],
-                    interest_rate=offer_data["interest_rate"] / 100.0, # Convert percentage to decimal
-                    term_months=max(offer_data["term_months"]),
-                    status="pending",
-                    approval_probability=0.85, # Simulated probability
-                    requirements=offer_data["requirements"],
-                    conditions={"term_options": offer_data["term_months"]},
-                    lender_name=offer_data["provider"],
-                    lender_logo_url=offer_data["logo_url"],
-                    expires_at=datetime.utcnow() + timedelta(days=30)
-                )
-                db.add(new_offer)
-                saved_offers.append(new_offer)
-            else:
-                saved_offers.append(existing_offer)
-        
-        if saved_offers:
-            await db.commit()
-            
-        # Return the raw offers structure as frontend expects it, 
-        # but we could also return the saved_offers objects if we wanted to change frontend.
-        # For now, let's stick to the contract but maybe add the ID?
-        # The user asked to "upload... into financing_offers table".
+        # 3. Persist Offers to DB (one upsert; returns existing and new rows)
+        saved_offers = (await materialize_offers(db, {current_user.id: raw_offers}))[str(current_user.id)]
+        await db.commit()
+
         # The frontend still expects the structure from LoanProviderService.
-        
         return {"offers": raw_offers, "based_on_score": score, "persisted_count": len(saved_offers)}
 
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/apply")
+@router.get("/pricing", response_model=PricingGridResponse)
+async def get_pricing_grid(
+    amounts: List[float] = Query(..., description="Loan amounts"),
+    terms: List[int] = Query(..., description="Terms in months"),
+    rates: List[float] = Query(..., description="Annual interest rates as percentage"),
+    origination_fee: float = Query(0.0, ge=0, lt=1, description="Upfront fee as a fraction of the amount"),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    What-if pricing: monthly payment, total cost and APR for every
+    combination of the given amounts, terms and rates.
+    """
+    try:
+        grid = price_grid(amounts, terms, rates, origination_fee)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"origination_fee": origination_fee, "quotes": grid.quotes()}
+
+@router.get("/schedule", response_model=List[PaymentSchedule])
+async def get_payment_schedule(
+    amount: float = Query(..., gt=0),
+    interest_rate: float = Query(..., ge=0, description="Annual interest rate as percentage"),
+    term_months: int = Query(..., ge=1, le=120),
+    start_date: Optional[date] = None,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Full amortization schedule for one loan.
+    """
+    return payment_schedule(amount, interest_rate, term_months, start_date)
+
+@router.post("/apply", status_code=202)
 async def apply_for_loan(
-    application_data: dict,
+    application_data: LoanApplicationRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=64),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
-    # Placeholder for application logic
-    return {"status": "submitted", "message": "Application received"}
+    """
+    Submit a loan application. The amount and purpose are validated (422)
+    before it is persisted and queued for scoring; the decision arrives as a
+    notification. Resubmitting with the same Idempotency-Key returns the
+    original application.
+    """
+    service = FinancingService(db)
+    application, created = await service.submit_application(
+        current_user.id, application_data.model_dump(), idempotency_key
+    )
+
+    if application.status == "submitted":
+        # Re-enqueueing a duplicate is harmless: the worker claims applications atomically.
+        from app.celery_worker import process_loan_application
+        process_loan_application.delay(application.id)
+
+    return {
+        "application_id": application.id,
+        "status": application.status,
+        "created": created,
+        "message": "Application received" if created else "Application already submitted",
+    }
@@ -7,10 +7,8 @@ from uuid import UUID
 
 from app.database import get_db
 from app.models.financing import BusinessMetrics
-from app.services.analytics_engine import AnalyticsEngine
-from app.services.ai_agent import AIAgentService
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.services.metrics_scheduler import metrics_scheduler
+from app.api.deps import Principal, get_current_principal
 
 router = APIRouter()
 
@@ -38,7 +36,7 @@ def _row_to_dict(r: BusinessMetrics):
 async def get_business_metrics(
     user_id: Optional[str] = Query(None, description="User ID to fetch metrics for. Bypasses token authentication."),
     db: AsyncSession = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user),
+    current_user: Optional[Principal] = Depends(get_current_principal),
     limit: int = 10
 ):
     try:
@@ -57,7 +55,7 @@ async def get_business_metrics(
         q = await db.execute(
             select(BusinessMetrics)
             .where(BusinessMetrics.user_id == target_user_id_str)
-            .order_by(BusinessMetrics.calculated_at.desc())
+            .order_by(BusinessMetrics.period_start.desc())
             .limit(limit)
         )
         rows = q.scalars().all()
@@ -65,26 +63,33 @@ async def get_business_metrics(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/update")
+@router.post("/update", status_code=202)
 async def update_business_metrics(
+    full: bool = Query(False, description="Recompute every period instead of only those with new transactions"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
-    Manually trigger an update of business metrics for the current user.
-    This recalculates all metrics based on the latest transaction data.
+    Request an update of business metrics for the current user.
+    The recompute runs in the background, debounced with other writes;
+    the response carries the current (possibly stale) latest metrics.
+    Only periods with transactions written since the last update are
+    recalculated unless full=true.
     """
     try:
-        ai_service = AIAgentService()
-        analytics = AnalyticsEngine(db, ai_service)
-        
-        # DEFINITIVE FIX: Pass the user ID as a string, which is what the analytics engine now expects.
-        metrics = await analytics.update_business_metrics(str(current_user.id))
-        
+        scheduled = await metrics_scheduler.mark_dirty(current_user.id, full=full)
+        q = await db.execute(
+            select(BusinessMetrics)
+            .where(BusinessMetrics.user_id == current_user.id)
+            .order_by(BusinessMetrics.period_start.desc())
+            .limit(1)
+        )
+        metrics = q.scalars().first()
+
         return {
-            "status": "success",
-            "message": "Business metrics updated successfully",
-            "metrics": _row_to_dict(metrics)
+            "status": "queued",
+            "message": "Business metrics update scheduled" if scheduled else "Business metrics update already pending",
+            "metrics": _row_to_dict(metrics) if metrics else None
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to update metrics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to schedule metrics update: {str(e)}")
@@ -3,15 +3,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status as http_status
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from uuid import UUID
 from sqlalchemy import select, and_, func, or_, String, cast
 from app.database import get_db
-from app.models.user import User
 from app.models.transaction import Transaction
-from app.core.auth import get_current_user
+from app.core.auth import Principal, get_current_principal
 import logging
 from datetime import datetime, timedelta
 from app.schemas import payments as schemas
+from app.services.fx import FxConversion, has_rates
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -41,7 +42,7 @@ async def get_transactions(
     limit: int = Query(10, ge=1, le=100),
     status: str = Query('all'),
     search: str = Query(''),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Fetches a paginated list of transactions for the current user."""
@@ -96,33 +97,39 @@ async def get_transactions(
 @router.get("/transactions/summary")
 async def get_payment_summary(
     days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_user),
+    currency: Optional[str] = Query(None, min_length=3, max_length=3, description="Reporting currency"),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get payment summary for the specified number of days."""
+    """Get payment summary for the specified number of days, with revenue in one reporting currency."""
+    if currency and not await has_rates(db, currency):
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail=f"No exchange rates for currency {currency.upper()}"
+        )
     try:
         start_date = datetime.utcnow() - timedelta(days=days)
 
-        # DEFINITIVE FIX: Use the user ID as a string, as required by the database schema.
-        base_query = (
-            select(Transaction)
-            .filter(Transaction.user_id == str(current_user.id))
-            .filter(Transaction.created_at >= start_date)
-        )
-
-        result = await db.execute(base_query)
-        transactions = result.scalars().all()
-
-        total_transactions = len(transactions)
-        
         successful_statuses = ["completed", "succeeded", "successful"]
-        completed_transactions = [t for t in transactions if t.status in successful_statuses]
-        failed_transactions = [t for t in transactions if t.status == 'failed']
-        
-        completed_count = len(completed_transactions)
-        failed_count = len(failed_transactions)
-        
-        total_revenue = sum(t.amount for t in completed_transactions)
+        completed = Transaction.status.in_(successful_statuses)
+        fx = FxConversion(currency)
+        stmt = fx.join(
+            select(
+                func.count(Transaction.id),
+                func.count(Transaction.id).filter(completed),
+                func.count(Transaction.id).filter(Transaction.status == 'failed'),
+                func.coalesce(func.sum(fx.amount).filter(completed), 0),
+                func.count(Transaction.id).filter(completed, fx.unconverted),
+            )
+            .select_from(Transaction)
+            .where(Transaction.user_id == current_user.id, Transaction.created_at >= start_date)
+        )
+        total_transactions, completed_count, failed_count, total_revenue, unconverted_count = (await db.execute(stmt)).one()
+        if unconverted_count:
+            logger.warning(
+                f"Revenue for user {current_user.id} leaves out {unconverted_count} transactions "
+                f"in currencies without FX rates"
+            )
 
         total_finished_transactions = completed_count + failed_count
         success_rate = (completed_count / total_finished_transactions) if total_finished_transactions > 0 else 0
@@ -130,6 +137,8 @@ async def get_payment_summary(
         return {
             "total_transactions": total_transactions,
             "total_revenue": float(total_revenue),
+            "currency": fx.reporting_currency,
+            "unconverted_transactions": unconverted_count,
             "completed_transactions": completed_count,
             "failed_transactions": failed_count,
             "success_rate": success_rate,
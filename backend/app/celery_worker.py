@@ -3,15 +3,18 @@ Celery Worker Configuration for Finance Platform
 Handles background tasks for data synchronization, ML model training, and analytics processing
 """
 
+import asyncio
 import os
 import logging
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_init, worker_process_init
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List, Optional
 
 from app.core.config import settings
-from app.database import get_db
+from app.database import get_db, use_null_pool
+from app.redis_client import redis_client
 from app.services.data_sync import DataSyncService
 from app.services.analytics_engine import AnalyticsEngine
 from app.services.ai_agent import AIAgentService
@@ -30,6 +33,29 @@ celery_app = Celery(
     include=["app.celery_worker"]
 )
 
+
+@worker_init.connect
+@worker_process_init.connect
+def _configure_worker_database(**kwargs):
+    """Tasks run their async work under asyncio.run(), a new event loop each time."""
+    use_null_pool()
+
+
+def run_async(coro):
+    """
+    Run a task's coroutine on a new event loop. The shared Redis client's
+    connections belong to that loop, so they are closed before it ends and the
+    next task reconnects.
+    """
+    async def main():
+        try:
+            return await coro
+        finally:
+            await redis_client.close()
+
+    return asyncio.run(main())
+
+
 # Celery configuration
 celery_app.conf.update(
     task_serializer="json",
@@ -49,7 +75,16 @@ celery_app.conf.update(
         "generate_analytics": {"queue": "analytics"},
         "train_ml_model": {"queue": "ml_processing"},
         "send_notifications": {"queue": "notifications"},
-        "process_ai_insights": {"queue": "ai_processing"}
+        "process_ai_insights": {"queue": "ai_processing"},
+        "ingest_telco_statements": {"queue": "data_sync"},
+        "score_merchants": {"queue": "analytics"},
+        "schedule_batch_scoring": {"queue": "analytics"},
+        "generate_merchant_offers": {"queue": "analytics"},
+        "process_loan_application": {"queue": "loan_scoring"},
+        "recompute_business_metrics": {"queue": "analytics"},
+        "precompute_revenue_forecasts": {"queue": "ml_processing"},
+        "schedule_revenue_forecasts": {"queue": "ml_processing"},
+        "generate_transaction_insights": {"queue": "ml_processing"}
     },
     # Periodic tasks
     beat_schedule={
@@ -80,6 +115,18 @@ celery_app.conf.update(
         "retrain-ml-models": {
             "task": "train_ml_model",
             "schedule": crontab(hour=3, minute=0, day_of_week=0),  # Weekly on Sunday at 3 AM
+        },
+        "nightly-credit-scoring": {
+            "task": "schedule_batch_scoring",
+            "schedule": crontab(hour=1, minute=30),  # Daily at 1:30 AM, after daily analytics
+        },
+        "nightly-revenue-forecasts": {
+            "task": "schedule_revenue_forecasts",
+            "schedule": crontab(hour=0, minute=30),  # Daily at 0:30 AM, once yesterday is complete
+        },
+        "batch-transaction-insights": {
+            "task": "generate_transaction_insights",
+            "schedule": crontab(minute="*/15"),  # Every 15 minutes, from the last checkpoint
         }
     }
 )
@@ -167,40 +214,42 @@ def generate_analytics(self, period: str, user_id: Optional[int] = None) -> Dict
         raise self.retry(exc=exc)
 
 
-@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 1, "countdown": 300})
-def train_ml_model(self, model_type: str = "default") -> Dict[str, Any]:
+@celery_app.task(name="train_ml_model", bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 1, "countdown": 300})
+def train_ml_model(
+    self,
+    model_type: str = "default",
+    tenant_id: Optional[str] = None,
+    full_refresh: bool = False
+) -> Dict[str, Any]:
     """
     Train or retrain machine learning models
     
     Args:
-        model_type: Type of model to train ('default', 'fraud_detection', 'recommendation')
+        model_type: Registry name of the model to train ('default' is the revenue forecaster)
+        tenant_id: Merchant to train a per-merchant model for (global model if omitted)
+        full_refresh: Rebuild the training feature cache instead of appending new days
         
     Returns:
         Dict containing training results
     """
-    try:
-        logger.info(f"Starting ML model training for type: {model_type}")
-        
-        db = next(get_db())
-        
-        # Import ML training module
-        from app.ml.training import MLTrainer
-        
-        trainer = MLTrainer(db)
-        result = trainer.train_model(model_type)
-        
-        logger.info(f"ML model training completed for {model_type}")
-        return {
-            "status": "success",
-            "model_type": model_type,
-            "accuracy": result.get("accuracy", 0),
-            "training_time": result.get("training_time", 0),
-            "model_version": result.get("model_version", "unknown")
-        }
-        
-    except Exception as exc:
-        logger.error(f"ML model training failed for {model_type}: {str(exc)}")
-        raise self.retry(exc=exc)
+    from app.ml.forecasting import REVENUE_MODEL
+    from app.ml.training import MLModelTrainer
+
+    model_name = REVENUE_MODEL if model_type == "default" else model_type
+    logger.info(f"Starting ML model training for type: {model_name}")
+    
+    trainer = MLModelTrainer(model_name=model_name, tenant_id=tenant_id)
+    if not run_async(trainer.run_training_pipeline(full_refresh=full_refresh)):
+        raise RuntimeError(f"ML model training failed for {model_name}")
+    
+    logger.info(f"ML model training completed for {model_name}")
+    return {
+        "status": "success",
+        "model_type": model_name,
+        "metrics": trainer.metrics,
+        "samples": trainer.n_samples,
+        "model_version": trainer.version
+    }
 
 
 @celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 2, "countdown": 60})
@@ -394,6 +443,237 @@ def monitor_task_health(self) -> Dict[str, Any]:
         }
 
 
+@celery_app.task(name="ingest_telco_statements", bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 60})
+def ingest_telco_statements(self, user_id: str, days: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Import MTN/Airtel statement history for all verified wallets of a user
+    
+    Args:
+        user_id: User whose telco connections should be ingested
+        days: Look-back in days (defaults to TELCO_HISTORY_DAYS)
+        
+    Returns:
+        Dict containing ingestion statistics
+    """
+    from datetime import datetime, timedelta
+    from app.database import get_session_maker
+    from app.services.telco_ingestion import TelcoIngestionService
+
+    async def run():
+        async with get_session_maker()() as db:
+            from_date = datetime.utcnow() - timedelta(days=days) if days else None
+            return await TelcoIngestionService(db).ingest_user(user_id, from_date=from_date)
+
+    result = run_async(run())
+    logger.info(f"Telco ingestion completed for user {user_id}: {result.records_upserted} records")
+    return {
+        "status": "success" if not result.errors else "partial",
+        "user_id": user_id,
+        "wallets": result.wallets,
+        "windows_fetched": result.windows_fetched,
+        "records_upserted": result.records_upserted,
+        "errors": result.errors[:20]
+    }
+
+
+@celery_app.task(name="score_merchants", bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 2, "countdown": 120})
+def score_merchants(
+    self,
+    shard_index: int = 0,
+    shard_count: int = 1,
+    user_ids: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Batch-score merchants and persist the scores on their latest business metrics
+    
+    Args:
+        shard_index: Shard of users to score (0-based)
+        shard_count: Total number of shards
+        user_ids: Optional explicit users to score instead of a shard
+        
+    Returns:
+        Dict containing the number of users scored
+    """
+    from app.database import get_session_maker
+    from app.services.credit_score import CreditScoreService
+
+    async def run():
+        async with get_session_maker()() as db:
+            return await CreditScoreService(db).score_all(shard_index, shard_count, user_ids)
+
+    scored = run_async(run())
+    return {"status": "success", "shard": f"{shard_index}/{shard_count}", "scored": scored}
+
+
+@celery_app.task(name="generate_merchant_offers", bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 2, "countdown": 120})
+def generate_merchant_offers(self, user_ids: List[str]) -> Dict[str, Any]:
+    """
+    Materialize loan offers for a batch of merchants from their persisted credit scores
+    
+    Args:
+        user_ids: Users to generate offers for
+        
+    Returns:
+        Dict containing the number of users and offers materialized
+    """
+    from app.database import get_session_maker
+    from app.services.offer_materializer import generate_offers, latest_scores
+
+    async def run():
+        async with get_session_maker()() as db:
+            return await generate_offers(db, await latest_scores(db, user_ids))
+
+    offers = run_async(run())
+    return {"status": "success", "users": len(offers), "offers": sum(map(len, offers.values()))}
+
+
+@celery_app.task(name="process_loan_application", bind=True, acks_late=True, max_retries=3)
+def process_loan_application(self, application_id: str) -> Dict[str, Any]:
+    """
+    Score a submitted loan application, generate its offers and notify the applicant
+    
+    Safe to deliver more than once: the application is claimed atomically, so a
+    duplicate or retried task for an application already processed is a no-op.
+    
+    Args:
+        application_id: Loan application to process
+        
+    Returns:
+        Dict containing the decision, or status "skipped"
+    """
+    from app.database import get_session_maker
+    from app.services.financing import FinancingService
+
+    async def run():
+        async with get_session_maker()() as db:
+            service = FinancingService(db)
+            try:
+                return await service.process_application(application_id)
+            except Exception:
+                await service.release_application(application_id, failed=self.request.retries >= self.max_retries)
+                raise
+
+    try:
+        summary = run_async(run())
+    except Exception as exc:
+        logger.error(f"Loan application {application_id} processing failed: {str(exc)}")
+        raise self.retry(exc=exc, countdown=30 * (self.request.retries + 1))
+
+    if summary is None:
+        return {"status": "skipped", "application_id": application_id}
+
+    send_notifications.delay(summary["user_id"], "in_app", {
+        "event": "loan_application_processed",
+        "application_id": application_id,
+        "status": summary["status"],
+        "offer_ids": summary["offer_ids"],
+    })
+    return {"status": "success", **summary}
+
+
+@celery_app.task(name="recompute_business_metrics", bind=True, max_retries=3)
+def recompute_business_metrics(self, user_id: str) -> Dict[str, Any]:
+    """
+    Recompute a user's business metrics once for a burst of dirty marks
+    
+    Args:
+        user_id: User whose metrics were marked dirty
+        
+    Returns:
+        Dict containing the recompute status
+    """
+    from app.database import get_session_maker
+    from app.services.analytics_engine import AnalyticsEngine
+    from app.services.metrics_scheduler import metrics_scheduler
+
+    async def run():
+        full = await metrics_scheduler.take(user_id)
+        if full is None:
+            await metrics_scheduler.finish(user_id)
+            return "skipped"
+        try:
+            async with get_session_maker()() as db:
+                await AnalyticsEngine(db, AIAgentService()).update_business_metrics(user_id, full=full)
+        except Exception:
+            await metrics_scheduler.restore(user_id, full)
+            if self.request.retries >= self.max_retries:
+                await metrics_scheduler.finish(user_id)
+            raise
+        await metrics_scheduler.finish(user_id)
+        return "success"
+
+    try:
+        status = run_async(run())
+    except Exception as exc:
+        logger.error(f"Metrics recompute failed for user {user_id}: {str(exc)}")
+        raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1))
+    return {"status": status, "user_id": user_id}
+
+
+@celery_app.task(name="precompute_revenue_forecasts", bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 2, "countdown": 120})
+def precompute_revenue_forecasts(self, shard_index: int = 0, shard_count: int = 1) -> Dict[str, Any]:
+    """
+    Forecast revenue for every merchant in a shard and cache the forecasts
+    
+    Args:
+        shard_index: Shard of users to forecast (0-based)
+        shard_count: Total number of shards
+        
+    Returns:
+        Dict containing the number of merchants forecast
+    """
+    from app.database import get_session_maker
+    from app.services.forecasting import RevenueForecastService
+
+    async def run():
+        async with get_session_maker()() as db:
+            return await RevenueForecastService(db).precompute(shard_index, shard_count)
+
+    forecast = run_async(run())
+    return {"status": "success", "shard": f"{shard_index}/{shard_count}", "forecast": forecast}
+
+
+@celery_app.task(name="schedule_revenue_forecasts")
+def schedule_revenue_forecasts() -> Dict[str, Any]:
+    """Fan the nightly forecast out into FORECAST_SHARDS precompute_revenue_forecasts tasks"""
+    shard_count = max(1, settings.FORECAST_SHARDS)
+    for shard_index in range(shard_count):
+        precompute_revenue_forecasts.delay(shard_index=shard_index, shard_count=shard_count)
+    return {"status": "scheduled", "shards": shard_count}
+
+
+@celery_app.task(name="generate_transaction_insights", bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 2, "countdown": 120})
+def generate_transaction_insights(self, max_batches: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Score transactions added or changed since the last checkpoint and store
+    risk and trend insights
+    
+    Args:
+        max_batches: Batches to process in this run (INSIGHT_MAX_BATCHES_PER_RUN if omitted)
+        
+    Returns:
+        Dict containing the number of transactions scored
+    """
+    from app.database import get_session_maker
+    from app.ml.batch_inference import BatchInferenceJob
+
+    async def run():
+        async with get_session_maker()() as db:
+            return await BatchInferenceJob(db).run(max_batches or settings.INSIGHT_MAX_BATCHES_PER_RUN)
+
+    scored = run_async(run())
+    return {"status": "success", "scored": scored}
+
+
+@celery_app.task(name="schedule_batch_scoring")
+def schedule_batch_scoring() -> Dict[str, Any]:
+    """Fan nightly scoring out into CREDIT_SCORE_SHARDS score_merchants tasks"""
+    shard_count = max(1, settings.CREDIT_SCORE_SHARDS)
+    for shard_index in range(shard_count):
+        score_merchants.delay(shard_index=shard_index, shard_count=shard_count)
+    return {"status": "scheduled", "shards": shard_count}
+
+
 if __name__ == "__main__":
     # Start worker with specific configuration
     celery_app.start()
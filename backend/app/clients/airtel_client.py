@@ -2,10 +2,26 @@ import uuid
 from datetime import datetime, timedelta
 import random
 
+from app.core.config import settings
+from app.clients.simulator import SimulatorSession
+
 class AirtelClient:
     """
-    Mock client for Airtel Money API
+    Mock client for Airtel Money API.
+    Statements come from the telco simulator when TELCO_SIMULATOR_URL is set.
     """
+
+    def __init__(self, simulator_url: str = None):
+        simulator_url = simulator_url or settings.TELCO_SIMULATOR_URL
+        self.simulator = SimulatorSession(
+            simulator_url,
+            "/auth/oauth2/token",
+            {
+                "client_id": settings.AIRTEL_CLIENT_ID,
+                "client_secret": settings.AIRTEL_CLIENT_SECRET,
+                "grant_type": "client_credentials",
+            },
+        ) if simulator_url else None
     
     async def request_otp(self, wallet_number: str) -> str:
         return "otp_sent"
@@ -16,7 +32,15 @@ class AirtelClient:
         return False
 
     async def fetch_statement(self, wallet_number: str, from_date: str, to_date: str):
-        # Generate some random transactions (Different structure than MTN to test normalization)
+        if self.simulator:
+            return await self.simulator.fetch_statement(
+                f"/merchant/v1/statement/{wallet_number}",
+                {"from_date": from_date, "to_date": to_date},
+            )
+
+        # Generate mock transactions (Different structure than MTN to test normalization),
+        # seeded so the same request returns the same statement
+        rng = random.Random(f"airtel:{wallet_number}:{from_date}:{to_date}")
         records = []
         start = datetime.fromisoformat(from_date)
         end = datetime.fromisoformat(to_date)
@@ -25,17 +49,17 @@ class AirtelClient:
         count = min(days * 2, 20)
         
         for i in range(count):
-            tx_date = start + timedelta(days=random.randint(0, days), hours=random.randint(0, 23))
-            amount = random.randint(20, 3000)
+            tx_date = start + timedelta(days=rng.randint(0, days), hours=rng.randint(0, 23))
+            amount = rng.randint(20, 3000)
             
             records.append({
-                "txn_id": str(uuid.uuid4()),
+                "txn_id": str(uuid.UUID(int=rng.getrandbits(128))),
                 "txn_amount": amount,
                 "txn_currency": "ZMW",
                 "narrative": "Airtel Money Tx",
                 "txn_status": "TS", # Transaction Success
                 "txn_date": tx_date.strftime("%Y-%m-%d %H:%M:%S"),
-                "txn_type": random.choice(["C2B", "B2B", "P2P"])
+                "txn_type": rng.choice(["C2B", "B2B", "P2P"])
             })
             
         return records
@@ -2,10 +2,18 @@ import uuid
 from datetime import datetime, timedelta
 import random
 
+from app.core.config import settings
+from app.clients.simulator import SimulatorSession
+
 class MTNClient:
     """
-    Mock client for MTN Mobile Money API
+    Mock client for MTN Mobile Money API.
+    Statements come from the telco simulator when TELCO_SIMULATOR_URL is set.
     """
+
+    def __init__(self, simulator_url: str = None):
+        simulator_url = simulator_url or settings.TELCO_SIMULATOR_URL
+        self.simulator = SimulatorSession(simulator_url, "/collection/token/") if simulator_url else None
     
     async def request_otp(self, wallet_number: str) -> str:
         """
@@ -26,9 +34,16 @@ class MTNClient:
 
     async def fetch_statement(self, wallet_number: str, from_date: str, to_date: str):
         """
-        Return mock statement data.
+        Return statement data for the wallet between the two ISO dates.
         """
-        # Generate some random transactions
+        if self.simulator:
+            return await self.simulator.fetch_statement(
+                f"/collection/v1_0/statement/{wallet_number}",
+                {"fromDate": from_date, "toDate": to_date},
+            )
+
+        # Generate mock transactions, seeded so the same request returns the same statement
+        rng = random.Random(f"mtn:{wallet_number}:{from_date}:{to_date}")
         records = []
         start = datetime.fromisoformat(from_date)
         end = datetime.fromisoformat(to_date)
@@ -38,12 +53,12 @@ class MTNClient:
         count = min(days * 2, 20) # Approx 2 per day, max 20
         
         for i in range(count):
-            tx_date = start + timedelta(days=random.randint(0, days), hours=random.randint(0, 23))
-            amount = random.randint(50, 5000)
-            is_credit = random.choice([True, False])
+            tx_date = start + timedelta(days=rng.randint(0, days), hours=rng.randint(0, 23))
+            amount = rng.randint(50, 5000)
+            is_credit = rng.choice([True, False])
             
             records.append({
-                "externalId": str(uuid.uuid4()),
+                "externalId": str(uuid.UUID(int=rng.getrandbits(128))),
                 "amount": str(amount),
                 "currency": "ZMW",
                 "payerMessage": "Payment Received" if is_credit else "Payment Sent",
@@ -0,0 +1,74 @@
+"""
+HTTP plumbing shared by the telco clients when TELCO_SIMULATOR_URL is set.
+Handles the bearer token, statement pagination and 429 back-off.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_RATE_LIMIT_RETRIES = 5
+
+
+class SimulatorSession:
+    def __init__(self, base_url: str, token_path: str, token_request: Optional[Dict[str, Any]] = None):
+        self.base_url = base_url.rstrip("/")
+        self.token_path = token_path
+        self.token_request = token_request or {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._token: Optional[str] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=30.0)
+        return self._client
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            response = await self._http().request(method, path, **kwargs)
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+            delay = float(response.headers.get("Retry-After", 1)) * (attempt + 1)
+            await asyncio.sleep(delay)
+        return response
+
+    async def token(self) -> str:
+        if self._token is None:
+            response = await self._request("POST", self.token_path, json=self.token_request)
+            response.raise_for_status()
+            self._token = response.json()["access_token"]
+        return self._token
+
+    async def fetch_statement(self, path: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Follow next_offset until the statement window is exhausted."""
+        records: List[Dict[str, Any]] = []
+        offset: Optional[int] = 0
+        reauthenticated = False
+        while offset is not None:
+            headers = {"Authorization": f"Bearer {await self.token()}"}
+            response = await self._request(
+                "GET", path,
+                params={**params, "offset": offset, "limit": settings.TELCO_STATEMENT_PAGE_SIZE},
+                headers=headers,
+            )
+            if response.status_code == 401 and not reauthenticated:
+                # Token expired (or the simulator restarted); fetch a new one and retry the page, once.
+                self._token = None
+                reauthenticated = True
+                continue
+            response.raise_for_status()
+            page = response.json()
+            records.extend(page.get("data", []))
+            offset = page.get("next_offset")
+        return records
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -2,27 +2,42 @@
 """
 Core authentication and security functions for JWT token management,
 password hashing, and user authentication.
+
+This is the one auth module: app.core.security and app.api.deps re-export
+from here. Access tokens are verified by TokenVerifier without python-jose
+or a database round trip (HMAC with a pre-keyed digest, plus an LRU of
+tokens already verified). Routes that only need the caller's id depend on
+get_current_principal; get_current_user additionally loads the User row.
+A principal is trusted for the token's lifetime, so deactivating a user
+takes effect on claims-only routes when their access token expires.
 """
 
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-import os
 
 from app.database import get_db
 from app.models.user import User
 from app.schemas.auth import TokenData # Ensure this schema is defined for token data
 from app.core.config import settings
+from app.core.passwords import PasswordServiceBusy, password_service
 
 # --- Configuration ---
 SECRET_KEY = settings.SECRET_KEY
-ALGORITHM = "HS256"
+ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 
@@ -33,9 +48,11 @@ REFRESH_TOKEN_EXPIRE_MINUTES = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login-json") # Update tokenUrl if needed
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = password_service.context
 
 # --- Password Hashing Functions ---
+# The synchronous helpers block for the full bcrypt cost; request handlers
+# use hash_password / authenticate_user, which run in the hashing pool.
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -44,6 +61,136 @@ def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
 
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in requests, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+async def hash_password(password: str) -> str:
+    """Hash a password off the event loop."""
+    try:
+        return await password_service.hash(password)
+    except PasswordServiceBusy as e:
+        raise _hashing_busy() from e
+
+# --- Token Verification ---
+_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+class TokenVerifier:
+    """
+    Verifies JWTs signed with the application key. HMAC algorithms are checked
+    directly against a digest keyed once at startup; other algorithms go
+    through python-jose. Verified claims are kept in an LRU keyed by the token
+    (which includes its signature) and re-checked for expiry on every hit.
+    """
+
+    def __init__(
+        self,
+        secret: str = SECRET_KEY,
+        algorithm: str = ALGORITHM,
+        cache_size: int = settings.AUTH_TOKEN_CACHE_SIZE,
+    ):
+        self.secret = secret
+        self.algorithm = algorithm
+        digest = _HMAC_DIGESTS.get(algorithm)
+        self._mac = hmac.new(secret.encode(), digestmod=digest) if digest else None
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _decode_hmac(self, token: str) -> Dict[str, Any]:
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+            header = json.loads(_b64decode(header_segment))
+            signature = _b64decode(signature_segment)
+        except (ValueError, TypeError) as e:
+            raise JWTError("Malformed token") from e
+        if not isinstance(header, dict):
+            raise JWTError("Malformed token header")
+        if header.get("alg") != self.algorithm:
+            raise JWTError("Unexpected signing algorithm")
+        mac = self._mac.copy()
+        mac.update(f"{header_segment}.{payload_segment}".encode("ascii"))
+        if not hmac.compare_digest(mac.digest(), signature):
+            raise JWTError("Signature verification failed")
+        try:
+            payload = json.loads(_b64decode(payload_segment))
+        except ValueError as e:
+            raise JWTError("Malformed token payload") from e
+        if not isinstance(payload, dict):
+            raise JWTError("Malformed token payload")
+        return payload
+
+    @staticmethod
+    def _check_times(payload: Dict[str, Any]) -> None:
+        now = time.time()
+        if "exp" in payload and now >= float(payload["exp"]):
+            raise JWTError("Signature has expired")
+        if "nbf" in payload and now < float(payload["nbf"]):
+            raise JWTError("The token is not yet valid")
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Claims of a valid token; raises JWTError otherwise."""
+        with self._lock:
+            payload = self._cache.get(token)
+            if payload is not None:
+                self._cache.move_to_end(token)
+        if payload is None:
+            if self._mac is None:
+                payload = jwt.decode(token, self.secret, algorithms=[self.algorithm])
+            else:
+                payload = self._decode_hmac(token)
+        self._check_times(payload)
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[token] = payload
+                self._cache.move_to_end(token)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return payload
+
+
+token_verifier = TokenVerifier()
+
+
+@dataclass
+class Principal:
+    """
+    The caller as asserted by a verified access token. The User row is only
+    read from the database when load_user is awaited.
+    """
+    user_id: str
+    claims: Dict[str, Any] = field(default_factory=dict)
+    _user: Optional[User] = field(default=None, repr=False)
+
+    @property
+    def id(self) -> uuid.UUID:
+        return uuid.UUID(self.user_id)
+
+    async def load_user(self, db: AsyncSession) -> User:
+        if self._user is None:
+            result = await db.execute(select(User).where(User.id == self.id))
+            user = result.scalar_one_or_none()
+            if user is None:
+                raise _credentials_exception()
+            self._user = user
+        return self._user
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 # --- JWT Token Functions ---
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token with an 'access' type claim."""
@@ -81,51 +228,10 @@ def verify_jwt_token(token: str) -> Dict[str, Any]:
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return token_verifier.decode(token)
     except JWTError as e:
         raise credentials_exception from e
 
-def verify_access_token(token: str, db: Session) -> str:
-    """
-    Verifies an access token, checks its type, and returns the user ID (sub).
-    Raises HTTPException if the token is invalid, expired, not an access token,
-    or if the associated user is not found/active.
-    """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Invalid access token",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = verify_jwt_token(token) # Reuse generic verification
-        
-        # Ensure it's an access token
-        token_type = payload.get("type")
-        if token_type != "access":
-            raise credentials_exception 
-
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        
-        # Optional: Check if the user associated with the token exists and is active
-        # This adds an extra layer of security and ensures the token is tied to a valid user.
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user or not user.is_active:
-            raise credentials_exception
-
-        return user_id
-    except HTTPException: # Re-raise HTTPExceptions from verify_jwt_token or our checks
-        raise
-    except Exception as e:
-        # Catch any other unexpected errors during token verification
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An error occurred during access token verification.",
-        ) from e
-
-
 async def verify_refresh_token(token: str, db: AsyncSession) -> Dict[str, Any]:
     """
     Verifies a refresh token, checks its type, and returns the payload dictionary.
@@ -171,36 +277,38 @@ async def authenticate_user(db: AsyncSession, email: str, password: str):
     """Authenticate a user with email and password."""
     result = await db.execute(select(User).where(User.email == email))
     user = result.scalar_one_or_none()
-    if not user:
-        return False
-    if not verify_password(password, user.hashed_password):
+    try:
+        valid, new_hash = await password_service.verify_and_update(password, user.hashed_password if user else None)
+    except PasswordServiceBusy as e:
+        raise _hashing_busy() from e
+    if not user or not valid:
         return False
+    if new_hash:
+        # Hashed with outdated parameters; saved with the caller's next commit.
+        user.hashed_password = new_hash
     return user
 
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Caller of a request from its access token alone, without a database lookup."""
+    try:
+        payload = token_verifier.decode(token)
+    except JWTError as e:
+        raise _credentials_exception() from e
+    user_id = payload.get("sub")
+    if payload.get("type") != "access" or not user_id:
+        raise _credentials_exception()
+    try:
+        uuid.UUID(str(user_id))
+    except ValueError as e:
+        raise _credentials_exception() from e
+    return Principal(user_id=str(user_id), claims=payload)
+
 async def get_current_user(
-    token: str = Depends(oauth2_scheme),
+    principal: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ) -> User:
-    """Get current authenticated user from JWT access token."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-        
-    try:
-        payload = verify_jwt_token(token)
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError as e:
-        raise credentials_exception from e
-    
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    if user is None:
-        raise credentials_exception
-    return user
+    """Get current authenticated user (the full User row) from JWT access token."""
+    return await principal.load_user(db)
 
 async def create_demo_user(db: AsyncSession):
     """Create or verify demo user exists"""
@@ -214,7 +322,7 @@ async def create_demo_user(db: AsyncSession):
         return demo_user
 
     # Create demo user with correct field names
-    hashed_password = get_password_hash("demo123")
+    hashed_password = await hash_password("demo123")
     demo_user = User(
         email="demo@financeai.com",
         first_name="Demo",
@@ -84,10 +84,128 @@ class Settings(BaseSettings):
     AIRTEL_CLIENT_SECRET: str = "placeholder_key"
     MTN_API_KEY: str = "placeholder_key"
 
+    # --- Telco Statement Ingestion ---
+    TELCO_HISTORY_DAYS: int = 90  # Look-back of a full history import
+    TELCO_STATEMENT_WINDOW_DAYS: int = 7  # Each statement request covers one window
+    TELCO_FETCH_CONCURRENCY: int = 8  # Statement requests in flight per ingestion run
+    TELCO_UPSERT_BATCH_SIZE: int = 500
+    TELCO_STATEMENT_PAGE_SIZE: int = 1000
+    # Base URL of scripts/telco_simulator.py; when set, telco clients and the
+    # payment gateway talk to it instead of the mocks / provider sandboxes.
+    TELCO_SIMULATOR_URL: Optional[str] = None
+
+    # --- Logging & Instrumentation ---
+    LOG_LEVEL: str = "INFO"
+    # Fraction of requests logged by the request middleware (0.0 - 1.0).
+    REQUEST_LOG_SAMPLE_RATE: float = 0.01
+    # Requests slower than this, or answered with a 5xx, are always logged.
+    REQUEST_LOG_SLOW_MS: int = 1000
+    METRICS_ENABLED: bool = True
+
+    # --- AI Chat Conversation History ---
+    # Turns kept verbatim per conversation; older turns are folded into a summary.
+    CONVERSATION_WINDOW_TURNS: int = 20
+    CONVERSATION_TTL_SECONDS: int = 60 * 60 * 24 * 7  # 7 days of inactivity
+    CONVERSATION_SUMMARY_MAX_CHARS: int = 2000
+
+    # --- Credit Scoring ---
+    # Persisted scores older than this are recomputed on read.
+    CREDIT_SCORE_MAX_AGE_HOURS: int = 26
+    CREDIT_SCORE_BATCH_SIZE: int = 1000
+    CREDIT_SCORE_SHARDS: int = 1  # Nightly batch scoring fans out into this many tasks
+    CREDIT_SCORE_CACHE_TTL_SECONDS: int = 60 * 60 * 24
+    CREDIT_SCORE_LOCAL_CACHE_SIZE: int = 2048  # In-process entries in front of Redis
+
+    # --- Currency Normalization ---
+    # fx_rates are quoted in FX_BASE_CURRENCY; aggregates are reported in FX_REPORTING_CURRENCY.
+    FX_BASE_CURRENCY: str = "ZMW"
+    FX_REPORTING_CURRENCY: str = "ZMW"
+    FX_RATES_FILE: Optional[str] = None  # CSV/JSON loaded by scripts/load_fx_rates.py
+    FX_CACHE_TTL_SECONDS: int = 60 * 60
+
+    # --- Business Metrics Recomputation ---
+    # Writes within this window of the first one are folded into a single recompute.
+    METRICS_RECOMPUTE_DEBOUNCE_SECONDS: int = 30
+    METRICS_RECOMPUTE_SLOT_TTL_SECONDS: int = 30 * 60
+    # Refreshes re-scan this far behind the watermark for rows committed out of updated_at order.
+    METRICS_SETTLE_SECONDS: int = 300
+
+    # --- Loan Application Processing ---
+    # A worker's claim on an application is considered abandoned after this long.
+    LOAN_SCORING_CLAIM_TIMEOUT_SECONDS: int = 600
+
+    # --- ML Models ---
+    ML_MODEL_SAVE_PATH: str = "ml_models"
+    # Deserialized models kept in memory per process (LRU).
+    ML_MODEL_CACHE_SIZE: int = 32
+    # Artifacts at least this large are memory-mapped instead of read into the heap.
+    ML_MODEL_MMAP_MIN_BYTES: int = 50 * 1024 * 1024
+    # Daily training features cached on disk by app/ml/feature_store.py.
+    ML_TRAINING_CACHE_PATH: str = "ml_cache"
+    ML_TRAINING_CHUNK_ROWS: int = 100_000
+    # Days fetched when the cache is first built.
+    ML_TRAINING_HISTORY_DAYS: int = 730
+    # Parallel fits during model search; -1 uses every core available to the worker.
+    ML_TRAINING_N_JOBS: int = -1
+    # Rolling-origin cross-validation: the last ML_CV_SPLITS blocks of ML_CV_TEST_DAYS.
+    ML_CV_SPLITS: int = 3
+    ML_CV_TEST_DAYS: int = 28
+    # Most recent settled transactions the risk model is trained on.
+    ML_RISK_TRAINING_MAX_ROWS: int = 500_000
+
+    # --- Revenue Forecasting ---
+    FORECAST_MAX_HORIZON_DAYS: int = 14
+    # Central coverage of the prediction intervals.
+    FORECAST_INTERVAL_COVERAGE: float = 0.8
+    # Merchants forecast per batched predict call in the nightly precompute.
+    FORECAST_BATCH_SIZE: int = 5000
+    FORECAST_CACHE_TTL_SECONDS: int = 26 * 60 * 60
+    FORECAST_SHARDS: int = 1
+
+    # --- Anomaly Detection ---
+    # |z| of a log amount beyond which a baseline counts as exceeded.
+    ANOMALY_Z_THRESHOLD: float = 3.5
+    # Transactions per merchant and flow before scoring starts.
+    ANOMALY_MIN_HISTORY: int = 30
+    # Transactions in a weekday/hour bucket before it is used as a baseline.
+    ANOMALY_MIN_BUCKET: int = 8
+    ANOMALY_EWMA_ALPHA: float = 0.05
+    # Flagged transactions older than this are recorded without a notification.
+    ANOMALY_ALERT_WINDOW_HOURS: int = 24
+    ANOMALY_STATS_TTL_SECONDS: int = 90 * 24 * 60 * 60
+
+    # --- Batch Insights ---
+    # Transactions scored per predict call and committed per checkpoint.
+    INSIGHT_BATCH_SIZE: int = 5000
+    INSIGHT_MAX_BATCHES_PER_RUN: int = 200
+    # Transactions updated more recently than this wait for the next run.
+    INSIGHT_SETTLE_SECONDS: int = 300
+    INSIGHT_HIGH_RISK_THRESHOLD: float = 0.7
+    INSIGHT_TREND_DAYS: int = 7
+
+    # --- AI Insights ---
+    # Insight generations per user per window.
+    INSIGHTS_RATE_LIMIT: int = 20
+    INSIGHTS_RATE_LIMIT_WINDOW_SECONDS: int = 60 * 60
+    INSIGHTS_TASK_TTL_SECONDS: int = 60 * 60
+    # Usage entries are written in bulk once this many are buffered, or after this long.
+    INSIGHTS_USAGE_FLUSH_SIZE: int = 200
+    INSIGHTS_USAGE_FLUSH_SECONDS: float = 2.0
+    INSIGHTS_USAGE_LOG_TTL_SECONDS: int = 7 * 24 * 60 * 60
+
+    # --- Password Hashing ---
+    # bcrypt cost; stored hashes with another cost are replaced at the next login.
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    # Threads hashing passwords per process, and calls allowed to wait for them.
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
     # --- Access Token Settings ---
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7 # 7 days
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7 # 7 days
+    # Verified access tokens remembered per process (LRU); 0 disables.
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
 
 
     class Config:
@@ -0,0 +1,132 @@
+# backend/app/core/instrumentation.py
+"""
+Lightweight in-process request instrumentation.
+
+Keeps per-route latency histograms, in-flight gauges and a per-request
+breakdown of time spent in the database, Redis and the AI agent as
+prometheus_client metrics, exposed by the /metrics endpoint.
+"""
+
+import contextvars
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+# Upper bounds (seconds) of the latency buckets.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75,
+    1.0, 2.5, 5.0, 7.5, 10.0, 30.0,
+)
+
+# Components whose time is attributed to the current request.
+COMPONENTS: Tuple[str, ...] = ("db", "redis", "agent", "password_hash")
+
+# Per-request accumulator of component time; None outside of a request.
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+class MetricsRegistry:
+    """Request metrics in their own CollectorRegistry (prometheus_client metrics are thread-safe)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.registry = CollectorRegistry(auto_describe=True)
+        self._in_flight = Gauge(
+            "http_requests_in_flight", "Requests currently being served.",
+            ["method"], registry=self.registry,
+        )
+        self._latency = Histogram(
+            "http_request_duration_seconds", "Request latency by route.",
+            ["method", "route"], buckets=buckets, registry=self.registry,
+        )
+        self._responses = Counter(
+            "http_responses", "Responses by route and status class.",
+            ["method", "route", "status"], registry=self.registry,
+        )
+        self._component_seconds = Counter(
+            "http_request_component_seconds", "Time spent per dependency while serving a route.",
+            ["route", "component"], registry=self.registry,
+        )
+
+    def request_started(self, method: str) -> None:
+        self._in_flight.labels(method).inc()
+
+    def request_finished(
+        self,
+        method: str,
+        route: str,
+        status_code: int,
+        duration: float,
+        components: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self._in_flight.labels(method).dec()
+        self._latency.labels(method, route).observe(duration)
+        self._responses.labels(method, route, f"{status_code // 100}xx").inc()
+        for component, seconds in (components or {}).items():
+            self._component_seconds.labels(route, component).inc(seconds)
+
+    def render(self) -> bytes:
+        """All metrics in the Prometheus text exposition format."""
+        return generate_latest(self.registry)
+
+
+registry = MetricsRegistry()
+
+
+def begin_request_timings() -> contextvars.Token:
+    """Start accumulating component time for the current request."""
+    return _request_timings.set({})
+
+
+def end_request_timings(token: contextvars.Token) -> Dict[str, float]:
+    """Stop accumulating and return the component breakdown of the request."""
+    timings = _request_timings.get() or {}
+    _request_timings.reset(token)
+    return timings
+
+
+def add_component_time(component: str, seconds: float) -> None:
+    """Attribute `seconds` to `component` for the current request, if any."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[component] = timings.get(component, 0.0) + seconds
+
+
+@contextmanager
+def track(component: str):
+    """Time a synchronous block and attribute it to `component`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_component_time(component, time.perf_counter() - start)
+
+
+@asynccontextmanager
+async def track_async(component: str):
+    """Time an awaited block and attribute it to `component`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_component_time(component, time.perf_counter() - start)
+
+
+def instrument_engine(engine) -> None:
+    """Attribute SQL execution time on `engine` to the "db" component."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start_time")
+        if starts:
+            add_component_time("db", time.perf_counter() - starts.pop())
@@ -15,6 +15,7 @@ import traceback
 import uuid
 import functools
 import asyncio
+import time
 
 from app.core.config import settings
 
@@ -385,15 +386,17 @@ class LoggerMixin:
 
 
 def log_function_call(func):
-    """Decorator to log function calls with parameters and execution time."""
-    @functools.wraps(func)
-    async def async_wrapper(*args, **kwargs):
-        logger = get_logger(func.__module__)
-        start_time = asyncio.get_event_loop().time() if asyncio.iscoroutinefunction(func) else time.time()
-        
+    """Decorator to log function calls with parameters and execution time.
+
+    The coroutine check is done once at decoration time, and the start/end
+    records are only built when DEBUG is enabled for the function's module,
+    so decorated hot paths cost a level check rather than two log writes.
+    """
+    logger = get_logger(func.__module__)
+
+    def _log_start(args, kwargs):
         # Log arguments if not too verbose and not sensitive
         log_kwargs = {k: v for k, v in kwargs.items() if k not in SecurityFilter.SENSITIVE_PATTERNS} # Basic redaction
-        
         logger.debug(
             f"Calling {func.__name__}",
             extra={
@@ -404,79 +407,60 @@ def log_function_call(func):
                 "event_type": "function_call_start"
             }
         )
+
+    def _log_end(execution_time):
+        logger.debug(
+            f"Completed {func.__name__}",
+            extra={
+                "function": func.__name__,
+                "execution_time_ms": round(execution_time * 1000, 2),
+                "success": True,
+                "event_type": "function_call_end"
+            }
+        )
+
+    def _log_error(e, execution_time):
+        logger.error(
+            f"Error in {func.__name__}: {str(e)}",
+            extra={
+                "function": func.__name__,
+                "execution_time_ms": round(execution_time * 1000, 2),
+                "error_type": type(e).__name__,
+                "success": False,
+                "event_type": "function_call_error"
+            },
+            exc_info=True
+        )
+
+    @functools.wraps(func)
+    async def async_wrapper(*args, **kwargs):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        start_time = time.perf_counter()
+        if debug:
+            _log_start(args, kwargs)
         try:
             result = await func(*args, **kwargs)
-            execution_time = (asyncio.get_event_loop().time() if asyncio.iscoroutinefunction(func) else time.time()) - start_time
-            logger.debug(
-                f"Completed {func.__name__}",
-                extra={
-                    "function": func.__name__,
-                    "execution_time_ms": round(execution_time * 1000, 2),
-                    "success": True,
-                    "event_type": "function_call_end"
-                }
-            )
-            return result
         except Exception as e:
-            execution_time = (asyncio.get_event_loop().time() if asyncio.iscoroutinefunction(func) else time.time()) - start_time
-            logger.error(
-                f"Error in {func.__name__}: {str(e)}",
-                extra={
-                    "function": func.__name__,
-                    "execution_time_ms": round(execution_time * 1000, 2),
-                    "error_type": type(e).__name__,
-                    "success": False,
-                    "event_type": "function_call_error"
-                },
-                exc_info=True
-            )
+            _log_error(e, time.perf_counter() - start_time)
             raise
+        if debug:
+            _log_end(time.perf_counter() - start_time)
+        return result
 
     @functools.wraps(func)
     def sync_wrapper(*args, **kwargs):
-        logger = get_logger(func.__module__)
-        start_time = time.time()
-
-        # Log arguments if not too verbose and not sensitive
-        log_kwargs = {k: v for k, v in kwargs.items() if k not in SecurityFilter.SENSITIVE_PATTERNS} # Basic redaction
-
-        logger.debug(
-            f"Calling {func.__name__}",
-            extra={
-                "function": func.__name__,
-                "module": func.__module__,
-                "args_count": len(args),
-                "kwargs": log_kwargs, # Log kwargs explicitly in extra
-                "event_type": "function_call_start"
-            }
-        )
+        debug = logger.isEnabledFor(logging.DEBUG)
+        start_time = time.perf_counter()
+        if debug:
+            _log_start(args, kwargs)
         try:
             result = func(*args, **kwargs)
-            execution_time = time.time() - start_time
-            logger.debug(
-                f"Completed {func.__name__}",
-                extra={
-                    "function": func.__name__,
-                    "execution_time_ms": round(execution_time * 1000, 2),
-                    "success": True,
-                    "event_type": "function_call_end"
-                }
-            )
-            return result
         except Exception as e:
-            execution_time = time.time() - start_time
-            logger.error(
-                f"Error in {func.__name__}: {str(e)}",
-                extra={
-                    "function": func.__name__,
-                    "execution_time_ms": round(execution_time * 1000, 2),
-                    "error_type": type(e).__name__,
-                    "success": False,
-                    "event_type": "function_call_error"
-                },
-                exc_info=True
-            )
+            _log_error(e, time.perf_counter() - start_time)
             raise
+        if debug:
+            _log_end(time.perf_counter() - start_time)
+        return result
 
     if asyncio.iscoroutinefunction(func):
         return async_wrapper
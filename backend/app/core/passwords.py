@@ -0,0 +1,97 @@
+# backend/app/core/passwords.py
+"""
+Password hashing off the event loop.
+
+A bcrypt hash or verify takes 100-300ms of CPU. PasswordService runs them in
+its own bounded thread pool (bcrypt releases the GIL while hashing), so a
+burst of logins queues for the pool while the event loop keeps serving other
+requests. Once PASSWORD_HASH_MAX_PENDING calls are waiting, new ones fail fast
+with PasswordServiceBusy instead of growing the queue.
+
+Hashes made with other parameters than PASSWORD_BCRYPT_ROUNDS (or with a
+deprecated scheme) are reported by verify_and_update, so logins can replace
+them transparently.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.instrumentation import track_async
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PasswordServiceBusy(RuntimeError):
+    """Too many password operations are already waiting for the hashing pool."""
+
+
+class PasswordService:
+    def __init__(
+        self,
+        rounds: int = settings.PASSWORD_BCRYPT_ROUNDS,
+        max_workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_pending: int = settings.PASSWORD_HASH_MAX_PENDING,
+    ):
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(self.max_workers, max_pending)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordServiceBusy(f"{self._pending} password operations pending")
+            self._pending += 1
+        try:
+            async with track_async("password_hash"):
+                return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: Optional[str]) -> bool:
+        return (await self.verify_and_update(password, hashed))[0]
+
+    async def verify_and_update(self, password: str, hashed: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """
+        (valid, new_hash): new_hash is set when the password is valid but its
+        hash uses outdated parameters. Without a stored hash, a dummy verify
+        keeps the response time the same as for a wrong password.
+        """
+        if not hashed:
+            await self._run(self.context.dummy_verify)
+            return False, None
+        try:
+            return await self._run(self.context.verify_and_update, password, hashed)
+        except ValueError:  # Not a hash this context recognizes
+            logger.warning("Stored password hash has an unrecognized format")
+            return False, None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+password_service = PasswordService()
@@ -6,7 +6,9 @@ Database connection and session management using lazy initialization.
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
+from app.core.instrumentation import instrument_engine
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +19,7 @@ class Base(DeclarativeBase):
 
 _engine = None
 _async_session_maker = None
+_engine_options = {}
 
 def get_engine():
     """Lazily initialize and return the SQLAlchemy engine."""
@@ -28,8 +31,10 @@ def get_engine():
             settings.SQLALCHEMY_DATABASE_URI,
             echo=(settings.ENVIRONMENT == "development"),  # Changed from settings.DEBUG
             future=True,
-            pool_pre_ping=True
+            pool_pre_ping=True,
+            **_engine_options
         )
+        instrument_engine(_engine)
     return _engine
 
 def get_session_maker():
@@ -45,6 +50,17 @@ def get_session_maker():
         )
     return _async_session_maker
 
+def use_null_pool() -> None:
+    """
+    Open a connection per session instead of pooling them. For processes that
+    run each job in its own asyncio.run() (Celery workers): pooled asyncpg
+    connections stay bound to the event loop that opened them.
+    """
+    global _engine, _async_session_maker
+    _engine_options["poolclass"] = NullPool
+    _engine = None
+    _async_session_maker = None
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     """Dependency that provides a database session and handles cleanup."""
     session_maker = get_session_maker()
@@ -71,6 +87,7 @@ async def create_tables() -> None:
 __all__ = [
     'Base',
     'get_engine',
+    'use_null_pool',
     'SessionLocal',
     'get_async_session',
     'get_db',
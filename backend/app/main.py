@@ -5,15 +5,30 @@ Handles CORS, middleware, and route registration.
 """
 
 import logging
+import random
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from app.api.v1.api import api_router
+from app.core.config import settings
+from app.core.instrumentation import registry, begin_request_timings, end_request_timings
+from app.services.insights_state import insights_state
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Write insight usage entries still buffered for the next bulk flush.
+    await insights_state.close()
+
+
 # Create FastAPI application
 app = FastAPI(
     title="AI-Powered Finance Platform",
@@ -21,14 +36,52 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
+    lifespan=lifespan,
 )
 
-# ADDED: Logging middleware to debug request paths
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    logger.info(f"Incoming request path: {request.url.path}")
-    response = await call_next(request)
-    return response
+    """Record per-route latency and dependency time; log a sample of requests.
+
+    Slow requests and server errors are always logged, everything else only
+    at REQUEST_LOG_SAMPLE_RATE, so the hot path does not pay a log write.
+    """
+    method = request.method
+    registry.request_started(method)
+    token = begin_request_timings()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        duration = time.perf_counter() - start
+        components = end_request_timings(token)
+        # Use the route template rather than the raw path to bound label cardinality.
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        registry.request_finished(method, route_path, status_code, duration, components)
+
+        duration_ms = duration * 1000
+        if (
+            status_code >= 500
+            or duration_ms >= settings.REQUEST_LOG_SLOW_MS
+            or random.random() < settings.REQUEST_LOG_SAMPLE_RATE
+        ):
+            logger.info(
+                "%s %s -> %s in %.1fms %s",
+                method, request.url.path, status_code, duration_ms,
+                {k: round(v * 1000, 1) for k, v in components.items()},
+            )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint for request instrumentation."""
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("", status_code=404)
+    return Response(registry.render(), media_type=CONTENT_TYPE_LATEST)
 
 # Set up CORS
 origins = [
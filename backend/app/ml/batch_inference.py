@@ -0,0 +1,243 @@
+"""
+Batch inference of transaction insights.
+
+New and changed transactions are scanned in keyset order of (updated_at, id)
+from a watermark stored in insight_checkpoints, a batch at a time. Each batch
+is featurized with numpy, scored with FinancialMLModel.risk_model in one
+predict_proba call, and written to transaction_insights with one upsert,
+together with a revenue trend insight on each merchant's latest transaction.
+The insights and the advanced watermark are committed together, so an
+interrupted run resumes after the last committed batch without duplicates.
+
+Transactions updated within INSIGHT_SETTLE_SECONDS are left for the next run,
+so rows committed slightly out of updated_at order are not skipped.
+"""
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import Date, and_, cast, func, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.ml.model import FinancialMLModel
+from app.models.transaction import InsightCheckpoint, Transaction, TransactionInsight
+from app.services.analytics_engine import FAILED_STATUSES, INFLOW_TYPES, OUTFLOW_TYPES, SUCCESS_STATUSES
+from app.services.fx import FxConversion
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "transaction_insights"
+RISK_INSIGHT = "risk_assessment"
+TREND_INSIGHT = "trend_analysis"
+
+RISK_FEATURES = [
+    "log_amount", "is_inflow", "is_outflow", "hour", "day_of_week", "is_weekend", "foreign_currency", "missing_rate",
+]
+
+
+def transactions_query():
+    """Columns the risk features are built from, with the amount in the reporting currency."""
+    fx = FxConversion()
+    return fx.join(select(
+        Transaction.id,
+        Transaction.user_id,
+        fx.amount.label("amount"),
+        Transaction.currency,
+        Transaction.status,
+        Transaction.transaction_type,
+        Transaction.created_at,
+        Transaction.updated_at,
+    ).select_from(Transaction))
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+
+
+def risk_features(rows: Sequence[Any]) -> np.ndarray:
+    """(n, len(RISK_FEATURES)) matrix for rows of transactions_query()."""
+    n = len(rows)
+    if not n:
+        return np.zeros((0, len(RISK_FEATURES)))
+    amounts = np.array([np.nan if row.amount is None else float(row.amount) for row in rows])
+    types = np.array([(row.transaction_type or "").lower() for row in rows])
+    currencies = np.array([(row.currency or settings.FX_BASE_CURRENCY).upper() for row in rows])
+    moments = np.array([_naive_utc(row.created_at or row.updated_at) for row in rows], dtype="datetime64[s]")
+    day_of_week = ((moments.astype("datetime64[D]").astype(np.int64) + 3) % 7).astype(float)  # Monday = 0
+    missing = np.isnan(amounts)
+    return np.column_stack([
+        np.log1p(np.abs(np.where(missing, 0.0, amounts))),
+        np.isin(types, INFLOW_TYPES),
+        np.isin(types, OUTFLOW_TYPES),
+        (moments - moments.astype("datetime64[D]")).astype("timedelta64[h]").astype(float),
+        day_of_week,
+        day_of_week >= 5,
+        currencies != settings.FX_REPORTING_CURRENCY.upper(),
+        missing,
+    ]).astype(float)
+
+
+def risk_labels(statuses: Sequence[Optional[str]]) -> np.ndarray:
+    """1 for failed, 0 for successful and -1 for any other (unsettled) status."""
+    statuses = np.array([(s or "").lower() for s in statuses])
+    return np.where(np.isin(statuses, FAILED_STATUSES), 1, np.where(np.isin(statuses, SUCCESS_STATUSES), 0, -1))
+
+
+def risk_level(probability: float) -> str:
+    if probability >= settings.INSIGHT_HIGH_RISK_THRESHOLD:
+        return "high"
+    return "medium" if probability >= settings.INSIGHT_HIGH_RISK_THRESHOLD / 2 else "low"
+
+
+class BatchInferenceJob:
+    def __init__(
+        self,
+        db: AsyncSession,
+        model: Optional[FinancialMLModel] = None,
+        batch_size: int = settings.INSIGHT_BATCH_SIZE,
+        job: str = JOB_NAME,
+    ):
+        self.db = db
+        self.model = model or FinancialMLModel()
+        self.batch_size = batch_size
+        self.job = job
+
+    @property
+    def model_version(self) -> str:
+        return f"risk-{self.model.metadata.version}" if self.model.metadata else "risk-unversioned"
+
+    def _ready(self) -> bool:
+        if not self.model.is_trained:
+            self.model._load_models()
+        return (
+            hasattr(self.model.risk_model, "classes_")
+            and list(self.model.risk_features or []) == RISK_FEATURES
+        )
+
+    async def _checkpoint(self) -> InsightCheckpoint:
+        checkpoint = await self.db.get(InsightCheckpoint, self.job)
+        if checkpoint is None:
+            checkpoint = InsightCheckpoint(job=self.job, rows_scored=0)
+            self.db.add(checkpoint)
+        return checkpoint
+
+    async def _next_batch(self, checkpoint: InsightCheckpoint, until: datetime) -> List[Any]:
+        stmt = transactions_query().where(Transaction.updated_at < until)
+        if checkpoint.watermark_at is not None:
+            stmt = stmt.where(or_(
+                Transaction.updated_at > checkpoint.watermark_at,
+                and_(Transaction.updated_at == checkpoint.watermark_at, Transaction.id > checkpoint.watermark_id),
+            ))
+        stmt = stmt.order_by(Transaction.updated_at, Transaction.id).limit(self.batch_size)
+        return (await self.db.execute(stmt)).all()
+
+    def score(self, rows: Sequence[Any]) -> np.ndarray:
+        """Failure probability per row, one vectorized predict."""
+        X = self.model.scaler.transform(risk_features(rows))
+        positive = list(self.model.risk_model.classes_).index(1)
+        return self.model.risk_model.predict_proba(X)[:, positive]
+
+    async def _trends(self, user_ids: Sequence[Any], as_of: date) -> Dict[str, Dict[str, Any]]:
+        """Revenue of the last INSIGHT_TREND_DAYS complete days against the period before, per merchant."""
+        days = settings.INSIGHT_TREND_DAYS
+        start = as_of - timedelta(days=2 * days - 1)
+        day = cast(func.timezone(literal_column("'UTC'"), Transaction.created_at), Date)
+        fx = FxConversion()
+        recent = func.sum(fx.amount).filter(day > as_of - timedelta(days=days))
+        stmt = (
+            fx.join(select(Transaction.user_id, func.coalesce(recent, 0), func.coalesce(func.sum(fx.amount), 0))
+                    .select_from(Transaction))
+            .where(
+                Transaction.user_id.in_(list(user_ids)),
+                Transaction.created_at >= datetime.combine(start, datetime.min.time()),
+                Transaction.created_at < datetime.combine(as_of + timedelta(days=1), datetime.min.time()),
+                Transaction.status.in_(SUCCESS_STATUSES),
+                Transaction.transaction_type.in_(INFLOW_TYPES),
+            )
+            .group_by(Transaction.user_id)
+        )
+        trends = {}
+        for user_id, current, total in (await self.db.execute(stmt)).all():
+            current, previous = float(current), float(total) - float(current)
+            change = (current - previous) / previous if previous > 0 else None
+            trends[str(user_id)] = {
+                "period_days": days,
+                "as_of": as_of.isoformat(),
+                "revenue": round(current, 2),
+                "previous_revenue": round(previous, 2),
+                "change_pct": round(change * 100, 2) if change is not None else None,
+                "direction": "up" if current > previous else ("down" if current < previous else "flat"),
+                "reporting_currency": settings.FX_REPORTING_CURRENCY,
+            }
+        return trends
+
+    async def _insights(self, rows: Sequence[Any], generated_at: datetime) -> List[Dict[str, Any]]:
+        probabilities = self.score(rows)
+        insights = [
+            {
+                "transaction_id": row.id,
+                "insight_type": RISK_INSIGHT,
+                "confidence_score": round(float(max(p, 1 - p)), 2),
+                "insight_data": {"risk_probability": round(float(p), 4), "risk_level": risk_level(float(p))},
+                "ai_model_version": self.model_version,
+                "generated_at": generated_at,
+            }
+            for row, p in zip(rows, probabilities)
+        ]
+
+        latest: Dict[str, Any] = {}
+        for row in rows:
+            if row.created_at and (str(row.user_id) not in latest or row.created_at > latest[str(row.user_id)].created_at):
+                latest[str(row.user_id)] = row
+        trends = await self._trends([row.user_id for row in latest.values()], generated_at.date() - timedelta(days=1))
+        insights.extend(
+            {
+                "transaction_id": latest[user_id].id,
+                "insight_type": TREND_INSIGHT,
+                "confidence_score": None,
+                "insight_data": trend,
+                "ai_model_version": self.model_version,
+                "generated_at": generated_at,
+            }
+            for user_id, trend in trends.items()
+        )
+        return insights
+
+    async def _write(self, insights: List[Dict[str, Any]]) -> None:
+        stmt = pg_insert(TransactionInsight).values(insights)
+        await self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[TransactionInsight.transaction_id, TransactionInsight.insight_type],
+            set_={
+                "confidence_score": stmt.excluded.confidence_score,
+                "insight_data": stmt.excluded.insight_data,
+                "ai_model_version": stmt.excluded.ai_model_version,
+                "generated_at": stmt.excluded.generated_at,
+            },
+        ))
+
+    async def run(self, max_batches: int = settings.INSIGHT_MAX_BATCHES_PER_RUN) -> int:
+        """Score transactions past the watermark, committing per batch. Returns transactions scored."""
+        if not self._ready():
+            logger.warning("Batch insights skipped: no trained risk model in the registry")
+            return 0
+
+        until = datetime.now(timezone.utc) - timedelta(seconds=settings.INSIGHT_SETTLE_SECONDS)
+        scored = 0
+        for _ in range(max_batches):
+            checkpoint = await self._checkpoint()
+            rows = await self._next_batch(checkpoint, until)
+            if not rows:
+                break
+            await self._write(await self._insights(rows, datetime.utcnow()))
+            checkpoint.watermark_at, checkpoint.watermark_id = rows[-1].updated_at, rows[-1].id
+            checkpoint.model_version = self.model_version
+            checkpoint.rows_scored = (checkpoint.rows_scored or 0) + len(rows)
+            await self.db.commit()
+            scored += len(rows)
+            if len(rows) < self.batch_size:
+                break
+        logger.info(f"Batch insights: scored {scored} transactions with {self.model_version}")
+        return scored
@@ -0,0 +1,251 @@
+"""
+On-disk cache of daily training features.
+
+Daily resampling (gap-filled per merchant), lags and rolling means are
+computed in PostgreSQL and streamed through a server-side cursor. Each
+fetched partition is written as a chunk of per-column .npy files:
+
+    {root}/{dataset}/{chunk}/{column}.npy
+    {root}/{dataset}/manifest.json
+
+A refresh only queries days after the manifest's last_day (with enough
+lookback for the window functions), so a retrain reads the cached columns
+plus the newest days instead of every raw transaction. Days are complete
+UTC days; changes to days already cached are picked up by a full rebuild.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Date, Integer, and_, case, cast, exists, func, literal, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.transaction import Transaction
+from app.services.analytics_engine import INFLOW_TYPES, SUCCESS_STATUSES
+from app.services.fx import FxConversion
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+# Lookback needed by the longest window function below.
+MAX_LOOKBACK_DAYS = 28
+
+COLUMNS: Dict[str, str] = {
+    "user_id": "U36",
+    "day": "datetime64[D]",
+    "daily_sales": "f8",
+    "orders": "i4",
+    "lag_1_day_sales": "f8",
+    "lag_7_day_sales": "f8",
+    "rolling_mean_7": "f8",
+    "rolling_mean_28": "f8",
+    "day_of_week": "i1",
+    "month": "i1",
+}
+
+
+def daily_features_query(start: date, end: date):
+    """
+    One row per merchant per day in [start, end], gap-filled with zeros from
+    the merchant's first day with revenue, with lag and rolling features.
+    Transactions from MAX_LOOKBACK_DAYS before start are read for context only;
+    for merchants with earlier revenue the grid starts at the lookback day, so
+    the features of any day match those of a rebuild from an earlier start.
+    """
+    lookback = start - timedelta(days=MAX_LOOKBACK_DAYS)
+    revenue = (
+        Transaction.status.in_(SUCCESS_STATUSES),
+        Transaction.transaction_type.in_(INFLOW_TYPES),
+    )
+    day = cast(func.timezone(literal_column("'UTC'"), Transaction.created_at), Date).label("day")
+    fx = FxConversion()
+    daily = (
+        fx.join(select(
+            Transaction.user_id.label("user_id"),
+            day,
+            func.sum(fx.amount).label("sales"),
+            func.count(Transaction.id).label("orders"),
+        ).select_from(Transaction))
+        .where(
+            Transaction.created_at >= datetime.combine(lookback, datetime.min.time()),
+            Transaction.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+            *revenue,
+        )
+        .group_by(Transaction.user_id, day)
+        .cte("daily")
+    )
+    earlier_revenue = exists().where(
+        Transaction.user_id == daily.c.user_id,
+        Transaction.created_at < datetime.combine(lookback, datetime.min.time()),
+        *revenue,
+    )
+    first_day = case((earlier_revenue, literal(lookback)), else_=func.min(daily.c.day))
+    spans = select(daily.c.user_id, first_day.label("first_day")).group_by(daily.c.user_id).cte("spans")
+    grid = select(
+        spans.c.user_id,
+        cast(func.generate_series(spans.c.first_day, literal(end), literal_column("interval '1 day'")), Date).label("day"),
+    ).cte("grid")
+    dense = (
+        select(
+            grid.c.user_id,
+            grid.c.day,
+            func.coalesce(daily.c.sales, 0).label("sales"),
+            func.coalesce(daily.c.orders, 0).label("orders"),
+        )
+        .outerjoin(daily, and_(daily.c.user_id == grid.c.user_id, daily.c.day == grid.c.day))
+        .subquery("dense")
+    )
+
+    window = {"partition_by": dense.c.user_id, "order_by": dense.c.day}
+    features = select(
+        dense.c.user_id,
+        dense.c.day,
+        dense.c.sales.label("daily_sales"),
+        dense.c.orders,
+        func.lag(dense.c.sales, 1).over(**window).label("lag_1_day_sales"),
+        func.lag(dense.c.sales, 7).over(**window).label("lag_7_day_sales"),
+        func.avg(dense.c.sales).over(rows=(-6, 0), **window).label("rolling_mean_7"),
+        func.avg(dense.c.sales).over(rows=(-27, 0), **window).label("rolling_mean_28"),
+        (cast(func.extract("isodow", dense.c.day), Integer) - 1).label("day_of_week"),  # Monday = 0
+        cast(func.extract("month", dense.c.day), Integer).label("month"),
+    ).subquery("features")
+
+    # Column order matches COLUMNS; chunks are written positionally.
+    return (
+        select(*[features.c[name] for name in COLUMNS])
+        .where(features.c.day >= start)
+        .order_by(features.c.user_id, features.c.day)
+    )
+
+
+class TrainingFeatureCache:
+    def __init__(
+        self,
+        dataset: str = "daily_sales",
+        root: str = settings.ML_TRAINING_CACHE_PATH,
+        chunk_rows: int = settings.ML_TRAINING_CHUNK_ROWS,
+        history_days: int = settings.ML_TRAINING_HISTORY_DAYS,
+    ):
+        self.path = os.path.join(root, dataset)
+        self.chunk_rows = chunk_rows
+        self.history_days = history_days
+
+    def manifest(self) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self.path, MANIFEST_FILE)) as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, manifest: Dict) -> None:
+        staging = os.path.join(self.path, f".{MANIFEST_FILE}.{uuid.uuid4().hex}")
+        with open(staging, "w") as handle:
+            json.dump(manifest, handle, indent=2)
+        os.replace(staging, os.path.join(self.path, MANIFEST_FILE))
+
+    def _write_chunk(self, rows: List[tuple], name: str) -> None:
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.path)
+        try:
+            for position, (column, dtype) in enumerate(COLUMNS.items()):
+                values = [row[position] for row in rows]
+                if dtype.startswith("U"):
+                    values = [str(v) for v in values]
+                elif dtype.startswith("f"):
+                    values = [np.nan if v is None else float(v) for v in values]
+                np.save(os.path.join(staging, f"{column}.npy"), np.array(values, dtype=dtype))
+            os.replace(staging, os.path.join(self.path, name))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    async def refresh(self, db: AsyncSession, full: bool = False, end: Optional[date] = None) -> int:
+        """
+        Append complete days after the cached last_day (or rebuild with full=True),
+        streaming the query in chunk_rows partitions. Returns rows written.
+        """
+        end = end or datetime.utcnow().date() - timedelta(days=1)
+        os.makedirs(self.path, exist_ok=True)
+        manifest = self.manifest()
+        if manifest and manifest.get("reporting_currency") != settings.FX_REPORTING_CURRENCY:
+            full = True  # Cached amounts are in another currency.
+        if full or not manifest:
+            manifest = {"last_day": None, "chunks": [], "rows": 0, "reporting_currency": settings.FX_REPORTING_CURRENCY}
+            stale = [entry for entry in os.listdir(self.path) if not entry.startswith(".") and entry != MANIFEST_FILE]
+        else:
+            stale = []
+
+        start = (
+            date.fromisoformat(manifest["last_day"]) + timedelta(days=1)
+            if manifest["last_day"] else end - timedelta(days=self.history_days - 1)
+        )
+        if start > end:
+            return 0
+
+        written = 0
+        refresh_id = f"{start:%Y%m%d}-{end:%Y%m%d}-{uuid.uuid4().hex[:6]}"
+        result = await db.stream(daily_features_query(start, end).execution_options(yield_per=self.chunk_rows))
+        async for partition in result.partitions(self.chunk_rows):
+            name = f"{refresh_id}-{len(manifest['chunks']):05d}"
+            self._write_chunk(partition, name)
+            manifest["chunks"].append(name)
+            written += len(partition)
+
+        manifest["last_day"] = end.isoformat()
+        manifest["rows"] += written
+        self._write_manifest(manifest)
+        for entry in stale:
+            shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+        logger.info(f"Training feature cache {self.path}: {written} rows for {start}..{end}")
+        return written
+
+    def load(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """All cached rows (memory-mapped per chunk, then concatenated)."""
+        manifest = self.manifest()
+        columns = columns or list(COLUMNS)
+        if not manifest or not manifest["chunks"]:
+            return pd.DataFrame({c: np.array([], dtype=COLUMNS[c]) for c in columns})
+        data = {
+            column: np.concatenate([
+                np.load(os.path.join(self.path, chunk, f"{column}.npy"), mmap_mode="r")
+                for chunk in manifest["chunks"]
+            ])
+            for column in columns
+        }
+        return pd.DataFrame(data)
+
+    def series(
+        self, frame: Optional[pd.DataFrame] = None, min_days: int = 0
+    ) -> Tuple[List[str], List[np.ndarray], List[np.datetime64]]:
+        """
+        Dense daily sales per merchant (oldest first) with each series' last day,
+        from the given rows of load() or the whole cache.
+        """
+        if frame is None:
+            frame = self.load(["user_id", "day", "daily_sales"])
+        users, series, ends = [], [], []
+        if frame.empty:
+            return users, series, ends
+        frame = frame.sort_values(["user_id", "day"], kind="stable")
+        user_ids = frame["user_id"].to_numpy()
+        days = frame["day"].to_numpy().astype("datetime64[D]")
+        sales = frame["daily_sales"].to_numpy()
+        boundaries = np.flatnonzero(user_ids[1:] != user_ids[:-1]) + 1
+        for lo, hi in zip(np.r_[0, boundaries], np.r_[boundaries, len(frame)]):
+            first, last = days[lo], days[hi - 1]
+            length = int((last - first).astype(np.int64)) + 1
+            if length < min_days:
+                continue
+            dense = np.zeros(length)
+            dense[(days[lo:hi] - first).astype(np.int64)] = sales[lo:hi]
+            users.append(str(user_ids[lo]))
+            series.append(dense)
+            ends.append(last)
+        return users, series, ends
@@ -0,0 +1,257 @@
+"""
+Direct multi-horizon revenue forecasting.
+
+One model predicts revenue h days ahead for every horizon h: each row is a
+(window of recent daily revenue, horizon) pair, so forecasting many merchants
+over many horizons is a single batched `predict` on an (n_merchants x
+horizons, n_features) matrix instead of one call per merchant per day.
+
+Windows are scaled by their 28-day mean before featurization, which lets one
+global model serve merchants of very different size. Prediction intervals
+are split-conformal: per-horizon quantiles of the scaled residuals on the
+most recent part of the training data.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.ensemble import RandomForestRegressor
+
+from app.core.config import settings
+from app.ml.model_selection import DEFAULT_SEARCH_SPACE, rolling_origin_splits, search
+
+logger = logging.getLogger(__name__)
+
+# Registry name of the revenue model bundle ({"revenue_model": DirectForecaster, ...}).
+REVENUE_MODEL = "revenue_forecaster"
+N_LAGS = 28
+RECENT_LAGS = 14
+FEATURE_NAMES = (
+    [f"lag_{k}" for k in range(1, RECENT_LAGS + 1)]
+    + ["mean_7", "mean_28", "std_28", "zero_share_28", "same_weekday_mean", "horizon", "target_weekday"]
+)
+
+
+@dataclass
+class ForecastResult:
+    """Arrays shaped (n_series, horizon); column h-1 is h days after the origin."""
+    mean: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+
+def window_scale(windows: np.ndarray) -> np.ndarray:
+    """Per-window scale: the 28-day mean, or 1 for windows without revenue."""
+    scale = windows.mean(axis=1)
+    return np.where(scale > 0, scale, 1.0)
+
+
+def build_features(windows: np.ndarray, origins: np.ndarray, horizons: np.ndarray) -> np.ndarray:
+    """
+    Features for every (window, horizon) pair, window-major: row i * len(horizons) + j
+    is window i at horizons[j].
+
+    Args:
+        windows: (n, N_LAGS) daily revenue, oldest first; the last column is the origin day
+        origins: (n,) origin dates as datetime64[D]
+        horizons: (H,) days ahead, >= 1
+    """
+    windows = np.asarray(windows, dtype=float)
+    if windows.ndim != 2 or windows.shape[1] != N_LAGS:
+        raise ValueError(f"Windows must be shaped (n, {N_LAGS})")
+    horizons = np.asarray(horizons, dtype=np.int64)
+    n, n_h = len(windows), len(horizons)
+
+    scaled = windows / window_scale(windows)[:, None]
+    recent = scaled[:, ::-1][:, :RECENT_LAGS]  # lag_1 is the origin day
+    base = np.column_stack([
+        recent,
+        scaled[:, -7:].mean(axis=1),
+        scaled.mean(axis=1),
+        scaled.std(axis=1),
+        (windows == 0).mean(axis=1),
+    ])
+
+    # Days back from the origin that fall on the target's weekday: k = -h mod 7, +7, ...
+    back = (-horizons[:, None] % 7) + 7 * np.arange(N_LAGS // 7)[None, :]  # (H, 4)
+    same_weekday = scaled[:, N_LAGS - 1 - back].mean(axis=2)  # (n, H)
+
+    # 1970-01-01 was a Thursday; shift so Monday is 0 like pandas' dayofweek.
+    origin_days = np.asarray(origins, dtype="datetime64[D]").astype(np.int64)
+    target_weekday = (origin_days[:, None] + horizons[None, :] + 3) % 7
+
+    features = np.empty((n, n_h, len(FEATURE_NAMES)), dtype=np.float32)
+    features[:, :, :base.shape[1]] = base[:, None, :]
+    features[:, :, -3] = same_weekday
+    features[:, :, -2] = horizons[None, :]
+    features[:, :, -1] = target_weekday
+    return features.reshape(n * n_h, len(FEATURE_NAMES))
+
+
+def training_windows(
+    series: Sequence[np.ndarray], end_dates: Sequence[Any], max_horizon: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Every (window, next max_horizon days) pair of each daily series.
+
+    Returns windows (m, N_LAGS), origins (m,) and targets (m, max_horizon).
+    """
+    windows, origins, targets = [], [], []
+    span = N_LAGS + max_horizon
+    for values, end in zip(series, end_dates):
+        values = np.asarray(values, dtype=float)
+        if len(values) < span:
+            continue
+        view = sliding_window_view(values, span)
+        windows.append(view[:, :N_LAGS])
+        targets.append(view[:, N_LAGS:])
+        # Origin of the last window is max_horizon days before the series end.
+        last_origin = np.datetime64(end, "D") - max_horizon
+        origins.append(last_origin - np.arange(len(view))[::-1])
+    if not windows:
+        return np.empty((0, N_LAGS)), np.empty(0, dtype="datetime64[D]"), np.empty((0, max_horizon))
+    return np.concatenate(windows), np.concatenate(origins), np.concatenate(targets)
+
+
+class DirectForecaster:
+    """A regressor over (window, horizon) rows plus per-horizon conformal residual quantiles."""
+
+    def __init__(
+        self,
+        max_horizon: int = 14,
+        coverage: float = 0.8,
+        estimator: Optional[Any] = None,
+        calibration_fraction: float = 0.2,
+        max_rows: int = 500_000,
+        random_state: int = 42,
+    ):
+        self.max_horizon = max_horizon
+        self.coverage = coverage
+        if estimator is None:
+            estimator = RandomForestRegressor(
+                n_estimators=100, min_samples_leaf=5, n_jobs=-1, random_state=random_state
+            )
+        self.estimator = estimator
+        self.calibration_fraction = calibration_fraction
+        self.max_rows = max_rows
+        self.random_state = random_state
+        self.residual_quantiles: Optional[np.ndarray] = None  # (2, max_horizon): lower, upper
+        self.metrics: dict = {}
+        self.cv_metrics: dict = {}
+        self.search_results: List[dict] = []
+        self.n_samples = 0
+
+    @property
+    def horizons(self) -> np.ndarray:
+        return np.arange(1, self.max_horizon + 1)
+
+    def _subsample(self, n: int) -> np.ndarray:
+        """Window indices to train on, keeping rows (windows x horizons) under max_rows."""
+        limit = max(1, self.max_rows // self.max_horizon)
+        if n <= limit:
+            return np.arange(n)
+        rng = np.random.default_rng(self.random_state)
+        return np.sort(rng.choice(n, size=limit, replace=False))
+
+    def design(
+        self, windows: np.ndarray, origins: np.ndarray, targets: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Training rows (subsampled): features, scaled targets and each row's origin date."""
+        keep = self._subsample(len(windows))
+        windows, origins, targets = windows[keep], np.asarray(origins, dtype="datetime64[D]")[keep], targets[keep]
+        if len(windows) < 10:
+            raise ValueError("Insufficient data for training")
+        y = (targets[:, :self.max_horizon] / window_scale(windows)[:, None]).ravel()
+        X = build_features(windows, origins, self.horizons)
+        return X, y, np.repeat(origins, self.max_horizon)
+
+    def tune(
+        self,
+        windows: np.ndarray,
+        origins: np.ndarray,
+        targets: np.ndarray,
+        search_space: Optional[Sequence] = None,
+        n_jobs: Optional[int] = None,
+    ):
+        """
+        Pick the estimator by rolling-origin CV (folds separated by the horizon so
+        no training target falls in a test block). Call fit() afterwards. With
+        too little history for any fold, the default estimator is kept and None
+        is returned.
+        """
+        X, y, row_origins = self.design(windows, origins, targets)
+        splits = rolling_origin_splits(
+            row_origins, settings.ML_CV_SPLITS, settings.ML_CV_TEST_DAYS, gap=self.max_horizon
+        )
+        if not splits:
+            logger.info("Too little history for cross-validation; keeping the default estimator")
+            return None
+        result = search(X, y, splits, search_space or DEFAULT_SEARCH_SPACE, n_jobs=n_jobs)
+        self.estimator = result.estimator
+        self.search_results = result.results
+        self.cv_metrics = result.metrics
+        return result
+
+    def fit(self, windows: np.ndarray, origins: np.ndarray, targets: np.ndarray) -> "DirectForecaster":
+        """
+        Fit on training_windows() output. The latest calibration_fraction of
+        origins calibrates the intervals; the model is then refit on everything.
+        """
+        X, y, row_origins = self.design(windows, origins, targets)
+        day = row_origins.astype(np.int64)
+        rows = day >= np.quantile(day, 1 - self.calibration_fraction)
+        if rows.any() and (~rows).any():
+            self.estimator.fit(X[~rows], y[~rows])
+            residuals = (y[rows] - self.estimator.predict(X[rows])).reshape(-1, self.max_horizon)
+            alpha = (1 - self.coverage) / 2
+            self.residual_quantiles = np.quantile(residuals, [alpha, 1 - alpha], axis=0)
+            # In units of each window's 28-day mean revenue.
+            self.metrics = {**self.cv_metrics, "calibration_mae_scaled": float(np.abs(residuals).mean())}
+        else:
+            self.residual_quantiles = np.zeros((2, self.max_horizon))
+            self.metrics = dict(self.cv_metrics)
+
+        self.estimator.fit(X, y)
+        self.n_samples = len(X) // self.max_horizon
+        return self
+
+    def predict(self, windows: np.ndarray, origins: np.ndarray, horizon: Optional[int] = None) -> ForecastResult:
+        """Forecast days 1..horizon after each window's origin in one estimator call."""
+        horizon = min(horizon or self.max_horizon, self.max_horizon)
+        windows = np.asarray(windows, dtype=float)
+        horizons = self.horizons[:horizon]
+        scale = window_scale(windows)[:, None]
+
+        point = self.estimator.predict(build_features(windows, origins, horizons)).reshape(len(windows), horizon)
+        lower_q, upper_q = self.residual_quantiles[:, :horizon]
+        return ForecastResult(
+            mean=np.maximum(point * scale, 0.0),
+            lower=np.maximum((point + lower_q) * scale, 0.0),
+            upper=np.maximum((point + upper_q) * scale, 0.0),
+        )
+
+
+def daily_totals(dates: Sequence[Any], amounts: Sequence[float], end: Any, days: int = N_LAGS) -> np.ndarray:
+    """Dense daily sums over the `days` days ending at `end` (inclusive); missing days are 0."""
+    end_day = np.datetime64(end, "D")
+    offsets = (end_day - np.asarray(dates, dtype="datetime64[D]")).astype(np.int64)
+    inside = (offsets >= 0) & (offsets < days)
+    totals = np.zeros(days)
+    np.add.at(totals, days - 1 - offsets[inside], np.asarray(amounts, dtype=float)[inside])
+    return totals
+
+
+def forecast_points(result: ForecastResult, index: int, origin: Any, horizon: int) -> List[dict]:
+    """Rows for one series of a ForecastResult."""
+    start = np.datetime64(origin, "D")
+    return [
+        {
+            "date": str(start + h + 1),
+            "revenue": round(float(result.mean[index, h]), 2),
+            "lower": round(float(result.lower[index, h]), 2),
+            "upper": round(float(result.upper[index, h]), 2),
+        }
+        for h in range(horizon)
+    ]
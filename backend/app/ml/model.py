@@ -5,28 +5,40 @@ import logging
 from typing import Dict, List, Optional, Any, Tuple
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingClassifier
+from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, accuracy_score
-import joblib
+from sklearn.metrics import accuracy_score
 from datetime import datetime, timedelta
-import os
+
+from app.core.config import settings
+from app.ml.forecasting import FEATURE_NAMES, N_LAGS, REVENUE_MODEL, DirectForecaster, daily_totals, training_windows
+from app.ml.registry import ModelMetadata, ModelNotFound, ModelRegistry, model_registry
 
 logger = logging.getLogger(__name__)
 
 class FinancialMLModel:
-    """ML models for financial predictions and risk assessment"""
+    """
+    ML models for financial predictions and risk assessment.
+
+    Trained models are stored in the model registry, globally or per merchant
+    (tenant_id). Loading goes through the registry's in-memory cache, so a
+    freshly constructed instance does not pay deserialization once the model
+    has been loaded in this process; a merchant without its own model uses the
+    global one.
+    """
     
-    def __init__(self):
-        self.revenue_model = RandomForestRegressor(n_estimators=100, random_state=42)
+    def __init__(self, tenant_id: Optional[str] = None, registry: ModelRegistry = model_registry):
+        self.revenue_model = DirectForecaster(
+            max_horizon=settings.FORECAST_MAX_HORIZON_DAYS, coverage=settings.FORECAST_INTERVAL_COVERAGE
+        )
         self.risk_model = GradientBoostingClassifier(n_estimators=100, random_state=42)
         self.scaler = StandardScaler()
         self.is_trained = False
-        self.model_path = "ml_models/"
-        
-        # Create model directory
-        os.makedirs(self.model_path, exist_ok=True)
+        self.tenant_id = str(tenant_id) if tenant_id else None
+        self.registry = registry
+        self.feature_columns: List[str] = []
+        self.risk_features: List[str] = []
+        self.metadata: Optional[ModelMetadata] = None
     
     def prepare_features(self, transactions_data: List[Dict]) -> pd.DataFrame:
         """Prepare features from transaction data"""
@@ -69,58 +81,49 @@ class FinancialMLModel:
         
         return daily_features
     
+    def daily_revenue(self, transactions_data: List[Dict]) -> Tuple[np.ndarray, Optional[Any]]:
+        """Dense daily revenue series (oldest first) and its last date"""
+        if not transactions_data:
+            return np.zeros(0), None
+        df = pd.DataFrame(transactions_data)
+        days = pd.to_datetime(df['created_at'], utc=True).dt.tz_localize(None).values.astype('datetime64[D]')
+        end = days.max()
+        span = int((end - days.min()).astype(int)) + 1
+        return daily_totals(days, df['amount'].astype(float).values, end, span), end
+    
     def train_revenue_model(self, transactions_data: List[Dict]) -> Dict[str, Any]:
-        """Train revenue prediction model"""
+        """Train the direct multi-horizon revenue model on one merchant's (or pooled) history"""
         try:
-            features_df = self.prepare_features(transactions_data)
-            
-            if len(features_df) < 10:
-                return {'error': 'Insufficient data for training'}
-            
-            # Prepare target variable (next day revenue)
-            features_df['target'] = features_df['amount_sum'].shift(-1)
-            features_df = features_df.dropna()
-            
-            if len(features_df) < 5:
-                return {'error': 'Insufficient data after preprocessing'}
-            
-            # Select features
-            feature_columns = [col for col in features_df.columns 
-                             if col not in ['date_', 'target'] and not col.startswith('date')]
-            
-            X = features_df[feature_columns]
-            y = features_df['target']
-            
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42
+            series, end = self.daily_revenue(transactions_data)
+            forecaster = DirectForecaster(
+                max_horizon=settings.FORECAST_MAX_HORIZON_DAYS, coverage=settings.FORECAST_INTERVAL_COVERAGE
             )
+            windows, origins, targets = training_windows([series], [end], forecaster.max_horizon)
             
-            # Scale features
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
-            
-            # Train model
-            self.revenue_model.fit(X_train_scaled, y_train)
-            
-            # Evaluate
-            train_pred = self.revenue_model.predict(X_train_scaled)
-            test_pred = self.revenue_model.predict(X_test_scaled)
+            if len(windows) < 10:
+                return {'error': 'Insufficient data for training'}
             
-            train_mae = mean_absolute_error(y_train, train_pred)
-            test_mae = mean_absolute_error(y_test, test_pred)
+            # Estimator chosen by rolling-origin CV rather than a random split
+            forecaster.tune(windows, origins, targets)
+            forecaster.fit(windows, origins, targets)
+            self.revenue_model = forecaster
+            self.feature_columns = list(FEATURE_NAMES)
             
             # Save model
-            self._save_models()
+            self._save_models(
+                metrics=forecaster.metrics,
+                training_window={'start': str(end - (len(series) - 1)), 'end': str(end)},
+                n_samples=forecaster.n_samples,
+                cv_results=forecaster.search_results,
+            )
             self.is_trained = True
             
             return {
                 'status': 'success',
-                'train_mae': round(train_mae, 2),
-                'test_mae': round(test_mae, 2),
+                **{k: round(v, 4) for k, v in forecaster.metrics.items()},
                 'feature_importance': dict(zip(
-                    feature_columns, 
-                    self.revenue_model.feature_importances_
+                    FEATURE_NAMES,
+                    getattr(forecaster.estimator, 'feature_importances_', [])
                 ))
             }
             
@@ -129,66 +132,70 @@ class FinancialMLModel:
             return {'error': f'Training failed: {str(e)}'}
     
     def predict_revenue(self, recent_data: List[Dict], days_ahead: int = 7) -> List[float]:
-        """Predict future revenue"""
+        """Predict revenue for each of the next days_ahead days"""
         try:
             if not self.is_trained:
                 self._load_models()
-            
-            features_df = self.prepare_features(recent_data)
-            
-            if features_df.empty:
+            if not isinstance(self.revenue_model, DirectForecaster):
                 return [0.0] * days_ahead
             
-            # Get latest features
-            latest_features = features_df.iloc[-1:].select_dtypes(include=[np.number])
-            
-            # Remove date columns
-            feature_columns = [col for col in latest_features.columns 
-                             if not col.startswith('date')]
-            latest_features = latest_features[feature_columns]
-            
-            # Scale features
-            features_scaled = self.scaler.transform(latest_features)
-            
-            # Generate predictions
-            predictions = []
-            current_features = features_scaled[0].copy()
-            
-            for _ in range(days_ahead):
-                pred = self.revenue_model.predict(current_features.reshape(1, -1))[0]
-                predictions.append(max(0, pred))  # Ensure non-negative
-                
-                # Update features for next prediction (simple approach)
-                current_features = np.roll(current_features, 1)
-                current_features[0] = pred
+            series, end = self.daily_revenue(recent_data)
+            if end is None:
+                return [0.0] * days_ahead
+            window = np.zeros(N_LAGS)
+            tail = series[-N_LAGS:]
+            window[N_LAGS - len(tail):] = tail
             
-            return [round(p, 2) for p in predictions]
+            result = self.revenue_model.predict(window[None, :], np.array([end]), days_ahead)
+            predictions = [round(float(p), 2) for p in result.mean[0]]
+            # Horizons beyond the model's range repeat its last day
+            return predictions + predictions[-1:] * (days_ahead - len(predictions))
             
         except Exception as e:
             logger.error(f"Error predicting revenue: {str(e)}")
             return [0.0] * days_ahead
     
-    def _save_models(self):
-        """Save trained models"""
+    def _save_models(self, metrics: Optional[Dict[str, float]] = None,
+                     training_window: Optional[Dict[str, str]] = None, n_samples: int = 0,
+                     cv_results: Optional[List[Dict[str, Any]]] = None):
+        """Register trained models as a new version in the model registry"""
         try:
-            joblib.dump(self.revenue_model, f"{self.model_path}/revenue_model.joblib")
-            joblib.dump(self.risk_model, f"{self.model_path}/risk_model.joblib")
-            joblib.dump(self.scaler, f"{self.model_path}/scaler.joblib")
-            logger.info("Models saved successfully")
+            bundle = {
+                'revenue_model': self.revenue_model,
+                'risk_model': self.risk_model,
+                'scaler': self.scaler,
+                'feature_columns': self.feature_columns,
+                'risk_features': self.risk_features,
+            }
+            metadata = ModelMetadata(
+                name=REVENUE_MODEL,
+                scope="",
+                metrics=metrics or {},
+                feature_schema=self.feature_columns,
+                training_window=training_window or {},
+                n_samples=n_samples,
+                params=getattr(self.revenue_model, 'estimator', self.revenue_model).get_params(),
+                cv_results=cv_results or [],
+            )
+            self.metadata = self.registry.register(bundle, metadata, tenant_id=self.tenant_id)
+            logger.info(f"Models saved successfully as version {self.metadata.version}")
         except Exception as e:
             logger.error(f"Error saving models: {str(e)}")
     
-    def _load_models(self):
-        """Load trained models"""
+    def _load_models(self, version: Optional[str] = None):
+        """Load trained models (merchant model if any, else global) from the registry"""
         try:
-            if os.path.exists(f"{self.model_path}/revenue_model.joblib"):
-                self.revenue_model = joblib.load(f"{self.model_path}/revenue_model.joblib")
-                self.risk_model = joblib.load(f"{self.model_path}/risk_model.joblib")
-                self.scaler = joblib.load(f"{self.model_path}/scaler.joblib")
-                self.is_trained = True
-                logger.info("Models loaded successfully")
-            else:
-                logger.warning("No saved models found")
+            loaded = self.registry.load(REVENUE_MODEL, tenant_id=self.tenant_id, version=version)
+            bundle = loaded.model
+            self.revenue_model = bundle['revenue_model']
+            self.risk_model = bundle.get('risk_model', self.risk_model)
+            self.scaler = bundle.get('scaler', self.scaler)
+            self.feature_columns = list(bundle.get('feature_columns') or [])
+            self.risk_features = list(bundle.get('risk_features') or [])
+            self.metadata = loaded.metadata
+            self.is_trained = True
+        except ModelNotFound:
+            logger.warning("No saved models found")
         except Exception as e:
             logger.error(f"Error loading models: {str(e)}")
 
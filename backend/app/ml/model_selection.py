@@ -0,0 +1,184 @@
+"""
+Time-series model selection.
+
+Rolling-origin cross-validation: the last n_splits blocks of test_days are
+each scored by a model trained only on rows whose origin is at least `gap`
+days before the block, so no fold sees the future (and, with gap set to the
+forecast horizon, no training target overlaps the test period).
+
+Candidate x fold fits fan out over a loky process pool bounded to the cores
+available to the worker; large arrays are memory-mapped to the workers by
+joblib rather than copied. Gradient boosting candidates are early-stopped on
+the chronologically last part of each training fold.
+"""
+import logging
+import os
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Split = Tuple[np.ndarray, np.ndarray]
+
+# (estimator, grid) pairs searched for the revenue models. Boosting stages are
+# an upper bound; early stopping picks the count.
+DEFAULT_SEARCH_SPACE: List[Tuple[Any, Dict[str, List[Any]]]] = [
+    (
+        RandomForestRegressor(n_estimators=200, random_state=42),
+        {"max_depth": [None, 12], "min_samples_leaf": [5, 20], "max_features": [1.0, 0.5]},
+    ),
+    (
+        GradientBoostingRegressor(n_estimators=500, subsample=0.8, random_state=42),
+        {"learning_rate": [0.05, 0.1], "max_depth": [3, 5]},
+    ),
+]
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+def resolve_n_jobs(n_jobs: Optional[int] = None) -> int:
+    """settings.ML_TRAINING_N_JOBS by default; non-positive values count back from all cores like joblib."""
+    n_jobs = settings.ML_TRAINING_N_JOBS if n_jobs is None else n_jobs
+    cores = available_cores()
+    return max(1, min(n_jobs if n_jobs > 0 else cores + 1 + n_jobs, cores))
+
+
+def rolling_origin_splits(
+    origins: Sequence[Any], n_splits: int = 3, test_days: int = 28, gap: int = 0, min_train: int = 10
+) -> List[Split]:
+    """
+    Row indices of (train, test) per fold, oldest fold first. `origins` is
+    the date each row is forecast from; folds with fewer than min_train
+    training rows are dropped.
+    """
+    days = np.asarray(origins, dtype="datetime64[D]")
+    if days.size == 0:
+        return []
+    last = days.max()
+    splits = []
+    for k in range(n_splits, 0, -1):
+        test_start = last - k * test_days + 1
+        test_end = test_start + test_days
+        train = np.flatnonzero(days < test_start - gap)
+        test = np.flatnonzero((days >= test_start) & (days < test_end))
+        if len(train) >= min_train and len(test):
+            splits.append((train[np.argsort(days[train], kind="stable")], test))
+    return splits
+
+
+def candidates(search_space: Sequence[Tuple[Any, Dict[str, List[Any]]]]) -> List[Tuple[Any, Dict[str, Any]]]:
+    """Every (estimator, params) combination of a search space."""
+    out = []
+    for estimator, grid in search_space:
+        keys = list(grid)
+        for values in product(*(grid[key] for key in keys)):
+            out.append((estimator, dict(zip(keys, values))))
+    return out
+
+
+def _early_stopping(estimator: Any) -> bool:
+    return hasattr(estimator, "staged_predict") and "n_estimators" in estimator.get_params()
+
+
+def _fit_and_score(
+    estimator: Any, params: Dict[str, Any], X: np.ndarray, y: np.ndarray, split: Split, validation_fraction: float
+) -> Tuple[float, Optional[int]]:
+    """Test MAE of one candidate on one fold, and the early-stopped stage count if boosted."""
+    train, test = split
+    model = clone(estimator).set_params(**params)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=1)  # Parallelism is across fits.
+
+    if not _early_stopping(model):
+        model.fit(X[train], y[train])
+        return float(mean_absolute_error(y[test], model.predict(X[test]))), None
+
+    # Train indices are time-ordered: validate on the latest part of the fold.
+    cut = max(1, int(len(train) * (1 - validation_fraction)))
+    fit_rows, validation_rows = train[:cut], train[cut:]
+    model.fit(X[fit_rows], y[fit_rows])
+    if len(validation_rows):
+        errors = [mean_absolute_error(y[validation_rows], p) for p in model.staged_predict(X[validation_rows])]
+        best = int(np.argmin(errors)) + 1
+    else:
+        best = model.n_estimators_
+    for stage, prediction in enumerate(model.staged_predict(X[test]), start=1):
+        if stage == best:
+            return float(mean_absolute_error(y[test], prediction)), best
+    return float(mean_absolute_error(y[test], model.predict(X[test]))), best
+
+
+@dataclass
+class SearchResult:
+    estimator: Any  # Unfitted best candidate, boosting stages fixed by early stopping
+    params: Dict[str, Any]
+    cv_mae: float
+    cv_mae_std: float
+    results: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def metrics(self) -> Dict[str, float]:
+        return {"cv_mae": self.cv_mae, "cv_mae_std": self.cv_mae_std}
+
+
+def search(
+    X: np.ndarray,
+    y: np.ndarray,
+    splits: Sequence[Split],
+    search_space: Sequence[Tuple[Any, Dict[str, List[Any]]]] = DEFAULT_SEARCH_SPACE,
+    n_jobs: Optional[int] = None,
+    validation_fraction: float = 0.15,
+) -> SearchResult:
+    """
+    Score every candidate on every fold in parallel and return the one with
+    the lowest mean test MAE. The returned estimator is configured for a
+    final fit on all rows, using n_jobs cores.
+    """
+    if not splits:
+        raise ValueError("No cross-validation folds; not enough history")
+    pool = candidates(search_space)
+    workers = resolve_n_jobs(n_jobs)
+    tasks = [(c, f) for c in range(len(pool)) for f in range(len(splits))]
+    logger.info(f"Model search: {len(pool)} candidates x {len(splits)} folds on {workers} workers")
+
+    scores = Parallel(n_jobs=workers, backend="loky")(
+        delayed(_fit_and_score)(pool[c][0], pool[c][1], X, y, splits[f], validation_fraction) for c, f in tasks
+    )
+
+    by_candidate: Dict[int, List[Tuple[float, Optional[int]]]] = {}
+    for (c, _), score in zip(tasks, scores):
+        by_candidate.setdefault(c, []).append(score)
+
+    summaries = {}
+    for c, fold_scores in by_candidate.items():
+        maes = np.array([s for s, _ in fold_scores])
+        stages = [n for _, n in fold_scores if n is not None]
+        summaries[c] = {
+            "estimator": type(pool[c][0]).__name__,
+            "params": {**pool[c][1], **({"n_estimators": int(np.median(stages))} if stages else {})},
+            "mae": float(maes.mean()),
+            "mae_std": float(maes.std()),
+        }
+    ranked = sorted(summaries, key=lambda c: summaries[c]["mae"])
+    results = [summaries[c] for c in ranked]
+
+    best = results[0]
+    estimator = clone(pool[ranked[0]][0]).set_params(**best["params"])
+    if "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=workers)
+    logger.info(f"Model search best: {best['estimator']} {best['params']} (MAE {best['mae']:.4f})")
+    return SearchResult(estimator, best["params"], best["mae"], best["mae_std"], results)
@@ -0,0 +1,223 @@
+"""
+Versioned model registry.
+
+Artifacts live on disk as
+
+    {root}/{name}/{scope}/{version}/model.joblib
+    {root}/{name}/{scope}/{version}/metadata.json
+    {root}/{name}/{scope}/LATEST
+
+where scope is "global" or "merchant-{user_id}". Versions are written to a
+temporary directory and renamed into place, and LATEST is swapped
+atomically, so readers never observe a half-written model. Loaded models
+are kept in a process-wide LRU keyed by (name, scope, version); artifacts
+above a size threshold are memory-mapped rather than copied into the heap,
+which keeps large forests cheap to load and shared between worker processes
+through the page cache.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+MODEL_FILE = "model.joblib"
+METADATA_FILE = "metadata.json"
+LATEST_FILE = "LATEST"
+
+
+@dataclass
+class ModelMetadata:
+    """What a model version was trained on and how well it did."""
+    name: str
+    scope: str
+    version: str = ""
+    created_at: str = ""
+    metrics: Dict[str, float] = field(default_factory=dict)
+    feature_schema: List[str] = field(default_factory=list)
+    training_window: Dict[str, Optional[str]] = field(default_factory=dict)  # {"start": iso, "end": iso}
+    n_samples: int = 0
+    params: Dict[str, Any] = field(default_factory=dict)
+    cv_results: List[Dict[str, Any]] = field(default_factory=list)  # Model search, best first
+
+
+@dataclass
+class LoadedModel:
+    model: Any
+    metadata: ModelMetadata
+
+
+def scope_for(tenant_id: Optional[Any] = None) -> str:
+    return f"merchant-{tenant_id}" if tenant_id else GLOBAL_SCOPE
+
+
+class ModelNotFound(LookupError):
+    pass
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        root: str = settings.ML_MODEL_SAVE_PATH,
+        cache_size: int = settings.ML_MODEL_CACHE_SIZE,
+        mmap_min_bytes: int = settings.ML_MODEL_MMAP_MIN_BYTES,
+    ):
+        self.root = root
+        self.cache_size = cache_size
+        self.mmap_min_bytes = mmap_min_bytes
+        self._cache: "OrderedDict[Tuple[str, str, str], LoadedModel]" = OrderedDict()
+        # (name, scope) -> (LATEST mtime, version); avoids re-reading the pointer file per request.
+        self._latest: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._lock = threading.RLock()
+
+    def _scope_dir(self, name: str, scope: str) -> str:
+        return os.path.join(self.root, name, scope)
+
+    def register(self, model: Any, metadata: ModelMetadata, tenant_id: Optional[Any] = None) -> ModelMetadata:
+        """Persist a new version and make it the latest for its scope."""
+        metadata.scope = scope_for(tenant_id) if tenant_id else (metadata.scope or GLOBAL_SCOPE)
+        metadata.version = f"{datetime.utcnow():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+        metadata.created_at = datetime.utcnow().isoformat()
+
+        scope_dir = self._scope_dir(metadata.name, metadata.scope)
+        os.makedirs(scope_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=scope_dir)
+        try:
+            # Uncompressed so large artifacts can be memory-mapped on load.
+            joblib.dump(model, os.path.join(staging, MODEL_FILE))
+            with open(os.path.join(staging, METADATA_FILE), "w") as handle:
+                json.dump(asdict(metadata), handle, indent=2, default=str)
+            os.replace(staging, os.path.join(scope_dir, metadata.version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        pointer = os.path.join(scope_dir, f".{LATEST_FILE}.{uuid.uuid4().hex}")
+        with open(pointer, "w") as handle:
+            handle.write(metadata.version)
+        os.replace(pointer, os.path.join(scope_dir, LATEST_FILE))
+
+        with self._lock:
+            self._cache[(metadata.name, metadata.scope, metadata.version)] = LoadedModel(model, metadata)
+            self._trim()
+        logger.info(f"Registered model {metadata.name}/{metadata.scope} version {metadata.version}")
+        return metadata
+
+    def latest_version(self, name: str, scope: str) -> Optional[str]:
+        path = os.path.join(self._scope_dir(name, scope), LATEST_FILE)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+        cached = self._latest.get((name, scope))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path) as handle:
+            version = handle.read().strip()
+        self._latest[(name, scope)] = (mtime, version)
+        return version
+
+    def load(
+        self,
+        name: str,
+        tenant_id: Optional[Any] = None,
+        version: Optional[str] = None,
+        fallback_to_global: bool = True,
+    ) -> LoadedModel:
+        """
+        The requested (default: latest) version for the tenant, falling back
+        to the global model when the tenant has none. Served from the LRU
+        after the first load.
+        """
+        scopes = [scope_for(tenant_id)]
+        if tenant_id and fallback_to_global:
+            scopes.append(GLOBAL_SCOPE)
+
+        for scope in scopes:
+            resolved = version or self.latest_version(name, scope)
+            if resolved is None:
+                continue
+            key = (name, scope, resolved)
+            with self._lock:
+                hit = self._cache.get(key)
+                if hit is not None:
+                    self._cache.move_to_end(key)
+                    return hit
+            loaded = self._read(name, scope, resolved)
+            with self._lock:
+                self._cache[key] = loaded
+                self._trim()
+            return loaded
+        raise ModelNotFound(f"No model '{name}' for scope {scopes[0]}")
+
+    def _read(self, name: str, scope: str, version: str) -> LoadedModel:
+        version_dir = os.path.join(self._scope_dir(name, scope), version)
+        model_path = os.path.join(version_dir, MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise ModelNotFound(f"Model '{name}' version {version} not found for scope {scope}")
+        mmap_mode = "r" if os.path.getsize(model_path) >= self.mmap_min_bytes else None
+        model = joblib.load(model_path, mmap_mode=mmap_mode)
+        logger.info(f"Loaded model {name}/{scope} version {version} (mmap={bool(mmap_mode)})")
+        return LoadedModel(model, self._read_metadata(version_dir))
+
+    @staticmethod
+    def _read_metadata(version_dir: str) -> ModelMetadata:
+        with open(os.path.join(version_dir, METADATA_FILE)) as handle:
+            return ModelMetadata(**json.load(handle))
+
+    def _trim(self) -> None:
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def metadata(self, name: str, tenant_id: Optional[Any] = None, version: Optional[str] = None) -> ModelMetadata:
+        scope = scope_for(tenant_id)
+        version = version or self.latest_version(name, scope)
+        if version is None:
+            raise ModelNotFound(f"No model '{name}' for scope {scope}")
+        return self._read_metadata(os.path.join(self._scope_dir(name, scope), version))
+
+    def scopes(self, name: str) -> List[str]:
+        """Scopes that have a latest version of the model."""
+        model_dir = os.path.join(self.root, name)
+        if not os.path.isdir(model_dir):
+            return []
+        return [
+            entry for entry in os.listdir(model_dir)
+            if os.path.exists(os.path.join(model_dir, entry, LATEST_FILE))
+        ]
+
+    def versions(self, name: str, tenant_id: Optional[Any] = None) -> List[str]:
+        scope_dir = self._scope_dir(name, scope_for(tenant_id))
+        if not os.path.isdir(scope_dir):
+            return []
+        return sorted(
+            entry for entry in os.listdir(scope_dir)
+            if not entry.startswith(".") and os.path.isdir(os.path.join(scope_dir, entry))
+        )
+
+    def prune(self, name: str, tenant_id: Optional[Any] = None, keep: int = 3) -> int:
+        """Delete all but the newest `keep` versions (never the latest). Returns how many were removed."""
+        scope = scope_for(tenant_id)
+        latest = self.latest_version(name, scope)
+        stale = [v for v in self.versions(name, tenant_id)[:-keep] if v != latest] if keep > 0 else []
+        for version in stale:
+            shutil.rmtree(os.path.join(self._scope_dir(name, scope), version), ignore_errors=True)
+            with self._lock:
+                self._cache.pop((name, scope, version), None)
+        return len(stale)
+
+
+model_registry = ModelRegistry()
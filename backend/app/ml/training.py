@@ -1,16 +1,22 @@
 import logging
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+from uuid import UUID
+
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score
-import joblib # For saving/loading models
-import os
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.preprocessing import StandardScaler
 
 from app.core.config import settings
-from app.database import get_db
-from app.models.transaction import Transaction # Example model for data fetching
+from app.database import get_session_maker
+from app.ml.batch_inference import RISK_FEATURES, risk_features, risk_labels, transactions_query
+from app.ml.feature_store import TrainingFeatureCache
+from app.ml.forecasting import FEATURE_NAMES, N_LAGS, REVENUE_MODEL, DirectForecaster, training_windows
+from app.ml.model_selection import SearchResult, rolling_origin_splits, search
+from app.ml.registry import ModelMetadata, model_registry
+from app.models.transaction import Transaction
+from app.services.analytics_engine import FAILED_STATUSES, SUCCESS_STATUSES
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
@@ -26,77 +32,61 @@ class MLModelTrainer:
     customer churn prediction, financing eligibility).
     """
 
-    def __init__(self, model_name: str = "sales_forecaster"):
+    def __init__(self, model_name: str = "sales_forecaster", tenant_id: Optional[str] = None):
         """
         Initializes the MLModelTrainer with a specific model name.
 
         Args:
             model_name (str): The logical name of the model to be trained.
-                              Used for distinguishing models and their saved files.
+                              Used as the model's name in the registry.
+            tenant_id (Optional[str]): Merchant to train a per-merchant model for;
+                                       None trains the global model.
         """
         self.model_name = model_name
+        self.tenant_id = tenant_id
         self.model = None
-        self.model_path = os.path.join(settings.ML_MODEL_SAVE_PATH, f"{self.model_name}.joblib")
+        self.metrics: Dict[str, float] = {}
+        self.feature_columns: List[str] = []
+        self.n_samples = 0
+        self.training_window: Dict[str, str] = {}
+        self.cv_results: List[Dict[str, Any]] = []
+        self.row_days = None
+        self.version: Optional[str] = None
+        self.feature_cache = TrainingFeatureCache()
         logger.info(f"MLModelTrainer initialized for model: {self.model_name}")
 
-        # Ensure the model save directory exists
-        os.makedirs(settings.ML_MODEL_SAVE_PATH, exist_ok=True)
-
 
-    async def fetch_training_data(self) -> pd.DataFrame:
+    async def fetch_training_data(self, full_refresh: bool = False) -> pd.DataFrame:
         """
-        Fetches historical data from the PostgreSQL database required for model training.
-        This is a placeholder and should be extended based on specific model needs.
+        Returns daily per-merchant training features (sales, lags, rolling means,
+        calendar fields) from the on-disk feature cache.
+
+        The cache is first brought up to date: only complete days not cached yet
+        are resampled and featurized in PostgreSQL and streamed in through a
+        server-side cursor, so raw transactions never pass through pandas.
+        If the refresh fails, training proceeds on the cached days.
 
-        For sales forecasting, it might fetch historical transaction data.
-        For financing recommendations, it might fetch aggregated business metrics.
+        Args:
+            full_refresh (bool): Rebuild the cache from scratch instead of appending new days.
 
         Returns:
-            pd.DataFrame: A pandas DataFrame containing the prepared training data.
-                          Returns an empty DataFrame if no data is found or on error.
+            pd.DataFrame: One row per merchant per day (only the tenant's rows for a
+                          per-merchant model). Empty if nothing is cached.
         """
-        logger.info(f"Fetching training data for {self.model_name} from database.")
-        data = []
+        logger.info(f"Fetching training data for {self.model_name} from the feature cache.")
         try:
-            # Use async session from FastAPI's dependency system (or direct async engine)
-            async for session in get_db():
-                # Example: Fetching a simplified set of transactions for demonstration
-                # In a real scenario, this would involve more complex queries,
-                # aggregations, and feature engineering.
-                transactions = await session.execute(
-                    Transaction.__table__.select().order_by(Transaction.transaction_date.asc())
-                )
-                for transaction in transactions.scalars().all():
-                    data.append({
-                        "transaction_date": transaction.transaction_date,
-                        "amount": transaction.amount,
-                        "product_category": transaction.product_category, # Example feature
-                        # Add other relevant features from transactions or related tables
-                    })
-                logger.info(f"Fetched {len(data)} records for training.")
-
+            async with get_session_maker()() as session:
+                await self.feature_cache.refresh(session, full=full_refresh)
         except Exception as e:
-            logger.error(f"Error fetching training data: {e}", exc_info=True)
-            return pd.DataFrame() # Return empty DataFrame on error
+            logger.error(f"Error refreshing training feature cache: {e}", exc_info=True)
 
-        if not data:
+        df = self.feature_cache.load()
+        if self.tenant_id:
+            df = df[df["user_id"] == str(self.tenant_id)]
+        if df.empty:
             logger.warning("No data found for training.")
-            return pd.DataFrame()
-
-        df = pd.DataFrame(data)
-        # Example: Basic feature engineering for sales forecasting (e.g., total daily sales)
-        # This part will be highly dependent on the specific ML task.
-        if self.model_name == "sales_forecaster":
-            df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-            df = df.set_index('transaction_date').resample('D')['amount'].sum().reset_index()
-            df.rename(columns={'amount': 'daily_sales'}, inplace=True)
-            # Add lag features, rolling averages, etc., for time series forecasting
-            df['day_of_week'] = df['transaction_date'].dt.dayofweek
-            df['month'] = df['transaction_date'].dt.month
-            df['lag_1_day_sales'] = df['daily_sales'].shift(1)
-            df.dropna(inplace=True) # Drop rows with NaNs created by lag features
-            logger.info(f"Prepared data for sales forecaster with {df.shape[0]} samples.")
-
+            return df
+        logger.info(f"Loaded {len(df)} daily feature rows for training.")
         return df
 
     def preprocess_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
@@ -119,15 +109,18 @@ class MLModelTrainer:
         # This part is highly dependent on the model's target and features.
         # Example for 'sales_forecaster':
         if self.model_name == "sales_forecaster":
-            features = ['day_of_week', 'month', 'lag_1_day_sales']
+            features = ['day_of_week', 'month', 'lag_1_day_sales', 'lag_7_day_sales', 'rolling_mean_7', 'rolling_mean_28']
             target = 'daily_sales'
 
             for col in features + [target]:
                 if col not in df.columns:
                     raise ValueError(f"Missing required column for '{self.model_name}': {col}")
 
+            # Lags are undefined for each merchant's first days.
+            df = df.dropna(subset=features + [target])
             X = df[features]
             y = df[target]
+            self.row_days = df['day'].to_numpy()
 
             logger.info(f"Data preprocessed: X shape {X.shape}, y shape {y.shape}")
             return X, y
@@ -155,51 +148,49 @@ class MLModelTrainer:
             raise ValueError("Cannot train with empty features or target data.")
 
         logger.info(f"Starting training for model: {self.model_name}")
+        self.feature_columns = list(X.columns)
+        self.n_samples = len(X)
 
-        # Split data into training and testing sets
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        # Rolling-origin folds over the rows' dates; a random split would train on the future.
+        if self.row_days is None or len(self.row_days) != len(X):
+            raise ValueError("Training rows need their dates for time-series validation.")
+        splits = rolling_origin_splits(self.row_days, settings.ML_CV_SPLITS, settings.ML_CV_TEST_DAYS)
 
         if self.model_name == "sales_forecaster":
-            # Example: Using RandomForestRegressor for sales forecasting
-            model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
-            model.fit(X_train, y_train)
-            logger.info("RandomForestRegressor trained.")
+            # Forest and early-stopped gradient boosting candidates, searched in parallel
+            result = search(X.to_numpy(), y.to_numpy(), splits)
         # Add more `elif` conditions for other model types
         # elif self.model_name == "customer_churn_predictor":
-        #     model = LogisticRegression()
-        #     model.fit(X_train, y_train)
+        #     result = search(X.to_numpy(), y.to_numpy(), splits, [(LogisticRegression(), {"C": [0.1, 1.0]})])
         else:
             logger.warning(f"No specific model implementation for '{self.model_name}'. Using Linear Regression as default.")
-            model = LinearRegression()
-            model.fit(X_train, y_train)
+            result = search(X.to_numpy(), y.to_numpy(), splits, [(LinearRegression(), {})])
+
+        model = result.estimator
+        model.fit(X, y)
+        logger.info(f"{type(model).__name__} trained with {result.params}.")
 
         self.model = model
-        self._evaluate_model(model, X_test, y_test)
+        self._record_search(result)
         return model
 
-    def _evaluate_model(self, model: Any, X_test: pd.DataFrame, y_test: pd.Series):
+    def _record_search(self, result: SearchResult):
         """
-        Evaluates the trained model on the test set and logs performance metrics.
+        Logs cross-validated performance and keeps it for the registry.
 
         Args:
-            model (Any): The trained model.
-            X_test (pd.DataFrame): Test features.
-            y_test (pd.Series): True target values for the test set.
+            result (SearchResult): Outcome of the model search.
         """
-        logger.info(f"Evaluating model: {self.model_name}")
-        y_pred = model.predict(X_test)
-        mse = mean_squared_error(y_test, y_pred)
-        r2 = r2_score(y_test, y_pred)
-
-        logger.info(f"Model '{self.model_name}' Evaluation Metrics:")
-        logger.info(f"  Mean Squared Error (MSE): {mse:.4f}")
-        logger.info(f"  R-squared (R2): {r2:.4f}")
+        logger.info(f"Model '{self.model_name}' Cross-Validation Metrics:")
+        logger.info(f"  Mean Absolute Error (MAE): {result.cv_mae:.4f} +/- {result.cv_mae_std:.4f}")
 
-        # You might want to store these metrics in a database or a tracking system (e.g., MLflow)
+        # Recorded with the model version in the registry
+        self.metrics = result.metrics
+        self.cv_results = result.results
 
     def save_model(self, model: Any):
         """
-        Saves the trained model to disk using joblib.
+        Registers the trained model as a new version in the model registry.
 
         Args:
             model (Any): The trained model object to save.
@@ -209,26 +200,118 @@ class MLModelTrainer:
             return
 
         try:
-            joblib.dump(model, self.model_path)
-            logger.info(f"Model '{self.model_name}' saved to {self.model_path}")
+            metadata = model_registry.register(
+                model,
+                ModelMetadata(
+                    name=self.model_name,
+                    scope="",
+                    metrics=self.metrics,
+                    feature_schema=self.feature_columns,
+                    training_window=self.training_window,
+                    n_samples=self.n_samples,
+                    params=self._params(model),
+                    cv_results=self.cv_results,
+                ),
+                tenant_id=self.tenant_id,
+            )
+            self.version = metadata.version
+            logger.info(f"Model '{self.model_name}' saved as {metadata.scope} version {metadata.version}")
         except Exception as e:
             logger.error(f"Failed to save model '{self.model_name}': {e}", exc_info=True)
 
 
-    async def run_training_pipeline(self):
+    def train_forecaster(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Trains the direct multi-horizon revenue forecaster on every merchant's
+        daily sales series.
+
+        Args:
+            df (pd.DataFrame): Daily features as returned by fetch_training_data.
+
+        Returns:
+            Dict[str, Any]: The model bundle to register.
+        """
+        forecaster = DirectForecaster(
+            max_horizon=settings.FORECAST_MAX_HORIZON_DAYS, coverage=settings.FORECAST_INTERVAL_COVERAGE
+        )
+        _, series, ends = self.feature_cache.series(df, min_days=N_LAGS + forecaster.max_horizon)
+        windows, origins, targets = training_windows(series, ends, forecaster.max_horizon)
+        if len(windows) < 10:
+            raise ValueError("Insufficient history to train the revenue forecaster.")
+
+        logger.info(f"Training revenue forecaster on {len(windows)} windows from {len(series)} merchants")
+        forecaster.tune(windows, origins, targets)
+        forecaster.fit(windows, origins, targets)
+        self.metrics = forecaster.metrics
+        self.cv_results = forecaster.search_results
+        self.feature_columns = list(FEATURE_NAMES)
+        self.n_samples = forecaster.n_samples
+        self.model = {"revenue_model": forecaster, "feature_columns": self.feature_columns}
+        return self.model
+
+    async def train_risk_model(self) -> Dict[str, Any]:
+        """
+        Trains the transaction risk classifier (failed vs. successful) that the
+        batch insight job scores with, on the most recent settled transactions.
+        Accuracy and ROC AUC are measured on the latest 20% before refitting on all rows.
+
+        Returns:
+            Dict[str, Any]: Bundle entries to add to the registered model;
+                            empty if there are too few rows or only one outcome.
+        """
+        stmt = transactions_query().where(Transaction.status.in_(SUCCESS_STATUSES + FAILED_STATUSES))
+        if self.tenant_id:
+            stmt = stmt.where(Transaction.user_id == UUID(str(self.tenant_id)))
+        stmt = stmt.order_by(Transaction.created_at.desc()).limit(settings.ML_RISK_TRAINING_MAX_ROWS)
+        async with get_session_maker()() as session:
+            rows = (await session.execute(stmt)).all()[::-1]
+
+        X, y = risk_features(rows), risk_labels([row.status for row in rows])
+        if len(rows) < 100 or len(set(y)) < 2:
+            logger.warning(f"Risk model not trained: {len(rows)} settled transactions, outcomes {sorted(set(y))}")
+            return {}
+
+        cut = int(len(rows) * 0.8)
+        scaler = StandardScaler().fit(X[:cut])
+        model = GradientBoostingClassifier(n_estimators=100, random_state=42).fit(scaler.transform(X[:cut]), y[:cut])
+        holdout = scaler.transform(X[cut:])
+        self.metrics["risk_accuracy"] = float(accuracy_score(y[cut:], model.predict(holdout)))
+        if len(set(y[cut:])) == 2:
+            self.metrics["risk_roc_auc"] = float(roc_auc_score(y[cut:], model.predict_proba(holdout)[:, 1]))
+        logger.info(f"Risk model holdout metrics: { {k: v for k, v in self.metrics.items() if k.startswith('risk_')} }")
+
+        scaler = StandardScaler().fit(X)
+        model.fit(scaler.transform(X), y)
+        return {"risk_model": model, "scaler": scaler, "risk_features": list(RISK_FEATURES)}
+
+    @staticmethod
+    def _params(model: Any) -> Dict[str, Any]:
+        if isinstance(model, dict):
+            model = getattr(model.get("revenue_model"), "estimator", None)
+        return model.get_params() if hasattr(model, "get_params") else {}
+
+    async def run_training_pipeline(self, full_refresh: bool = False):
         """
         Executes the full training pipeline: fetches data, preprocesses, trains,
         evaluates, and saves the model.
+
+        Args:
+            full_refresh (bool): Rebuild the training feature cache from scratch.
         """
         logger.info(f"Initiating full training pipeline for model: {self.model_name}")
         try:
-            df_raw = await self.fetch_training_data()
+            df_raw = await self.fetch_training_data(full_refresh=full_refresh)
             if df_raw.empty:
                 logger.warning("Training pipeline aborted: No data available.")
-                return
-
-            X, y = self.preprocess_data(df_raw)
-            trained_model = self.train_model(X, y)
+                return False
+
+            self.training_window = {"start": str(df_raw["day"].min().date()), "end": str(df_raw["day"].max().date())}
+            if self.model_name == REVENUE_MODEL:
+                trained_model = self.train_forecaster(df_raw)
+                trained_model.update(await self.train_risk_model())
+            else:
+                X, y = self.preprocess_data(df_raw)
+                trained_model = self.train_model(X, y)
             self.save_model(trained_model)
             logger.info(f"Training pipeline completed successfully for model: {self.model_name}")
             return True
@@ -1,11 +1,15 @@
 from app.models.user import User
 from app.models.financing import FinancingOffer, LoanApplication, BusinessMetrics
-from app.models.transaction import Transaction
+from app.models.transaction import Transaction, TransactionInsight, InsightCheckpoint
+from app.models.fx import FxRate
 
 __all__ = [
     "User", 
     "FinancingOffer", 
     "LoanApplication", 
     "BusinessMetrics",
-    "Transaction"
+    "Transaction",
+    "TransactionInsight",
+    "InsightCheckpoint",
+    "FxRate"
 ]
\ No newline at end of file
@@ -3,7 +3,7 @@
 Financing and lending-related database models
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Boolean, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Boolean, Text, JSON, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -16,9 +16,19 @@ from app.database import Base
 class FinancingOffer(Base):
     """AI-generated financing offers for businesses"""
     __tablename__ = "financing_offers"
+    __table_args__ = (
+        # One offer per lender and status for a user; offer materialization upserts on this key.
+        Index(
+            "uq_financing_offers_user_lender_status", "user_id", "lender_name", "status",
+            unique=True, postgresql_where=text("application_id IS NULL"),
+        ),
+        # Offers made for a loan application; re-processing it refreshes them in place.
+        UniqueConstraint("application_id", "lender_name", name="uq_financing_offers_application_lender"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    application_id = Column(String, ForeignKey("loan_applications.id", use_alter=True), nullable=True)
     
     # Offer details
     offer_type = Column(String(50), nullable=False)  # working_capital, equipment, line_of_credit
@@ -46,16 +56,20 @@ class FinancingOffer(Base):
     
     # Relationships
     user = relationship('User', back_populates="financing_offers")
-    applications = relationship("LoanApplication", back_populates="offer")
+    applications = relationship("LoanApplication", back_populates="offer", foreign_keys="LoanApplication.offer_id")
 
 
 class LoanApplication(Base):
     """Loan applications from users"""
     __tablename__ = "loan_applications"
+    __table_args__ = (
+        UniqueConstraint("user_id", "idempotency_key", name="uq_loan_applications_user_idempotency_key"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     offer_id = Column(String, ForeignKey("financing_offers.id"), nullable=True)
+    idempotency_key = Column(String(64), nullable=True)  # Client-supplied; repeats return the original application
     
     # Application details
     requested_amount = Column(Numeric(12, 2), nullable=False)
@@ -68,7 +82,7 @@ class LoanApplication(Base):
     documents = Column(JSON, default={})  # Document URLs and metadata
     
     # Status tracking
-    status = Column(String(20), default="submitted")  # submitted, under_review, approved, rejected
+    status = Column(String(20), default="submitted")  # submitted, under_review, approved, rejected, failed
     reviewed_at = Column(DateTime, nullable=True)
     decision_reason = Column(Text, nullable=True)
     
@@ -83,12 +97,15 @@ class LoanApplication(Base):
     
     # Relationships
     user = relationship("User", back_populates="loan_applications")
-    offer = relationship("FinancingOffer", back_populates="applications")
+    offer = relationship("FinancingOffer", back_populates="applications", foreign_keys=[offer_id])
 
 
 class BusinessMetrics(Base):
     """Business performance metrics for financing decisions"""
     __tablename__ = "business_metrics"
+    __table_args__ = (
+        UniqueConstraint("user_id", "period_start", name="uq_business_metrics_user_period"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -99,6 +116,8 @@ class BusinessMetrics(Base):
     profit_margin = Column(Numeric(5, 4), nullable=True)
     cash_flow = Column(Numeric(12, 2), nullable=True)
     credit_score = Column(Integer, nullable=True)  # New field for persisting credit score
+    score_factors = Column(JSON, nullable=True)  # Inputs the persisted credit_score was computed from
+    scored_at = Column(DateTime, nullable=True)
     
     # Business metrics
     customer_count = Column(Integer, nullable=True)
@@ -117,6 +136,7 @@ class BusinessMetrics(Base):
     
     # Timestamps
     calculated_at = Column(DateTime, default=datetime.utcnow)
+    source_watermark = Column(DateTime(timezone=True), nullable=True)  # Latest transaction updated_at included
     
     # Relationships
     user = relationship('User', back_populates="business_metrics")
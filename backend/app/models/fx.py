@@ -0,0 +1,24 @@
+"""
+Foreign exchange rate database models
+"""
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, Numeric, UniqueConstraint
+from datetime import datetime
+
+from app.database import Base
+
+
+class FxRate(Base):
+    """Value of one unit of `currency` in the base currency, effective from a date until the next row"""
+    __tablename__ = "fx_rates"
+    __table_args__ = (
+        UniqueConstraint("currency", "effective_date", name="uq_fx_rates_currency_effective_date"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    currency = Column(String(3), nullable=False)  # ISO 4217, upper case
+    effective_date = Column(Date, nullable=False)
+    rate_to_base = Column(Numeric(18, 8), nullable=False)  # Units of settings.FX_BASE_CURRENCY per unit
+    source = Column(String(20), nullable=True)  # file, stub
+
+    created_at = Column(DateTime, default=datetime.utcnow)
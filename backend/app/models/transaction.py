@@ -3,7 +3,7 @@
 Transaction and payment-related database models
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Boolean, Text, JSON, text
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Boolean, Text, JSON, text, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -16,6 +16,12 @@ from app.database import Base
 class Transaction(Base):
     """Core transaction model for payment processing"""
     __tablename__ = "transactions"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "source", "wallet_number", "external_id", name="uq_transactions_user_wallet_external_id"
+        ),
+        Index("ix_transactions_updated_at_id", "updated_at", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -30,6 +36,9 @@ class Transaction(Base):
     stripe_payment_id = Column(String(100), nullable=True)
     shopify_order_id = Column(String(100), nullable=True)
     quickbooks_ref = Column(String(100), nullable=True)
+    source = Column(String(20), nullable=True)  # mtn, airtel for imported telco statements
+    wallet_number = Column(String(20), nullable=True)  # Telco wallet the statement line came from
+    external_id = Column(String(100), nullable=True)  # Provider transaction id
     
     # Metadata
     description = Column(String, nullable=True)
@@ -78,6 +87,9 @@ class PaymentMethod(Base):
 class TransactionInsight(Base):
     """AI-generated insights for transactions"""
     __tablename__ = "transaction_insights"
+    __table_args__ = (
+        UniqueConstraint("transaction_id", "insight_type", name="uq_transaction_insights_transaction_type"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     transaction_id = Column(String, ForeignKey("transactions.id"), nullable=False)
@@ -92,4 +104,16 @@ class TransactionInsight(Base):
     generated_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    transaction = relationship("Transaction", back_populates="insights")
\ No newline at end of file
+    transaction = relationship("Transaction", back_populates="insights")
+
+
+class InsightCheckpoint(Base):
+    """Progress of a batch insight job: the last transaction (by updated_at, id) it has scored"""
+    __tablename__ = "insight_checkpoints"
+
+    job = Column(String(50), primary_key=True)
+    watermark_at = Column(DateTime(timezone=True), nullable=True)
+    watermark_id = Column(String, nullable=True)
+    model_version = Column(String(50), nullable=True)
+    rows_scored = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
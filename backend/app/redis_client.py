@@ -4,14 +4,19 @@ Async Redis client factory and type alias used by the backend.
 Provides:
  - get_redis() -> returns a redis.asyncio.Redis instance (create-on-first-use)
  - RedisClient -> alias for the redis.asyncio.Redis class for typing/import compatibility
+ - RedisScript -> a Lua script run with EVALSHA, loaded on first use per server
 """
 
 import os
+import hashlib
 import logging
-from typing import Optional, Any
+from typing import Optional, Any, Callable, Dict, List, Mapping, Sequence
 import json
 
 import redis.asyncio as aioredis
+from redis.exceptions import NoScriptError
+
+from app.core.instrumentation import track_async
 
 # Try to import project settings; fall back to environment
 try:
@@ -22,6 +27,37 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
+# INCR a counter, starting its expiry window on the first hit. Returns the count.
+RATE_LIMIT_SCRIPT = """
+local current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return current
+"""
+
+
+class RedisScript:
+    """
+    Lua script registered with a RedisClient. Calls use EVALSHA with the
+    script's SHA1, so only the hash crosses the wire; if the server does not
+    have the script cached (first call, restart, SCRIPT FLUSH) it is loaded
+    and the call retried once.
+    """
+    def __init__(self, client: "RedisClient", source: str):
+        self.client = client
+        self.source = source
+        self.sha = hashlib.sha1(source.encode()).hexdigest()
+
+    async def __call__(self, keys: Sequence[str] = (), args: Sequence[Any] = ()) -> Any:
+        redis = self.client._ensure_client()
+        async with track_async("redis"):
+            try:
+                return await redis.evalsha(self.sha, len(keys), *keys, *args)
+            except NoScriptError:
+                await redis.script_load(self.source)
+                return await redis.evalsha(self.sha, len(keys), *keys, *args)
+
 
 class RedisClient:
     """
@@ -33,6 +69,7 @@ class RedisClient:
         self.url = url
         self._client: Optional[aioredis.Redis] = None
         self._initialized: bool = False
+        self._rate_limit_script = self.register_script(RATE_LIMIT_SCRIPT)
 
     async def init(self) -> None:
         if self._client is None:
@@ -48,20 +85,97 @@ class RedisClient:
 
     # List operations (async)
     async def lrange(self, key: str, start: int, stop: int) -> list:
-        return await self._ensure_client().lrange(key, start, stop)
+        async with track_async("redis"):
+            return await self._ensure_client().lrange(key, start, stop)
 
     async def lpush(self, key: str, *values: Any) -> int:
-        return await self._ensure_client().lpush(key, *values)
+        async with track_async("redis"):
+            return await self._ensure_client().lpush(key, *values)
+
+    async def ltrim(self, key: str, start: int, stop: int) -> bool:
+        async with track_async("redis"):
+            return await self._ensure_client().ltrim(key, start, stop)
 
     # String / key operations
     async def set(self, key: str, value: Any, **kwargs) -> bool:
-        return await self._ensure_client().set(key, value, **kwargs)
+        async with track_async("redis"):
+            return await self._ensure_client().set(key, value, **kwargs)
 
     async def get(self, key: str) -> Optional[str]:
-        return await self._ensure_client().get(key)
+        async with track_async("redis"):
+            return await self._ensure_client().get(key)
 
     async def delete(self, key: str) -> int:
-        return await self._ensure_client().delete(key)
+        async with track_async("redis"):
+            return await self._ensure_client().delete(key)
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        async with track_async("redis"):
+            return await self._ensure_client().expire(key, seconds)
+
+    async def exists(self, *keys: str) -> int:
+        async with track_async("redis"):
+            return await self._ensure_client().exists(*keys)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        async with track_async("redis"):
+            return await self._ensure_client().incr(key, amount)
+
+    # Batch operations: one round trip for many keys
+    async def mget(self, keys: Sequence[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        async with track_async("redis"):
+            return await self._ensure_client().mget(list(keys))
+
+    async def mset(self, mapping: Mapping[str, Any], ex: Optional[int] = None) -> None:
+        """Set many keys at once; with `ex`, each gets that TTL (MSET has none, so SETs are pipelined)."""
+        if not mapping:
+            return
+        if ex is None:
+            async with track_async("redis"):
+                await self._ensure_client().mset(dict(mapping))
+            return
+        await self.pipelined(lambda pipe: [pipe.set(key, value, ex=ex) for key, value in mapping.items()])
+
+    # Hash operations
+    async def hget(self, key: str, field: str) -> Optional[str]:
+        async with track_async("redis"):
+            return await self._ensure_client().hget(key, field)
+
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        async with track_async("redis"):
+            return await self._ensure_client().hgetall(key)
+
+    async def hmget(self, key: str, fields: Sequence[str]) -> List[Optional[str]]:
+        if not fields:
+            return []
+        async with track_async("redis"):
+            return await self._ensure_client().hmget(key, list(fields))
+
+    async def hset(self, key: str, mapping: Mapping[str, Any]) -> int:
+        async with track_async("redis"):
+            return await self._ensure_client().hset(key, mapping=dict(mapping))
+
+    def pipeline(self, transaction: bool = True):
+        """Return a redis.asyncio pipeline; use `async with` and `await pipe.execute()`."""
+        return self._ensure_client().pipeline(transaction=transaction)
+
+    async def pipelined(self, build: Callable[[Any], Any], transaction: bool = False) -> list:
+        """
+        Queue commands on a pipeline with `build(pipe)` and send them in one
+        round trip; returns the replies in command order.
+
+            last_sync, config = await client.pipelined(lambda p: (p.get(a), p.hgetall(b)))
+        """
+        async with self.pipeline(transaction=transaction) as pipe:
+            build(pipe)
+            async with track_async("redis"):
+                return await pipe.execute()
+
+    def register_script(self, source: str) -> RedisScript:
+        """A callable Lua script, run with EVALSHA on this client."""
+        return RedisScript(self, source)
 
     async def close(self) -> None:
         if self._client is not None:
@@ -95,10 +209,8 @@ class RedisClient:
         """
         key = f"rate:{identifier}:{window}"
         try:
-            client = self._ensure_client()
-            current = await client.incr(key)
-            if current == 1:
-                await client.expire(key, window)
+            # INCR and the window's EXPIRE run atomically in one round trip.
+            current = int(await self._rate_limit_script([key], [window]))
             remaining = max(0, requests - current)
             return current <= requests, remaining
         except Exception as e:
@@ -253,6 +253,33 @@ class PaymentSchedule(BaseModel):
     remaining_balance: float = confloat(ge=0)
 
 
+class PricingQuote(BaseModel):
+    """Price of one amount / term / rate combination"""
+    amount: float
+    term_months: int
+    interest_rate: float
+    monthly_payment: float
+    total_interest: float
+    total_cost: float
+    apr: float = Field(..., description="Annual percentage rate including fees, as percentage")
+
+
+class PricingGridResponse(BaseModel):
+    """What-if pricing table over amounts x terms x rates"""
+    origination_fee: float
+    quotes: List[PricingQuote]
+
+
+class LoanApplicationRequest(BaseModel):
+    """Loan application body; checked before the application is queued for scoring"""
+    model_config = {"extra": "allow"}
+
+    requested_amount: float = Field(..., description="Requested loan amount", gt=0, le=10000000)
+    purpose: str = Field(..., min_length=1, max_length=500)
+    business_revenue: Optional[float] = Field(None, ge=0)
+    time_in_business: Optional[int] = Field(None, ge=0, description="Months in business")
+
+
 class FinancingContract(BaseModel):
     """Finalized financing contract schema"""
     contract_id: UUID
@@ -10,6 +10,7 @@ import os
 from typing import Dict, Any, Optional
 
 from ..core.logging import get_logger
+from ..core.instrumentation import track_async
 
 logger = get_logger(__name__)
 
@@ -27,7 +28,7 @@ class AIAgentService:
         url = f"{self.agent_base_url}{endpoint}"
         logger.info(f"Making {method.upper()} request to AI Agent at: {url}")
         try:
-            async with aiohttp.ClientSession() as session:
+            async with track_async("agent"), aiohttp.ClientSession() as session:
                 async with session.request(method, url, json=payload, timeout=aiohttp.ClientTimeout(total=120)) as response:
                     if response.status == 200:
                         return await response.json()
@@ -1,79 +1,219 @@
 import logging
+import uuid
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
-from sqlalchemy import and_, func, select, String, cast
+from sqlalchemy import and_, func, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.models.financing import BusinessMetrics
 from app.models.transaction import Transaction
 from app.services.ai_agent import AIAgentService
+from app.services.fx import FxConversion
+from app.services.score_cache import score_cache
+
+# Status and type spellings differ between sources (manual, CSV, Stripe, Shopify, telco).
+SUCCESS_STATUSES = ("completed", "successful", "succeeded", "paid")
+FAILED_STATUSES = ("failed", "declined")
+CHARGEBACK_STATUSES = ("disputed", "chargeback")
+INFLOW_TYPES = ("payment", "charge", "sale", "shopify_order", "invoice")
+OUTFLOW_TYPES = ("payout", "expense", "purchase", "transfer")
+REFUND_TYPES = ("refund",)
+CHARGEBACK_TYPES = ("chargeback", "dispute")
+
+# Column limits of business_metrics.
+MAX_MARGIN = 9.9999
+MAX_RATE = 999.99
+MAX_ORDER_VALUE = 999999.99
+
+
+def _next_month(period_start: datetime) -> datetime:
+    if period_start.month == 12:
+        return period_start.replace(year=period_start.year + 1, month=1)
+    return period_start.replace(month=period_start.month + 1)
+
+
+def _rate(numerator: float, denominator: float) -> Optional[float]:
+    """Percentage (0-100 scale, like the model's risk columns), or None without a base."""
+    if not denominator:
+        return None
+    return round(min(numerator / denominator * 100, MAX_RATE), 2)
 
 
 class AnalyticsEngine:
+    """
+    Business metrics, one BusinessMetrics row per user per calendar month.
+
+    Updates are incremental: each row records the highest transaction
+    updated_at it has seen (source_watermark), and a refresh only recomputes
+    the months that contain transactions written since the user's watermark.
+    updated_at is stamped before commit, so a row can become visible after a
+    refresh has already read newer ones; refreshes therefore re-scan
+    METRICS_SETTLE_SECONDS behind the watermark.
+    """
+
     def __init__(self, db: AsyncSession, ai_service: AIAgentService):
         self.db = db
         self.ai_agent = ai_service
         self.logger = logging.getLogger(__name__)
 
-    async def update_business_metrics(self, user_id: str) -> BusinessMetrics:
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=30)
+    @staticmethod
+    def _period_expr():
+        # Calendar month in UTC; created_at is timestamptz. Literal arguments keep the
+        # expression identical between SELECT and GROUP BY under positional binds.
+        return func.date_trunc(literal_column("'month'"), func.timezone(literal_column("'UTC'"), Transaction.created_at))
 
-        transaction_metrics = await self._calculate_transaction_metrics(
-            user_id, start_date, end_date
-        )
+    async def update_business_metrics(self, user_id: str, full: bool = False) -> Optional[BusinessMetrics]:
+        """
+        Bring the user's monthly metrics up to date and return the latest
+        period's row (None if the user has no transactions). full=True
+        recomputes every month regardless of the watermark.
+        """
+        user_uuid = user_id if isinstance(user_id, UUID) else UUID(str(user_id))
+        watermark = None if full else await self._watermark(user_uuid)
 
-        # ... existing logic ...
-        metrics = await self._save_metrics(user_id, transaction_metrics)
-        return metrics
-
-    async def _calculate_transaction_metrics(
-        self, user_id: str, start_date: datetime, end_date: datetime
-    ) -> Dict[str, Any]:
-        # DEFINITIVE FIX: Use the user ID as a string, as required by the database schema.
-        query = (
-            select(Transaction.status, func.count(Transaction.id).label("count"))
-            .where(
-                and_(
-                    Transaction.user_id == user_id,
-                    Transaction.created_at >= start_date,
-                    Transaction.created_at <= end_date,
-                )
-            )
-            .group_by(Transaction.status)
-        )
+        dirty, new_watermark = await self._dirty_periods(user_uuid, watermark)
+        if dirty:
+            rows = await self._calculate_period_metrics(user_uuid, dirty)
+            await self._save_metrics(user_uuid, rows, new_watermark)
+            await score_cache.invalidate_metrics(user_id)
+            self.logger.info(f"Recomputed {len(rows)} metric periods for user {user_id}")
 
-        result = await self.db.execute(query)
-        transaction_counts = result.all()
+        return await self._latest(user_uuid)
 
-        counts_dict = {status: count for status, count in transaction_counts}
-        total_transactions = sum(counts_dict.values())
+    async def _watermark(self, user_id: UUID) -> Optional[datetime]:
+        return (await self.db.execute(
+            select(func.max(BusinessMetrics.source_watermark)).where(BusinessMetrics.user_id == user_id)
+        )).scalar()
 
-        successful_transactions = (
-            counts_dict.get("completed", 0)
-            + counts_dict.get("successful", 0)
-            + counts_dict.get("succeeded", 0)
+    async def _dirty_periods(
+        self, user_id: UUID, watermark: Optional[datetime]
+    ) -> Tuple[List[datetime], Optional[datetime]]:
+        """Months holding transactions written after the watermark (less the settle window), and the new watermark."""
+        period = self._period_expr().label("period")
+        query = select(period, func.max(Transaction.updated_at)).where(Transaction.user_id == user_id)
+        if watermark is not None:
+            query = query.where(Transaction.updated_at > watermark - timedelta(seconds=settings.METRICS_SETTLE_SECONDS))
+        rows = (await self.db.execute(query.group_by(period))).all()
+
+        periods = sorted(row[0] for row in rows)
+        stamps = [row[1] for row in rows if row[1] is not None]
+        if watermark is not None:
+            stamps.append(watermark)
+        new_watermark = max(stamps) if stamps else watermark
+        return periods, new_watermark
+
+    async def _calculate_period_metrics(self, user_id: UUID, periods: List[datetime]) -> List[Dict[str, Any]]:
+        """Aggregate the given months in one grouped pass (plus one for repeat customers)."""
+        period = self._period_expr().label("period")
+        success = Transaction.status.in_(SUCCESS_STATUSES)
+        inflow = Transaction.transaction_type.in_(INFLOW_TYPES)
+        outflow = Transaction.transaction_type.in_(OUTFLOW_TYPES)
+        refund = Transaction.transaction_type.in_(REFUND_TYPES)
+        chargeback = or_(
+            Transaction.transaction_type.in_(CHARGEBACK_TYPES), Transaction.status.in_(CHARGEBACK_STATUSES)
+        )
+        customer = func.coalesce(
+            Transaction.transaction_metadata["customer"]["email"].astext,
+            Transaction.transaction_metadata["customer_email"].astext,
+            Transaction.transaction_metadata["customer_id"].astext,
         )
-        success_rate = (
-            (successful_transactions / total_transactions * 100)
-            if total_transactions > 0
-            else 0
+        in_periods = and_(
+            Transaction.user_id == user_id,
+            # Range predicate for the index, exact month match for gaps between dirty months.
+            Transaction.created_at >= min(periods),
+            Transaction.created_at < _next_month(max(periods)),
+            self._period_expr().in_(periods),
+        )
+
+        # Amounts are summed in the reporting currency.
+        fx = FxConversion()
+        totals = (await self.db.execute(
+            fx.join(select(
+                period,
+                func.coalesce(func.sum(fx.amount).filter(success, inflow), 0).label("gross"),
+                func.coalesce(func.sum(fx.amount).filter(success, refund), 0).label("refunded"),
+                func.coalesce(func.sum(fx.amount).filter(success, outflow), 0).label("expenses"),
+                func.count(Transaction.id).filter(inflow).label("attempts"),
+                func.count(Transaction.id).filter(success, inflow).label("orders"),
+                func.count(Transaction.id).filter(Transaction.status.in_(FAILED_STATUSES)).label("failed"),
+                func.count(Transaction.id).label("total"),
+                func.count(Transaction.id).filter(refund).label("refunds"),
+                func.count(Transaction.id).filter(chargeback).label("chargebacks"),
+                func.count(func.distinct(customer)).filter(success, inflow).label("customers"),
+                func.count(Transaction.id).filter(success, fx.unconverted).label("unconverted"),
+            ).select_from(Transaction))
+            .where(in_periods)
+            .group_by(period)
+        )).all()
+
+        per_customer = (
+            select(period, customer.label("customer"), func.count(Transaction.id).label("orders"))
+            .where(in_periods, success, inflow, customer.isnot(None))
+            .group_by(period, customer)
+            .subquery()
         )
+        repeat = dict((await self.db.execute(
+            select(per_customer.c.period, func.count().filter(per_customer.c.orders > 1))
+            .group_by(per_customer.c.period)
+        )).all())
+
+        unconverted = sum(t.unconverted for t in totals)
+        if unconverted:
+            self.logger.warning(
+                f"Metrics for user {user_id} leave out {unconverted} transactions in currencies without FX rates"
+            )
 
-        # ... rest of the function
-        return {
-            "total_transactions": total_transactions,
-            "success_rate": success_rate,
-            # ... other metrics
-        }
+        now = datetime.utcnow()
+        rows = []
+        for t in totals:
+            revenue = float(t.gross) - float(t.refunded)
+            expenses = float(t.expenses)
+            cash_flow = revenue - expenses
+            margin = max(-MAX_MARGIN, min(cash_flow / revenue, MAX_MARGIN)) if revenue > 0 else None
+            rows.append({
+                "period_start": t.period,
+                "period_end": min(_next_month(t.period), now),
+                "monthly_revenue": round(revenue, 2),
+                "monthly_expenses": round(expenses, 2),
+                "profit_margin": round(margin, 4) if margin is not None else None,
+                "cash_flow": round(cash_flow, 2),
+                "customer_count": t.customers,
+                "avg_order_value": round(min(float(t.gross) / t.orders, MAX_ORDER_VALUE), 2) if t.orders else None,
+                "repeat_customer_rate": round(repeat.get(t.period, 0) / t.customers, 2) if t.customers else None,
+                "refund_rate": _rate(t.refunds, t.orders),
+                "chargeback_rate": _rate(t.chargebacks, t.orders),
+                "payment_failure_rate": _rate(t.failed, t.attempts or t.total),
+            })
+        return rows
 
     async def _save_metrics(
-        self, user_id: str, metrics_data: Dict[str, Any]
-    ) -> BusinessMetrics:
-        # This is a placeholder for the actual implementation.
-        # In a real application, this would save the calculated metrics to the BusinessMetrics table.
-        self.logger.info(f"Saving metrics for user {user_id}: {metrics_data}")
-        # For now, return a dummy BusinessMetrics object.
-        return BusinessMetrics(user_id=user_id, monthly_revenue=12345.67)
+        self, user_id: UUID, rows: List[Dict[str, Any]], watermark: Optional[datetime]
+    ) -> None:
+        """Upsert one row per period; credit score columns are left to the scorer."""
+        if not rows:
+            return
+        now = datetime.utcnow()
+        values = [
+            {**row, "id": str(uuid.uuid4()), "user_id": user_id, "calculated_at": now, "source_watermark": watermark}
+            for row in rows
+        ]
+        stmt = pg_insert(BusinessMetrics).values(values)
+        metric_columns = [key for key in values[0] if key not in ("id", "user_id", "period_start")]
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_business_metrics_user_period",
+            set_={key: stmt.excluded[key] for key in metric_columns},
+        )
+        await self.db.execute(stmt)
+        await self.db.commit()
+
+    async def _latest(self, user_id: UUID) -> Optional[BusinessMetrics]:
+        return (await self.db.execute(
+            select(BusinessMetrics)
+            .where(BusinessMetrics.user_id == user_id)
+            .order_by(BusinessMetrics.period_start.desc())
+            .limit(1)
+        )).scalars().first()
@@ -0,0 +1,240 @@
+# backend/app/services/anomaly_detector.py
+"""
+Streaming transaction anomaly detection.
+
+Each merchant has running statistics of log amounts (in the reporting
+currency), separately for inflows and outflows: a Welford mean/variance over
+all history, an EWMA mean/variance that follows the recent level, and Welford
+baselines per UTC weekday and per UTC hour. The whole state is one short
+JSON array per merchant and flow in Redis.
+
+Ingest paths pass newly created transactions to `observe`: each one is
+scored against the state as it stood before it and then folded in, O(1) per
+transaction. A batch reads the state and writes it back in one WATCH/MULTI
+transaction, redone on fresh state if a concurrent ingest of the same
+merchant changed it in between, so no update is lost. A transaction is flagged
+when at least two baselines put it beyond ANOMALY_Z_THRESHOLD, or when it
+falls in an hour the merchant almost never transacts in. Flags are written to
+TransactionInsight; recent ones also raise an in-app notification.
+"""
+
+import json
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from redis.exceptions import WatchError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.instrumentation import track_async
+from app.models.transaction import Transaction, TransactionInsight
+from app.redis_client import RedisClient, redis_client
+from app.services.analytics_engine import FAILED_STATUSES, INFLOW_TYPES
+from app.services.fx import fx_cache
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION = "welford-ewma-v1"
+
+# State layout: global Welford (n, mean, m2), EWMA (mean, var), then Welford
+# triples for the 7 weekdays and the 24 hours.
+GLOBAL, EWMA, WEEKDAY, HOUR = 0, 3, 5, 26
+STATE_SIZE = HOUR + 3 * 24
+# Floor for standard deviations of log amounts, so a merchant with identical
+# amounts so far does not flag every slightly different one.
+MIN_STD = 0.05
+# Times a batch is re-scored when concurrent ingests keep changing the state.
+MAX_UPDATE_ATTEMPTS = 5
+
+
+class Observation(NamedTuple):
+    transaction_id: str
+    amount: float
+    currency: Optional[str]
+    occurred_at: datetime
+    transaction_type: Optional[str]
+    status: Optional[str] = None
+
+
+def observation(transaction: Transaction) -> Observation:
+    return Observation(
+        str(transaction.id),
+        float(transaction.amount),
+        transaction.currency,
+        transaction.created_at or datetime.utcnow(),
+        transaction.transaction_type,
+        transaction.status,
+    )
+
+
+def _utc(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc) if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _welford(state: List[float], offset: int, value: float) -> None:
+    n = state[offset] + 1
+    delta = value - state[offset + 1]
+    mean = state[offset + 1] + delta / n
+    state[offset:offset + 3] = [n, mean, state[offset + 2] + delta * (value - mean)]
+
+
+def _z(state: List[float], offset: int, value: float) -> float:
+    n, mean, m2 = state[offset:offset + 3]
+    std = math.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+    return (value - mean) / max(std, MIN_STD)
+
+
+class AnomalyDetector:
+    def __init__(
+        self,
+        client: RedisClient = redis_client,
+        z_threshold: float = settings.ANOMALY_Z_THRESHOLD,
+        min_history: int = settings.ANOMALY_MIN_HISTORY,
+        min_bucket: int = settings.ANOMALY_MIN_BUCKET,
+        ewma_alpha: float = settings.ANOMALY_EWMA_ALPHA,
+    ):
+        self.client = client
+        self.z_threshold = z_threshold
+        self.min_history = min_history
+        self.min_bucket = min_bucket
+        self.ewma_alpha = ewma_alpha
+
+    @staticmethod
+    def _state_key(user_id: str, flow: str) -> str:
+        return f"anomaly:stats:{user_id}:{flow}"
+
+    @staticmethod
+    def _flow(transaction_type: Optional[str]) -> str:
+        return "in" if (transaction_type or "").lower() in INFLOW_TYPES else "out"
+
+    def score(self, state: List[float], value: float, weekday: int, hour: int) -> Tuple[float, Dict[str, float], List[str]]:
+        """Largest |z|, z per available baseline, and the reasons to flag (empty if normal)."""
+        zs: Dict[str, float] = {}
+        if state[GLOBAL] >= self.min_history:
+            zs["global"] = _z(state, GLOBAL, value)
+            zs["recent"] = (value - state[EWMA]) / max(math.sqrt(state[EWMA + 1]), MIN_STD)
+            for name, offset in (("weekday", WEEKDAY + 3 * weekday), ("hour", HOUR + 3 * hour)):
+                if state[offset] >= self.min_bucket:
+                    zs[name] = _z(state, offset, value)
+
+        beyond = [f"{name}_{'high' if z > 0 else 'low'}" for name, z in zs.items() if abs(z) >= self.z_threshold]
+        reasons = beyond if len(beyond) >= 2 else []
+        # An hour holding under 1% of a long history is unusual on its own.
+        if state[GLOBAL] >= self.min_history * 5 and state[HOUR + 3 * hour] / state[GLOBAL] < 0.01:
+            reasons.append("unusual_hour")
+        return max((abs(z) for z in zs.values()), default=0.0), zs, reasons
+
+    def update(self, state: List[float], value: float, weekday: int, hour: int) -> None:
+        if state[GLOBAL] == 0:
+            state[EWMA:EWMA + 2] = [value, 0.0]
+        else:
+            delta = value - state[EWMA]
+            increment = self.ewma_alpha * delta
+            state[EWMA:EWMA + 2] = [state[EWMA] + increment, (1 - self.ewma_alpha) * (state[EWMA + 1] + delta * increment)]
+        _welford(state, GLOBAL, value)
+        _welford(state, WEEKDAY + 3 * weekday, value)
+        _welford(state, HOUR + 3 * hour, value)
+
+    async def _detect_and_update(self, user_id: str, observations: Sequence[Observation]) -> List[Dict[str, Any]]:
+        """Run _detect on the stored state and write it back atomically; returns the flagged observations."""
+        keys = [self._state_key(user_id, flow) for flow in ("in", "out")]
+        for _ in range(MAX_UPDATE_ATTEMPTS):
+            async with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    async with track_async("redis"):
+                        await pipe.watch(*keys)
+                        raw = await pipe.mget(keys)
+                    states = {key: (json.loads(value) if value else [0.0] * STATE_SIZE) for key, value in zip(keys, raw)}
+                    flagged = self._detect(user_id, observations, states)
+                    pipe.multi()
+                    for key, state in states.items():
+                        pipe.set(key, json.dumps([round(v, 6) for v in state]), ex=settings.ANOMALY_STATS_TTL_SECONDS)
+                    async with track_async("redis"):
+                        await pipe.execute()
+                    return flagged
+                except WatchError:
+                    continue  # Another ingest updated the merchant; score against its state.
+        raise RuntimeError(f"statistics changed concurrently {MAX_UPDATE_ATTEMPTS} times")
+
+    def _detect(self, user_id: str, observations: Sequence[Observation], states: Dict[str, List[float]]) -> List[Dict[str, Any]]:
+        """Score and fold in each observation in time order; returns the flagged ones."""
+        flagged = []
+        for obs in sorted(observations, key=lambda o: _utc(o.occurred_at)):
+            if (obs.status or "").lower() in FAILED_STATUSES or not obs.amount:
+                continue
+            moment = _utc(obs.occurred_at)
+            amount = fx_cache.convert_one(abs(obs.amount), obs.currency, moment)
+            if math.isnan(amount):
+                continue  # No rate for the currency
+            value = math.log1p(amount)
+            state = states[self._state_key(user_id, self._flow(obs.transaction_type))]
+
+            worst, zs, reasons = self.score(state, value, moment.weekday(), moment.hour)
+            if reasons:
+                flagged.append({
+                    "observation": obs,
+                    "confidence": round(min(1 - math.erfc(worst / math.sqrt(2)), 0.99), 2),
+                    "insight_data": {
+                        "reasons": reasons,
+                        "z_scores": {name: round(z, 2) for name, z in zs.items()},
+                        "amount": round(amount, 2),
+                        "reporting_currency": settings.FX_REPORTING_CURRENCY,
+                        "typical_amount": round(math.expm1(state[EWMA]), 2),
+                        "flow": self._flow(obs.transaction_type),
+                    },
+                })
+            self.update(state, value, moment.weekday(), moment.hour)
+        return flagged
+
+    async def observe(self, db: AsyncSession, user_id: Any, observations: Sequence[Observation]) -> int:
+        """
+        Score newly ingested transactions, update the merchant's statistics and
+        record anomalies. Never raises: detection must not fail an ingest.
+        Returns the number of transactions flagged.
+        """
+        if not observations:
+            return 0
+        user_id = str(user_id)
+        try:
+            flagged = await self._detect_and_update(user_id, observations)
+        except Exception as e:
+            logger.warning(f"Anomaly detection failed for user {user_id}: {e}")
+            return 0
+        if flagged:
+            await self._record(db, user_id, flagged)
+        return len(flagged)
+
+    async def _record(self, db: AsyncSession, user_id: str, flagged: List[Dict[str, Any]]) -> None:
+        try:
+            db.add_all([
+                TransactionInsight(
+                    transaction_id=item["observation"].transaction_id,
+                    insight_type="anomaly",
+                    confidence_score=item["confidence"],
+                    insight_data=item["insight_data"],
+                    ai_model_version=MODEL_VERSION,
+                )
+                for item in flagged
+            ])
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to record {len(flagged)} anomalies for user {user_id}: {e}")
+            return
+
+        # Alert only on fresh activity, not on backfilled history.
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.ANOMALY_ALERT_WINDOW_HOURS)
+        recent = [item for item in flagged if _utc(item["observation"].occurred_at) >= cutoff]
+        if recent:
+            from app.celery_worker import send_notifications
+            send_notifications.delay(user_id, "in_app", {
+                "event": "transaction_anomaly",
+                "transaction_ids": [item["observation"].transaction_id for item in recent],
+                "reasons": sorted({reason for item in recent for reason in item["insight_data"]["reasons"]}),
+            })
+        logger.info(f"Flagged {len(flagged)} anomalous transactions for user {user_id}")
+
+
+anomaly_detector = AnomalyDetector()
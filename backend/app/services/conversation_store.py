@@ -0,0 +1,156 @@
+# backend/app/services/conversation_store.py
+"""
+Bounded Redis store for AI chat conversation history.
+
+Each conversation keeps its last CONVERSATION_WINDOW_TURNS turns verbatim in a
+Redis list (newest first, LTRIM-capped) and folds turns that fall out of the
+window into a short extractive summary stored next to it (by a Lua script,
+so concurrent appends to one conversation cannot drop each other's turns;
+its cap is measured in UTF-8 bytes). Both keys expire
+after CONVERSATION_TTL_SECONDS of inactivity, so reads and prompt size stay
+bounded no matter how long a conversation runs.
+"""
+
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.instrumentation import track_async
+from app.redis_client import RedisClient, redis_client
+
+logger = logging.getLogger(__name__)
+
+# Per-line caps for the rolling summary so one long turn cannot crowd out the rest.
+_SUMMARY_QUESTION_CHARS = 160
+_SUMMARY_ANSWER_CHARS = 240
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+# Append summary lines (ARGV[3..]) to the summary at KEYS[1], dropping its
+# oldest lines while it is longer than ARGV[1] bytes; the key expires after ARGV[2].
+_FOLD_SUMMARY_SCRIPT = """
+local lines = {}
+for line in string.gmatch(redis.call('GET', KEYS[1]) or '', '[^\\n]+') do
+    lines[#lines + 1] = line
+end
+for i = 3, #ARGV do
+    lines[#lines + 1] = ARGV[i]
+end
+local total = 0
+for _, line in ipairs(lines) do
+    total = total + #line + 1
+end
+local first = 1
+while total > tonumber(ARGV[1]) and first < #lines do
+    total = total - #lines[first] - 1
+    first = first + 1
+end
+redis.call('SET', KEYS[1], table.concat(lines, '\\n', first), 'EX', ARGV[2])
+return total
+"""
+
+
+@dataclass
+class ConversationHistory:
+    """Recent turns (oldest first) plus a summary of everything older."""
+
+    turns: List[Dict[str, Any]] = field(default_factory=list)
+    summary: str = ""
+
+
+def _encode_turn(user_text: str, ai_text: str) -> str:
+    """Compact positional encoding: [epoch_seconds, user, ai]."""
+    return json.dumps([int(time.time()), user_text, ai_text], separators=(",", ":"), ensure_ascii=False)
+
+
+def _decode_turn(raw: str) -> Optional[Dict[str, Any]]:
+    """Decode a stored turn; also accepts the legacy {"user", "ai", "ts"} dicts."""
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(value, list) and len(value) == 3:
+        ts, user_text, ai_text = value
+        return {"user": user_text, "ai": ai_text, "ts": datetime.utcfromtimestamp(ts).isoformat()}
+    if isinstance(value, dict):
+        return value
+    return None
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+def _summarize_turn(turn: Dict[str, Any]) -> str:
+    """One summary line: the question and the first sentence of the answer."""
+    answer = " ".join((turn.get("ai") or "").split())
+    first_sentence = _SENTENCE_END.split(answer, maxsplit=1)[0] if answer else ""
+    return (
+        f"- Q: {_clip(turn.get('user', ''), _SUMMARY_QUESTION_CHARS)}"
+        f" A: {_clip(first_sentence, _SUMMARY_ANSWER_CHARS)}"
+    )
+
+
+class ConversationStore:
+    """Read and append chat turns with a capped window, TTL and rolling summary."""
+
+    def __init__(
+        self,
+        client: RedisClient = redis_client,
+        window: int = settings.CONVERSATION_WINDOW_TURNS,
+        ttl_seconds: int = settings.CONVERSATION_TTL_SECONDS,
+        summary_max_chars: int = settings.CONVERSATION_SUMMARY_MAX_CHARS,
+    ):
+        self.client = client
+        self.window = max(1, window)
+        self.ttl_seconds = ttl_seconds
+        self.summary_max_chars = summary_max_chars
+        self._fold_summary = client.register_script(_FOLD_SUMMARY_SCRIPT)
+
+    @staticmethod
+    def _keys(user_id: Any, conversation_id: Optional[str]) -> tuple:
+        key = f"conv:{user_id}:{conversation_id or 'default'}"
+        return key, f"{key}:summary"
+
+    async def load(self, user_id: Any, conversation_id: Optional[str]) -> ConversationHistory:
+        """Return the windowed turns (oldest first) and the rolling summary in one round trip."""
+        key, summary_key = self._keys(user_id, conversation_id)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.lrange(key, 0, self.window - 1)
+            pipe.get(summary_key)
+            async with track_async("redis"):
+                raw_turns, summary = await pipe.execute()
+
+        turns = [turn for turn in (_decode_turn(raw) for raw in reversed(raw_turns)) if turn]
+        return ConversationHistory(turns=turns, summary=summary or "")
+
+    async def append(self, user_id: Any, conversation_id: Optional[str], user_text: str, ai_text: str) -> None:
+        """Push a turn, trim the list to the window and fold any overflow into the summary."""
+        key, summary_key = self._keys(user_id, conversation_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lpush(key, _encode_turn(user_text, ai_text))
+            pipe.lrange(key, self.window, -1)
+            pipe.ltrim(key, 0, self.window - 1)
+            pipe.expire(key, self.ttl_seconds)
+            pipe.expire(summary_key, self.ttl_seconds)
+            async with track_async("redis"):
+                _, overflow, *_ = await pipe.execute()
+
+        if not overflow:
+            return
+
+        # Overflow comes back newest first; summarize in chronological order.
+        dropped = [turn for turn in (_decode_turn(raw) for raw in reversed(overflow)) if turn]
+        if not dropped:
+            return
+        # Folded by a script, so concurrent appends to the conversation keep each other's lines.
+        lines = [_summarize_turn(turn)[: self.summary_max_chars] for turn in dropped]
+        await self._fold_summary([summary_key], [self.summary_max_chars, self.ttl_seconds, *lines])
+
+
+conversation_store = ConversationStore()
@@ -1,8 +1,60 @@
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update, String, cast
+from app.core.config import settings
 from app.models.financing import BusinessMetrics
 from app.models.transaction import Transaction
-from datetime import datetime, timedelta
+from app.services.fx import FxConversion
+from app.services.score_cache import score_cache
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+RATING_THRESHOLDS = ((750, "Excellent"), (700, "Good"), (650, "Fair"))
+
+
+def score_arrays(
+    monthly_revenue: np.ndarray,
+    cash_flow: np.ndarray,
+    profit_margin: np.ndarray,
+    tx_count: np.ndarray,
+    failed_tx: np.ndarray,
+) -> np.ndarray:
+    """
+    Vectorized scoring rules (300-850). Used for a single user and for batch
+    scoring alike, so both paths always agree.
+    """
+    score = np.full(monthly_revenue.shape, 300, dtype=np.int64)  # Base score
+
+    # Revenue Impact (up to 200 points)
+    score += np.select([monthly_revenue > 50000, monthly_revenue > 10000, monthly_revenue > 1000], [200, 100, 50], 0)
+
+    # Cash Flow Impact (up to 150 points)
+    score += np.select([cash_flow > 10000, cash_flow > 0], [150, 75], 0)
+
+    # Profit Margin Impact (up to 100 points)
+    score += np.select([profit_margin > 0.2, profit_margin > 0.05], [100, 50], 0)
+
+    # Transaction Volume Stability (up to 150 points)
+    score += np.select([tx_count > 100, tx_count > 20], [150, 75], 0)
+
+    # Negative Factors
+    failure_rate = np.divide(failed_tx, tx_count, out=np.zeros(tx_count.shape, dtype=float), where=tx_count > 0)
+    score -= np.select([failure_rate > 0.1, failure_rate > 0.05], [100, 50], 0)
+
+    # Cap score
+    return np.clip(score, 300, 850)
+
+
+def rating_for(score: int) -> str:
+    for threshold, rating in RATING_THRESHOLDS:
+        if score >= threshold:
+            return rating
+    return "Poor"
+
 
 class CreditScoreService:
     def __init__(self, db: AsyncSession):
@@ -15,72 +67,40 @@ class CreditScoreService:
         """
         # 1. Use provided metrics or fetch latest
         if not metrics:
-            stmt = select(BusinessMetrics).where(
-                BusinessMetrics.user_id == user_id
-            ).order_by(BusinessMetrics.calculated_at.desc()).limit(1)
-            
-            result = await self.db.execute(stmt)
-            metrics = result.scalars().first()
-        
+            metrics = await self._latest_metrics(user_id)
+
         # 2. Fetch transaction stats (last 90 days)
         ninety_days_ago = datetime.utcnow() - timedelta(days=90)
-        stmt_tx = select(
+        fx = FxConversion()
+        stmt_tx = fx.join(select(
             func.count(Transaction.id).label("tx_count"),
-            func.sum(Transaction.amount).label("tx_volume"),
+            func.sum(fx.amount).label("tx_volume"),
             func.count(Transaction.id).filter(Transaction.status == 'failed').label("failed_tx")
-        ).where(
+        ).select_from(Transaction)).where(
             Transaction.user_id == user_id,
             Transaction.created_at >= ninety_days_ago
         )
-        
+
         tx_result = await self.db.execute(stmt_tx)
         tx_stats = tx_result.one()
-        
+
         # Default values if no data
         monthly_revenue = float(metrics.monthly_revenue) if metrics and metrics.monthly_revenue else 0
         cash_flow = float(metrics.cash_flow) if metrics and metrics.cash_flow else 0
         profit_margin = float(metrics.profit_margin) if metrics and metrics.profit_margin else 0
-        
+
         tx_count = tx_stats.tx_count or 0
         tx_volume = float(tx_stats.tx_volume or 0)
         failed_tx = tx_stats.failed_tx or 0
-        
-        # --- SCORING LOGIC ---
-        score = 300 # Base score
-        
-        # Revenue Impact (up to 200 points)
-        if monthly_revenue > 50000: score += 200
-        elif monthly_revenue > 10000: score += 100
-        elif monthly_revenue > 1000: score += 50
-        
-        # Cash Flow Impact (up to 150 points)
-        if cash_flow > 10000: score += 150
-        elif cash_flow > 0: score += 75
-        
-        # Profit Margin Impact (up to 100 points)
-        if profit_margin > 0.2: score += 100
-        elif profit_margin > 0.05: score += 50
-        
-        # Transaction Volume Stability (up to 150 points)
-        if tx_count > 100: score += 150
-        elif tx_count > 20: score += 75
-        
-        # Negative Factors
-        failure_rate = (failed_tx / tx_count) if tx_count > 0 else 0
-        if failure_rate > 0.1: score -= 100
-        elif failure_rate > 0.05: score -= 50
-        
-        # Cap score
-        score = max(300, min(850, score))
-        
-        rating = "Poor"
-        if score >= 750: rating = "Excellent"
-        elif score >= 700: rating = "Good"
-        elif score >= 650: rating = "Fair"
-        
+
+        score = int(score_arrays(
+            np.array([monthly_revenue]), np.array([cash_flow]), np.array([profit_margin]),
+            np.array([tx_count]), np.array([failed_tx]),
+        )[0])
+
         return {
             "score": score,
-            "rating": rating,
+            "rating": rating_for(score),
             "factors": {
                 "revenue": monthly_revenue,
                 "cash_flow": cash_flow,
@@ -88,3 +108,146 @@ class CreditScoreService:
                 "transaction_count_90d": tx_count
             }
         }
+
+    async def get_score(self, user_id: str) -> dict:
+        """
+        Return the user's score, cheapest source first: the score cache (keyed by
+        the inputs' version), then the persisted score on the latest metrics row if
+        it is fresh and newer than the last transaction write, and only then a live
+        calculation, which is persisted on that row.
+        """
+        version = None
+        try:
+            version = await score_cache.version(user_id, self.db)
+            cached = await score_cache.get(user_id, version)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            logger.warning("Score cache unavailable for user %s: %s", user_id, e)
+
+        metrics = await self._latest_metrics(user_id)
+        max_age = timedelta(hours=settings.CREDIT_SCORE_MAX_AGE_HOURS)
+        if (
+            metrics is not None
+            and metrics.credit_score is not None
+            and metrics.scored_at is not None
+            and metrics.scored_at >= datetime.utcnow() - max_age
+            and (version is None or metrics.scored_at.replace(tzinfo=timezone.utc).timestamp() >= version.tx_written_at)
+        ):
+            score_data = {
+                "score": metrics.credit_score,
+                "rating": rating_for(metrics.credit_score),
+                "factors": metrics.score_factors or {},
+                "scored_at": metrics.scored_at.isoformat(),
+            }
+        else:
+            score_data = await self.calculate_score(user_id, metrics)
+            if metrics is not None:
+                metrics.credit_score = score_data["score"]
+                metrics.score_factors = score_data["factors"]
+                metrics.scored_at = datetime.utcnow()
+                await self.db.commit()
+                score_data["scored_at"] = metrics.scored_at.isoformat()
+
+        if version is not None:
+            try:
+                await score_cache.set(user_id, version, score_data)
+            except Exception as e:
+                logger.warning("Failed to cache score for user %s: %s", user_id, e)
+        return score_data
+
+    async def score_all(
+        self,
+        shard_index: int = 0,
+        shard_count: int = 1,
+        user_ids: Optional[Sequence[str]] = None,
+    ) -> int:
+        """
+        Batch-score every user's latest metrics row (optionally one shard of users,
+        or an explicit list) in one set-based query and persist the results.
+        Returns the number of users scored.
+        """
+        ninety_days_ago = datetime.utcnow() - timedelta(days=90)
+
+        fx = FxConversion()
+        tx_stats = (
+            fx.join(select(
+                Transaction.user_id.label("user_id"),
+                func.count(Transaction.id).label("tx_count"),
+                func.coalesce(func.sum(fx.amount), 0).label("tx_volume"),
+                func.count(Transaction.id).filter(Transaction.status == 'failed').label("failed_tx"),
+            ).select_from(Transaction))
+            .where(Transaction.created_at >= ninety_days_ago)
+            .group_by(Transaction.user_id)
+            .subquery()
+        )
+
+        # Latest metrics row per user (Postgres DISTINCT ON).
+        latest = (
+            select(
+                BusinessMetrics.id,
+                BusinessMetrics.user_id,
+                BusinessMetrics.monthly_revenue,
+                BusinessMetrics.cash_flow,
+                BusinessMetrics.profit_margin,
+            )
+            .distinct(BusinessMetrics.user_id)
+            .order_by(BusinessMetrics.user_id, BusinessMetrics.period_start.desc())
+        )
+        if user_ids:
+            latest = latest.where(BusinessMetrics.user_id.in_([uuid.UUID(str(u)) for u in user_ids]))
+        if shard_count > 1:
+            latest = latest.where(
+                func.abs(func.hashtext(cast(BusinessMetrics.user_id, String))) % shard_count == shard_index
+            )
+        latest = latest.subquery()
+
+        stmt = select(
+            latest.c.id,
+            func.coalesce(latest.c.monthly_revenue, 0),
+            func.coalesce(latest.c.cash_flow, 0),
+            func.coalesce(latest.c.profit_margin, 0),
+            func.coalesce(tx_stats.c.tx_count, 0),
+            func.coalesce(tx_stats.c.tx_volume, 0),
+            func.coalesce(tx_stats.c.failed_tx, 0),
+        ).outerjoin(tx_stats, tx_stats.c.user_id == latest.c.user_id)
+
+        rows = (await self.db.execute(stmt)).all()
+        if not rows:
+            return 0
+
+        ids = [row[0] for row in rows]
+        data = np.array([row[1:] for row in rows], dtype=float)
+        revenue, cash_flow, margin, tx_count, tx_volume, failed_tx = data.T
+        scores = score_arrays(revenue, cash_flow, margin, tx_count, failed_tx)
+
+        scored_at = datetime.utcnow()
+        updates: List[Dict] = [
+            {
+                "id": ids[i],
+                "credit_score": int(scores[i]),
+                "score_factors": {
+                    "revenue": float(revenue[i]),
+                    "cash_flow": float(cash_flow[i]),
+                    "transaction_volume_90d": float(tx_volume[i]),
+                    "transaction_count_90d": int(tx_count[i]),
+                },
+                "scored_at": scored_at,
+            }
+            for i in range(len(ids))
+        ]
+        batch_size = settings.CREDIT_SCORE_BATCH_SIZE
+        for start in range(0, len(updates), batch_size):
+            await self.db.execute(update(BusinessMetrics), updates[start:start + batch_size])
+        await self.db.commit()
+
+        logger.info("Batch scored %s users (shard %s/%s)", len(ids), shard_index, shard_count)
+        return len(ids)
+
+    async def _latest_metrics(self, user_id: str) -> Optional[BusinessMetrics]:
+        stmt = select(BusinessMetrics).where(
+            BusinessMetrics.user_id == user_id
+        ).order_by(BusinessMetrics.period_start.desc()).limit(1)
+
+        result = await self.db.execute(stmt)
+        return result.scalars().first()
@@ -25,7 +25,6 @@ import uuid
 
 import httpx
 import stripe
-from redis import asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from app.database import get_async_session
@@ -34,6 +33,9 @@ from app.models.transaction import Transaction
 from app.models.user import User
 from app.core.celery_app import celery_app
 from app.redis_client import redis_client
+from app.services.anomaly_detector import anomaly_detector, observation
+from app.services.metrics_scheduler import metrics_scheduler
+from app.services.score_cache import score_cache
 
 logger = logging.getLogger(__name__)
 
@@ -59,11 +61,7 @@ class DataSyncService:
         if not self._redis:
             try:
                 await redis_client.init()
-                self._redis = await aioredis.from_url(
-                    settings.REDIS_URL,
-                    encoding="utf-8",
-                    decode_responses=True
-                )
+                self._redis = redis_client
                 logger.info("Redis connection initialized")
             except Exception as e:
                 logger.error(f"Redis initialization failed: {str(e)}")
@@ -257,11 +255,7 @@ class DataSyncService:
         if not self._redis:
             try:
                 await redis_client.init()
-                self._redis = await aioredis.from_url(
-                    settings.REDIS_URL,
-                    encoding="utf-8",
-                    decode_responses=True
-                )
+                self._redis = redis_client
                 logger.info("Redis connection initialized")
             except Exception as e:
                 logger.error(f"Redis initialization failed: {str(e)}")
@@ -382,18 +376,21 @@ class DataSyncService:
         results = {}
         sync_tasks = []
         
+        await self._init_redis()
+        state = await self._sync_state(user_id)
+
         # Check if sync is needed (unless forced)
         if not force_sync:
-            last_sync = await self._get_last_sync_time(user_id)
+            last_sync = state["last_sync"]
             if last_sync and (datetime.utcnow() - last_sync).seconds < settings.MIN_SYNC_INTERVAL:
                 logger.info(f"Skipping sync for user {user_id} - too recent")
                 return results
         
         # Create sync tasks for each source
         for source in DataSource:
-            if await self._is_source_enabled(user_id, source):
+            if state["sources"][source]["enabled"]:
                 task = asyncio.create_task(
-                    self._sync_source(user_id, source)
+                    self._sync_source(user_id, source, state["sources"][source]["last_sync"])
                 )
                 sync_tasks.append((source, task))
         
@@ -422,15 +419,20 @@ class DataSyncService:
         logger.info(f"Full sync completed for user {user_id}")
         return results
 
-    async def _sync_source(self, user_id: int, source: DataSource) -> SyncResult:
-        """Synchronize data from a specific source"""
+    async def _sync_source(self, user_id: int, source: DataSource, last_sync: Optional[datetime] = None) -> SyncResult:
+        """
+        Synchronize data from a specific source, fetching changes since
+        last_sync (read from the source's stored sync time when not given)
+        """
         start_time = datetime.utcnow()
         errors = []
         records_processed = records_created = records_updated = 0
         
         try:
+            await self._init_redis()
+            if last_sync is None:
+                last_sync = (await self._sync_state(user_id))["sources"][source]["last_sync"]
             await self._apply_rate_limit(source)
-            last_sync = await self._get_source_last_sync(user_id, source)
             
             # Fetch and validate data
             data = []
@@ -454,6 +456,7 @@ class DataSyncService:
                 raise
             
             # Process records
+            created: List[Transaction] = []
             async with get_async_session() as session:
                 for record in data:
                     if not isinstance(record, dict):
@@ -465,11 +468,17 @@ class DataSyncService:
                         records_processed += 1
                         records_created += processed["created"]
                         records_updated += processed["updated"]
+                        if processed["transaction"] is not None:
+                            created.append(processed["transaction"])
                     except Exception as e:
                         errors.append(f"Record processing error: {str(e)}")
                 
                 await session.commit()
+                await anomaly_detector.observe(session, user_id, [observation(t) for t in created])
             
+            if records_created or records_updated:
+                await score_cache.invalidate_transactions([user_id])
+                await metrics_scheduler.mark_dirty(user_id)
             await self._update_source_last_sync(user_id, source)
             status = (SyncStatus.SUCCESS if not errors else 
                      SyncStatus.PARTIAL if records_processed > 0 else 
@@ -691,7 +700,7 @@ class DataSyncService:
         logger.info(f"Fetched {len(data)} records from QuickBooks")
         return data
     
-    async def _process_record(self, session: AsyncSession, user_id: int, source: DataSource, record: Dict) -> Dict[str, bool]:
+    async def _process_record(self, session: AsyncSession, user_id: int, source: DataSource, record: Dict) -> Dict[str, Any]:
         """
         Process and store a single record in the database
         
@@ -702,10 +711,12 @@ class DataSyncService:
             record: Raw record data
             
         Returns:
-            Dictionary indicating if record was created or updated
+            Dictionary indicating if record was created or updated, with the
+            new transaction when one was created
         """
         created = False
         updated = False
+        transaction = None
         
         try:
             # Extract common fields based on source and record type
@@ -740,7 +751,7 @@ class DataSyncService:
             logger.error(f"Failed to process record: {str(e)}")
             raise
         
-        return {"created": created, "updated": updated}
+        return {"created": created, "updated": updated, "transaction": transaction}
     
     def _extract_transaction_data(self, source: DataSource, record: Dict) -> Dict:
         """
@@ -911,51 +922,47 @@ class DataSyncService:
             return
             
         try:
-            rate_limit_key = f"rate_limit:{source.value}"
-            current_count = await self._redis.get(rate_limit_key)
-            
-            if current_count:
-                current_count = int(current_count)
-                if current_count >= self.rate_limits[source]["requests_per_second"]:
-                    await asyncio.sleep(1)
-            
-            await self._redis.incr(rate_limit_key)
-            await self._redis.expire(rate_limit_key, 1)
+            # Counted and windowed in one scripted round trip
+            allowed, _ = await self._redis.rate_limit_check(
+                f"sync:{source.value}", self.rate_limits[source]["requests_per_second"], 1
+            )
+            if not allowed:
+                await asyncio.sleep(1)
             
         except Exception as e:
             logger.error(f"Rate limiting failed for {source.value}: {str(e)}")
             # Continue without rate limiting rather than failing the sync
             return
     
-    async def _is_source_enabled(self, user_id: int, source: DataSource) -> bool:
-        """Check if a data source is enabled for the user"""
-        config_key = f"user:{user_id}:sync_config"
-        config = await self._redis.hget(config_key, source.value)
-        return config == "enabled" if config else True  # Default to enabled
-    
-    async def _get_last_sync_time(self, user_id: int) -> Optional[datetime]:
-        """Get the last sync timestamp for a user"""
+    async def _sync_state(self, user_id: int) -> Dict[str, Any]:
+        """
+        Last sync times and per-source settings for a user, read in one
+        pipelined round trip:
+        {"last_sync": datetime | None, "sources": {source: {"enabled", "last_sync"}}}
+        """
         sync_key = f"user:{user_id}:last_sync"
-        timestamp = await self._redis.get(sync_key)
-        
-        if timestamp:
-            return datetime.fromisoformat(timestamp.decode())
-        return None
-    
+        source_keys = [f"{sync_key}:{source.value}" for source in DataSource]
+        config, timestamps = await self._redis.pipelined(lambda pipe: (
+            pipe.hgetall(f"user:{user_id}:sync_config"),
+            pipe.mget([sync_key, *source_keys]),
+        ))
+        last_syncs = [datetime.fromisoformat(ts) if ts else None for ts in timestamps]
+        return {
+            "last_sync": last_syncs[0],
+            "sources": {
+                source: {
+                    "enabled": config.get(source.value, "enabled") == "enabled",  # Default to enabled
+                    "last_sync": last_sync,
+                }
+                for source, last_sync in zip(DataSource, last_syncs[1:])
+            },
+        }
+
     async def _update_last_sync_time(self, user_id: int):
         """Update the last sync timestamp for a user"""
         sync_key = f"user:{user_id}:last_sync"
         await self._redis.set(sync_key, datetime.utcnow().isoformat())
     
-    async def _get_source_last_sync(self, user_id: int, source: DataSource) -> Optional[datetime]:
-        """Get the last sync timestamp for a specific source"""
-        sync_key = f"user:{user_id}:last_sync:{source.value}"
-        timestamp = await self._redis.get(sync_key)
-        
-        if timestamp:
-            return datetime.fromisoformat(timestamp.decode())
-        return None
-    
     async def _update_source_last_sync(self, user_id: int, source: DataSource):
         """Update the last sync timestamp for a specific source"""
         sync_key = f"user:{user_id}:last_sync:{source.value}"
@@ -991,7 +998,9 @@ class DataSyncService:
         Returns:
             Dictionary with sync status information
         """
-        last_sync = await self._get_last_sync_time(user_id)
+        await self._init_redis()
+        state = await self._sync_state(user_id)
+        last_sync = state["last_sync"]
         
         status = {
             "user_id": user_id,
@@ -999,12 +1008,10 @@ class DataSyncService:
             "sources": {}
         }
         
-        for source in DataSource:
-            source_sync = await self._get_source_last_sync(user_id, source)
-            enabled = await self._is_source_enabled(user_id, source)
-            
+        for source, source_state in state["sources"].items():
+            source_sync = source_state["last_sync"]
             status["sources"][source.value] = {
-                "enabled": enabled,
+                "enabled": source_state["enabled"],
                 "last_sync": source_sync.isoformat() if source_sync else None
             }
         
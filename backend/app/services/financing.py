@@ -1,135 +1,259 @@
 """
 Financing and lending service
+
+Loan applications are processed asynchronously: the API persists the
+application (idempotently, keyed on the client's Idempotency-Key) and
+enqueues `process_loan_application` on the loan_scoring queue. A worker
+atomically claims the application, scores it from the precomputed
+business-metrics rollup and the persisted credit score, and upserts the
+resulting offers, so a retried or duplicated task never double-processes.
 """
 import logging
+import uuid
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from app.models.financing import LoanApplication, FinancingOffer
-from app.models.transaction import Transaction
-from app.services.analytics_engine import AnalyticsEngine
-import asyncio
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.financing import BusinessMetrics, LoanApplication, FinancingOffer
+from app.services.credit_score import CreditScoreService
+from app.services.loan_pricing import price_grid
 
 logger = logging.getLogger(__name__)
 
+PLATFORM_LENDER = "Platform Capital"
+
+
 class FinancingService:
     """Service for processing financing applications and generating offers"""
     
-    def __init__(self):
-        self.analytics_engine = AnalyticsEngine()
-    
-    async def process_application(self, db: Session, application_id: str):
-        """Process a financing application and generate offers"""
-        try:
-            application = db.query(LoanApplication).filter(
-                LoanApplication.id == application_id
-            ).first()
-            
-            if not application:
-                logger.error(f"Application {application_id} not found")
-                return
-            
-            # Update status
-            application.status = "processing"
-            db.commit()
-            
-            # Calculate credit score and risk assessment
-            risk_score = await self._calculate_risk_score(db, application)
-            
-            # Generate loan offers based on risk
-            offers = self._generate_loan_offers(application, risk_score)
-            
-            # Save offers to database
-            for offer_data in offers:
-                offer = FinancingOffer(
-                    user_id=application.user_id,
-                    application_id=application.id,
-                    **offer_data
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def submit_application(
+        self,
+        user_id: Any,
+        application_data: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+    ) -> tuple:
+        """
+        Persist a loan application. Returns (application, created); a repeated
+        idempotency key returns the original application with created=False.
+        """
+        user_id = user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id))
+        values = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "idempotency_key": idempotency_key,
+            "requested_amount": application_data["requested_amount"],
+            "purpose": application_data["purpose"],
+            "business_revenue": application_data.get("business_revenue"),
+            "time_in_business": application_data.get("time_in_business"),
+            "application_data": application_data,
+            "status": "submitted",
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        }
+        stmt = pg_insert(LoanApplication).values(**values)
+        if idempotency_key:
+            stmt = stmt.on_conflict_do_nothing(constraint="uq_loan_applications_user_idempotency_key")
+        created_id = (await self.db.execute(stmt.returning(LoanApplication.id))).scalar()
+        await self.db.commit()
+
+        if created_id is None:
+            existing = (await self.db.execute(
+                select(LoanApplication).where(
+                    LoanApplication.user_id == user_id,
+                    LoanApplication.idempotency_key == idempotency_key,
                 )
-                db.add(offer)
-            
-            # Update application status
-            application.status = "completed"
-            application.risk_score = risk_score
-            db.commit()
-            
-            logger.info(f"Processed application {application_id}, generated {len(offers)} offers")
-            
-        except Exception as e:
-            logger.error(f"Error processing application {application_id}: {str(e)}")
-            # Update application status to failed
-            application = db.query(LoanApplication).filter(
-                LoanApplication.id == application_id
-            ).first()
-            if application:
-                application.status = "failed"
-                db.commit()
-    
-    async def _calculate_risk_score(self, db: Session, application: LoanApplication) -> float:
-        """Calculate risk score based on financial data"""
-        try:
-            # Get user's financial metrics
-            metrics = self.analytics_engine.calculate_revenue_metrics(
-                db, application.user_id, 90
+            )).scalar_one()
+            return existing, False
+        return await self.db.get(LoanApplication, created_id), True
+
+    async def claim_application(self, application_id: str) -> Optional[LoanApplication]:
+        """
+        Atomically move a submitted application (or one whose claim went stale)
+        to under_review. Returns None if another worker owns it or it is done.
+        """
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.LOAN_SCORING_CLAIM_TIMEOUT_SECONDS)
+        claimed_id = (await self.db.execute(
+            update(LoanApplication)
+            .where(
+                LoanApplication.id == application_id,
+                or_(
+                    LoanApplication.status == "submitted",
+                    and_(LoanApplication.status == "under_review", LoanApplication.updated_at < stale_before),
+                ),
             )
-            
-            # Base score calculation
-            score = 500  # Start with neutral score
-            
-            # Revenue consistency (30% weight)
-            if metrics['total_revenue'] > 0:
-                revenue_score = min(metrics['total_revenue'] / 10000 * 100, 200)
-                score += revenue_score * 0.3
-            
-            # Growth rate (25% weight)
-            if metrics['growth_rate'] > 0:
-                growth_score = min(metrics['growth_rate'] * 5, 150)
-                score += growth_score * 0.25
-            
-            # Transaction volume (20% weight)
-            if metrics['transaction_count'] > 0:
-                volume_score = min(metrics['transaction_count'] / 100 * 100, 100)
-                score += volume_score * 0.2
-            
-            # Business age (15% weight)
-            age_score = min(application.time_in_business * 10, 100)
-            score += age_score * 0.15
-            
-            # Application amount vs revenue ratio (10% weight)
-            if metrics['total_revenue'] > 0:
-                ratio = application.amount_requested / (metrics['total_revenue'] * 12)
-                if ratio < 0.1:
-                    score += 50 * 0.1
-                elif ratio < 0.3:
-                    score += 25 * 0.1
-            
-            # Normalize to 300-850 range (like FICO)
-            normalized_score = max(300, min(850, score))
-            
-            return round(normalized_score, 2)
-            
-        except Exception as e:
-            logger.error(f"Error calculating risk score: {str(e)}")
-            return 500.0  # Return neutral score on error
+            .values(status="under_review", updated_at=now)
+            .returning(LoanApplication.id)
+        )).scalar()
+        await self.db.commit()
+        if claimed_id is None:
+            return None
+        return await self.db.get(LoanApplication, claimed_id, populate_existing=True)
+
+    async def release_application(self, application_id: str, failed: bool = False) -> None:
+        """Hand a claimed application back for a retry, or mark it failed for good."""
+        await self.db.rollback()
+        await self.db.execute(
+            update(LoanApplication)
+            .where(LoanApplication.id == application_id, LoanApplication.status == "under_review")
+            .values(status="failed" if failed else "submitted", updated_at=datetime.utcnow())
+        )
+        await self.db.commit()
+
+    async def process_application(self, application_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Score a claimed application and generate its offers. Returns a summary,
+        or None if the application was not claimable (already processed).
+        """
+        application = await self.claim_application(application_id)
+        if application is None:
+            logger.info(f"Application {application_id} already claimed or processed; skipping")
+            return None
+
+        metrics = (await self.db.execute(
+            select(BusinessMetrics)
+            .where(BusinessMetrics.user_id == application.user_id)
+            .order_by(BusinessMetrics.period_start.desc())
+            .limit(1)
+        )).scalars().first()
+        credit = await CreditScoreService(self.db).get_score(str(application.user_id))
+
+        risk_score = self._calculate_risk_score(application, metrics, credit)
+        offers = self._generate_loan_offers(application, risk_score)
+        offer_ids = await self._upsert_offers(application, offers)
+
+        now = datetime.utcnow()
+        application.credit_score = int(risk_score)
+        application.risk_assessment = {
+            "risk_score": risk_score,
+            "credit_score": credit["score"],
+            "credit_factors": credit.get("factors", {}),
+            "metrics_id": metrics.id if metrics else None,
+            "offer_ids": offer_ids,
+        }
+        application.ai_recommendation = (
+            "approve" if risk_score >= 650 else "manual_review" if risk_score >= 500 else "reject"
+        )
+        application.status = "approved" if offers else "rejected"
+        application.offer_id = offer_ids[0] if offer_ids else None
+        application.reviewed_at = now
+        application.updated_at = now
+        await self.db.commit()
+
+        logger.info(f"Processed application {application_id}, generated {len(offers)} offers")
+        return {
+            "application_id": application.id,
+            "user_id": str(application.user_id),
+            "status": application.status,
+            "risk_score": risk_score,
+            "offer_ids": offer_ids,
+        }
+
+    async def _upsert_offers(self, application: LoanApplication, offers: List[Dict[str, Any]]) -> List[str]:
+        """
+        Persist an application's offers on the (application, lender) key:
+        re-processing the same application refreshes their terms, while a new
+        application gets its own rows and leaves earlier applications' offers as they were.
+        """
+        if not offers:
+            return []
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": application.user_id,
+                "application_id": application.id,
+                "offer_type": offer["offer_type"],
+                "amount": offer["amount"],
+                "interest_rate": offer["interest_rate"] / 100.0,  # Percentage to decimal
+                "term_months": offer["term_months"],
+                "status": "pending",
+                "approval_probability": offer["approval_probability"] / 100.0,
+                "requirements": [],
+                "conditions": {"monthly_payment": offer["monthly_payment"]},
+                "lender_name": f"{PLATFORM_LENDER} {offer['offer_type'].replace('_', ' ').title()}",
+                "created_at": now,
+                "expires_at": now + timedelta(days=30),
+            }
+            for offer in offers
+        ]
+        stmt = pg_insert(FinancingOffer).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_financing_offers_application_lender",
+            set_={
+                "amount": stmt.excluded.amount,
+                "interest_rate": stmt.excluded.interest_rate,
+                "term_months": stmt.excluded.term_months,
+                "approval_probability": stmt.excluded.approval_probability,
+                "conditions": stmt.excluded.conditions,
+                "expires_at": stmt.excluded.expires_at,
+            },
+        ).returning(FinancingOffer.id)
+        return list((await self.db.execute(stmt)).scalars())
+
+    def _calculate_risk_score(
+        self,
+        application: LoanApplication,
+        metrics: Optional[BusinessMetrics],
+        credit: Dict[str, Any],
+    ) -> float:
+        """Calculate risk score from the precomputed metrics rollup and the persisted credit score"""
+        # Start from the credit score (300-850) instead of a neutral constant
+        score = float(credit.get("score") or 500)
+        factors = credit.get("factors") or {}
+        monthly_revenue = float(metrics.monthly_revenue) if metrics and metrics.monthly_revenue else 0.0
+        
+        # Business age (up to +30)
+        time_in_business = application.time_in_business or 0
+        score += min(time_in_business, 60) * 0.5
+        
+        # Payment failures in the latest period (up to -50)
+        if metrics and metrics.payment_failure_rate:
+            score -= min(float(metrics.payment_failure_rate), 25) * 2
+        
+        # Transaction volume, 90 days (up to +20)
+        tx_count = factors.get("transaction_count_90d") or 0
+        score += min(tx_count / 100, 1) * 20
+        
+        # Application amount vs annual revenue
+        if monthly_revenue > 0:
+            ratio = float(application.requested_amount) / (monthly_revenue * 12)
+            if ratio < 0.1:
+                score += 25
+            elif ratio < 0.3:
+                score += 10
+            elif ratio > 1:
+                score -= 50
+        else:
+            score -= 25
+        
+        # Normalize to 300-850 range (like FICO)
+        return round(max(300, min(850, score)), 2)
     
     def _generate_loan_offers(self, application: LoanApplication, risk_score: float) -> List[Dict[str, Any]]:
         """Generate loan offers based on risk score"""
         offers = []
+        requested = float(application.requested_amount)
         
         # Define offer tiers based on risk score
         if risk_score >= 700:  # Excellent credit
             offers.extend([
                 {
                     'offer_type': 'term_loan',
-                    'amount': min(application.amount_requested, 250000),
+                    'amount': min(requested, 250000),
                     'interest_rate': 6.5,
                     'term_months': 36,
-                    'monthly_payment': self._calculate_payment(min(application.amount_requested, 250000), 6.5, 36),
+                    'monthly_payment': self._calculate_payment(min(requested, 250000), 6.5, 36),
                     'approval_probability': 95
                 },
                 {
                     'offer_type': 'line_of_credit',
-                    'amount': min(application.amount_requested * 1.5, 100000),
+                    'amount': min(requested * 1.5, 100000),
                     'interest_rate': 8.0,
                     'term_months': 12,
                     'monthly_payment': 0,  # Interest only
@@ -140,28 +264,28 @@ class FinancingService:
             offers.extend([
                 {
                     'offer_type': 'term_loan',
-                    'amount': min(application.amount_requested, 150000),
+                    'amount': min(requested, 150000),
                     'interest_rate': 9.5,
                     'term_months': 24,
-                    'monthly_payment': self._calculate_payment(min(application.amount_requested, 150000), 9.5, 24),
+                    'monthly_payment': self._calculate_payment(min(requested, 150000), 9.5, 24),
                     'approval_probability': 80
                 },
                 {
                     'offer_type': 'merchant_advance',
-                    'amount': min(application.amount_requested, 75000),
+                    'amount': min(requested, 75000),
                     'interest_rate': 12.0,
                     'term_months': 18,
-                    'monthly_payment': self._calculate_payment(min(application.amount_requested, 75000), 12.0, 18),
+                    'monthly_payment': self._calculate_payment(min(requested, 75000), 12.0, 18),
                     'approval_probability': 85
                 }
             ])
         elif risk_score >= 500:  # Fair credit
             offers.append({
                 'offer_type': 'merchant_advance',
-                'amount': min(application.amount_requested, 50000),
+                'amount': min(requested, 50000),
                 'interest_rate': 18.0,
                 'term_months': 12,
-                'monthly_payment': self._calculate_payment(min(application.amount_requested, 50000), 18.0, 12),
+                'monthly_payment': self._calculate_payment(min(requested, 50000), 18.0, 12),
                 'approval_probability': 65
             })
         
@@ -169,9 +293,5 @@ class FinancingService:
     
     def _calculate_payment(self, principal: float, annual_rate: float, months: int) -> float:
         """Calculate monthly payment for loan"""
-        if annual_rate == 0:
-            return principal / months
-        
-        monthly_rate = annual_rate / 100 / 12
-        payment = principal * (monthly_rate * (1 + monthly_rate) ** months) / ((1 + monthly_rate) ** months - 1)
-        return round(payment, 2)
+        grid = price_grid([principal], [months], [annual_rate])
+        return round(float(grid.monthly_payment[0, 0, 0]), 2)
@@ -0,0 +1,172 @@
+# backend/app/services/forecasting.py
+"""
+Revenue forecasts for merchants.
+
+History is aggregated to daily revenue in SQL and laid out as one dense
+(n_merchants, N_LAGS) matrix; merchants are then grouped by the model they
+resolve to in the registry (their own, else the global one), and each group
+is forecast for every horizon with one batched predict. Results are cached in
+Redis per merchant, so the nightly precompute serves /analytics/forecast
+without touching the model.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import Date, String, cast, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.ml.forecasting import N_LAGS, REVENUE_MODEL, DirectForecaster, forecast_points
+from app.ml.registry import GLOBAL_SCOPE, ModelNotFound, ModelRegistry, model_registry, scope_for
+from app.models.transaction import Transaction
+from app.redis_client import RedisClient, redis_client
+from app.services.analytics_engine import INFLOW_TYPES, SUCCESS_STATUSES
+from app.services.fx import FxConversion
+
+logger = logging.getLogger(__name__)
+
+
+def last_complete_day() -> date:
+    return datetime.utcnow().date() - timedelta(days=1)
+
+
+class RevenueForecastService:
+    def __init__(
+        self,
+        db: AsyncSession,
+        registry: ModelRegistry = model_registry,
+        client: RedisClient = redis_client,
+    ):
+        self.db = db
+        self.registry = registry
+        self.client = client
+
+    @staticmethod
+    def _cache_key(user_id: str) -> str:
+        return f"forecast:revenue:{user_id}"
+
+    async def daily_revenue(
+        self,
+        end: date,
+        days: int,
+        user_ids: Optional[Sequence[str]] = None,
+        shard_index: int = 0,
+        shard_count: int = 1,
+    ) -> Tuple[List[str], np.ndarray]:
+        """
+        Successful inflows per merchant per UTC day over the `days` days ending
+        at `end`, in the reporting currency. Returns the merchants and a dense
+        (n, days) matrix, oldest day first. Explicit user_ids are returned in
+        order even without revenue; otherwise merchants with revenue in the window.
+        """
+        start = end - timedelta(days=days - 1)
+        day = cast(func.timezone(literal_column("'UTC'"), Transaction.created_at), Date).label("day")
+        fx = FxConversion()
+        stmt = (
+            fx.join(select(Transaction.user_id, day, func.sum(fx.amount)).select_from(Transaction))
+            .where(
+                Transaction.created_at >= datetime.combine(start, datetime.min.time()),
+                Transaction.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+                Transaction.status.in_(SUCCESS_STATUSES),
+                Transaction.transaction_type.in_(INFLOW_TYPES),
+            )
+            .group_by(Transaction.user_id, day)
+        )
+        if user_ids:
+            stmt = stmt.where(Transaction.user_id.in_([UUID(str(u)) for u in user_ids]))
+        if shard_count > 1:
+            stmt = stmt.where(func.abs(func.hashtext(cast(Transaction.user_id, String))) % shard_count == shard_index)
+        rows = (await self.db.execute(stmt)).all()
+
+        users = [str(u) for u in user_ids] if user_ids else sorted({str(row[0]) for row in rows})
+        index = {u: i for i, u in enumerate(users)}
+        matrix = np.zeros((len(users), days))
+        for user_id, row_day, amount in rows:
+            matrix[index[str(user_id)], (row_day - start).days] = float(amount or 0)
+        return users, matrix
+
+    def _group_by_model(self, user_ids: Sequence[str]) -> Dict[str, List[int]]:
+        """Row indices per resolved scope: the merchant's own model if it has one, else global."""
+        tenant_scopes = set(self.registry.scopes(REVENUE_MODEL))
+        groups: Dict[str, List[int]] = defaultdict(list)
+        for i, user_id in enumerate(user_ids):
+            scope = scope_for(user_id)
+            groups[scope if scope in tenant_scopes else GLOBAL_SCOPE].append(i)
+        return groups
+
+    def predict(
+        self, user_ids: Sequence[str], windows: np.ndarray, origin: date, horizon: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Forecast payload per merchant; one predict call per resolved model."""
+        horizon = horizon or settings.FORECAST_MAX_HORIZON_DAYS
+        generated_at = datetime.utcnow().isoformat()
+        payloads: Dict[str, Dict[str, Any]] = {}
+
+        for scope, rows in self._group_by_model(user_ids).items():
+            tenant_id = user_ids[rows[0]] if scope != GLOBAL_SCOPE else None
+            loaded = self.registry.load(REVENUE_MODEL, tenant_id=tenant_id)
+            forecaster = loaded.model["revenue_model"]
+            if not isinstance(forecaster, DirectForecaster):
+                raise ModelNotFound(f"Model {REVENUE_MODEL}/{scope} is not a multi-horizon forecaster")
+
+            result = forecaster.predict(windows[rows], np.full(len(rows), np.datetime64(origin, "D")), horizon)
+            steps = result.mean.shape[1]
+            for position, row in enumerate(rows):
+                payloads[user_ids[row]] = {
+                    "user_id": user_ids[row],
+                    "origin": origin.isoformat(),
+                    "generated_at": generated_at,
+                    "horizon": steps,
+                    "coverage": forecaster.coverage,
+                    "reporting_currency": settings.FX_REPORTING_CURRENCY,
+                    "model": {"scope": loaded.metadata.scope, "version": loaded.metadata.version},
+                    "points": forecast_points(result, position, origin, steps),
+                }
+        return payloads
+
+    async def _store(self, payloads: Dict[str, Dict[str, Any]]) -> None:
+        await self.client.mset(
+            {self._cache_key(user_id): json.dumps(payload) for user_id, payload in payloads.items()},
+            ex=settings.FORECAST_CACHE_TTL_SECONDS,
+        )
+
+    async def get_forecast(self, user_id: str, horizon: int) -> Dict[str, Any]:
+        """A merchant's forecast: cached if it was made from yesterday's data, otherwise computed now."""
+        user_id = str(user_id)
+        origin = last_complete_day()
+        try:
+            cached = await self.client.get(self._cache_key(user_id))
+        except Exception as e:
+            logger.warning(f"Forecast cache read failed for user {user_id}: {e}")
+            cached = None
+        payload = json.loads(cached) if cached else None
+
+        if not payload or payload["origin"] != origin.isoformat() or payload["horizon"] < horizon:
+            users, windows = await self.daily_revenue(origin, N_LAGS, user_ids=[user_id])
+            # Loading and running the model is blocking CPU work; keep it off the event loop.
+            payload = (await asyncio.to_thread(self.predict, users, windows, origin))[user_id]
+            try:
+                await self._store({user_id: payload})
+            except Exception as e:
+                logger.warning(f"Forecast cache write failed for user {user_id}: {e}")
+
+        horizon = min(horizon, payload["horizon"])
+        return {**payload, "horizon": horizon, "points": payload["points"][:horizon]}
+
+    async def precompute(self, shard_index: int = 0, shard_count: int = 1) -> int:
+        """Forecast every merchant with recent revenue in the shard and cache the results."""
+        origin = last_complete_day()
+        users, windows = await self.daily_revenue(origin, N_LAGS, shard_index=shard_index, shard_count=shard_count)
+        batch_size = max(1, settings.FORECAST_BATCH_SIZE)
+        for offset in range(0, len(users), batch_size):
+            batch = users[offset:offset + batch_size]
+            await self._store(self.predict(batch, windows[offset:offset + batch_size], origin))
+        logger.info(f"Precomputed revenue forecasts for {len(users)} merchants (shard {shard_index}/{shard_count})")
+        return len(users)
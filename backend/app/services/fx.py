@@ -0,0 +1,214 @@
+# backend/app/services/fx.py
+"""
+Currency normalization.
+
+Rates live in `fx_rates` as the value of one unit of a currency in
+settings.FX_BASE_CURRENCY, effective from a date until the currency's next
+row. Two consumers:
+
+* SQL: `FxConversion` joins transactions to the rate in force on their
+  (UTC) date, so aggregates are summed in a reporting currency in the
+  database without pulling rows into Python.
+* Python: `fx_cache` holds the whole (small) rates table as per-currency
+  NumPy arrays and converts arrays of amounts with one searchsorted per
+  currency.
+"""
+
+import csv
+import json
+import logging
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Date, and_, case, cast, exists, func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.fx import FxRate
+from app.models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+# Used until fx_rates has been loaded (ZMW per unit, as the insights context assumed).
+STUB_RATES = {"USD": 27.0, "EUR": 29.0}
+
+
+def fx_ranges():
+    """
+    Rates as validity ranges: currency, valid_from (inclusive), valid_to
+    (exclusive), rate_to_base. The first rate of a currency also covers all
+    earlier dates and the last one is open-ended.
+    """
+    window = {"partition_by": FxRate.currency, "order_by": FxRate.effective_date}
+    previous = func.lag(FxRate.effective_date).over(**window)
+    following = func.lead(FxRate.effective_date).over(**window)
+    return select(
+        FxRate.currency,
+        case((previous.is_(None), cast(literal("-infinity"), Date)), else_=FxRate.effective_date).label("valid_from"),
+        func.coalesce(following, cast(literal("infinity"), Date)).label("valid_to"),
+        FxRate.rate_to_base,
+    ).subquery()
+
+
+class FxConversion:
+    """
+    SQL-side conversion of transaction amounts into a reporting currency.
+
+        fx = FxConversion("USD")
+        stmt = fx.join(select(func.sum(fx.amount)).select_from(Transaction).where(...))
+
+    The reporting currency must have rates (see has_rates), or every amount
+    converts to NULL.
+    """
+
+    def __init__(
+        self,
+        reporting_currency: Optional[str] = None,
+        amount=Transaction.amount,
+        currency=Transaction.currency,
+        occurred_at=Transaction.created_at,
+    ):
+        self.base = settings.FX_BASE_CURRENCY.upper()
+        self.reporting_currency = (reporting_currency or settings.FX_REPORTING_CURRENCY).upper()
+        self._currency = func.upper(func.coalesce(currency, self.base))
+        self._day = cast(func.timezone("UTC", occurred_at), Date)
+        self._src = fx_ranges().alias("fx_src")
+        self._dst = fx_ranges().alias("fx_dst") if self.reporting_currency != self.base else None
+
+        src_rate = case((self._currency == self.base, literal(1)), else_=self._src.c.rate_to_base)
+        self.amount = amount * src_rate
+        if self._dst is not None:
+            self.amount = self.amount / self._dst.c.rate_to_base
+        # Rows in a currency with no rates convert to NULL and drop out of SUMs; count them with this.
+        self.unconverted = and_(self._currency != self.base, self._src.c.rate_to_base.is_(None))
+
+    def join(self, stmt):
+        """Add the rate joins to a select (or ORM query) whose FROM includes the transactions."""
+        stmt = stmt.outerjoin(self._src, and_(
+            self._src.c.currency == self._currency,
+            self._src.c.valid_from <= self._day,
+            self._src.c.valid_to > self._day,
+        ))
+        if self._dst is not None:
+            stmt = stmt.outerjoin(self._dst, and_(
+                self._dst.c.currency == self.reporting_currency,
+                self._dst.c.valid_from <= self._day,
+                self._dst.c.valid_to > self._day,
+            ))
+        return stmt
+
+
+async def has_rates(db: AsyncSession, currency: str) -> bool:
+    """Whether amounts can be converted into `currency` (the base currency always can)."""
+    currency = currency.upper()
+    if currency == settings.FX_BASE_CURRENCY.upper():
+        return True
+    return bool((await db.execute(select(exists().where(FxRate.currency == currency)))).scalar())
+
+
+class FxRateCache:
+    """In-memory copy of fx_rates for vectorized conversion in Python."""
+
+    def __init__(self, ttl_seconds: int = settings.FX_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.base = settings.FX_BASE_CURRENCY.upper()
+        self._tables: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._loaded_at = 0.0
+        self.load_rows([(currency, date(2000, 1, 1), rate) for currency, rate in STUB_RATES.items()])
+        self._loaded_at = 0.0  # Stub rates never count as fresh
+
+    def load_rows(self, rows: Iterable[Tuple[str, date, float]]) -> None:
+        grouped: Dict[str, List[Tuple[date, float]]] = {}
+        for currency, effective_date, rate in rows:
+            grouped.setdefault(currency.upper(), []).append((effective_date, float(rate)))
+        tables = {}
+        for currency, points in grouped.items():
+            points.sort()
+            tables[currency] = (
+                np.array([p[0] for p in points], dtype="datetime64[D]"),
+                np.array([p[1] for p in points], dtype=float),
+            )
+        if tables:
+            self._tables = tables
+        self._loaded_at = time.monotonic()
+
+    async def refresh(self, db: AsyncSession, force: bool = False) -> None:
+        if not force and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return
+        rows = (await db.execute(select(FxRate.currency, FxRate.effective_date, FxRate.rate_to_base))).all()
+        self.load_rows(rows)
+
+    def _rates_to_base(self, currency: str, days: np.ndarray) -> np.ndarray:
+        if currency == self.base:
+            return np.ones(days.shape)
+        table = self._tables.get(currency)
+        if table is None:
+            return np.full(days.shape, np.nan)
+        effective, rates = table
+        index = np.searchsorted(effective, days, side="right") - 1
+        return rates[np.clip(index, 0, len(rates) - 1)]
+
+    def convert(
+        self,
+        amounts: Sequence[float],
+        currencies: Sequence[Optional[str]],
+        dates: Sequence[Any],
+        to: Optional[str] = None,
+    ) -> np.ndarray:
+        """Convert amounts into `to` (default reporting currency); unknown currencies give NaN."""
+        to = (to or settings.FX_REPORTING_CURRENCY).upper()
+        amounts = np.asarray(amounts, dtype=float)
+        currencies = np.array([(c or self.base).upper() for c in currencies])
+        days = np.array([d.date() if isinstance(d, datetime) else d for d in dates], dtype="datetime64[D]")
+
+        src = np.empty(amounts.shape)
+        for currency in np.unique(currencies):
+            mask = currencies == currency
+            src[mask] = self._rates_to_base(str(currency), days[mask])
+        return amounts * src / self._rates_to_base(to, days)
+
+    def convert_one(self, amount: float, currency: Optional[str], on: Any, to: Optional[str] = None) -> float:
+        return float(self.convert([amount], [currency], [on], to)[0])
+
+
+def read_rates_file(path: str) -> List[Dict[str, Any]]:
+    """
+    Rates from a local CSV (currency,effective_date,rate_to_base) or JSON
+    list of objects with the same keys.
+    """
+    source = Path(path)
+    if source.suffix.lower() == ".json":
+        records = json.loads(source.read_text())
+    else:
+        with source.open(newline="") as handle:
+            records = list(csv.DictReader(handle))
+    return [
+        {
+            "currency": str(r["currency"]).strip().upper(),
+            "effective_date": date.fromisoformat(str(r["effective_date"]).strip()[:10]),
+            "rate_to_base": float(r["rate_to_base"]),
+        }
+        for r in records
+    ]
+
+
+async def upsert_rates(db: AsyncSession, rates: List[Dict[str, Any]], source: str = "file") -> int:
+    if not rates:
+        return 0
+    stmt = pg_insert(FxRate).values([{**r, "source": source, "created_at": datetime.utcnow()} for r in rates])
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_fx_rates_currency_effective_date",
+        set_={"rate_to_base": stmt.excluded.rate_to_base, "source": stmt.excluded.source},
+    )
+    await db.execute(stmt)
+    await db.commit()
+    await fx_cache.refresh(db, force=True)
+    logger.info("Loaded %s FX rates from %s", len(rates), source)
+    return len(rates)
+
+
+fx_cache = FxRateCache()
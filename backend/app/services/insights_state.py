@@ -0,0 +1,176 @@
+# backend/app/services/insights_state.py
+"""
+Redis state behind the insights routes: per-user rate limits, tracking of
+queued insight tasks, generation history and the usage log.
+
+Rate-limit counting is one scripted round trip (INCR plus the window's
+EXPIRE). Task records are written with a single pipeline. Usage entries are
+buffered in-process and flushed in bulk to an hourly list
+(insights:usage_log:YYYYMMDDHH): once INSIGHTS_USAGE_FLUSH_SIZE entries are
+waiting, or INSIGHTS_USAGE_FLUSH_SECONDS after the first one, whichever
+comes first. A flush is one RPUSH per hour bucket plus its EXPIRE, pipelined.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.redis_client import RATE_LIMIT_SCRIPT, RedisClient, redis_client
+
+logger = logging.getLogger(__name__)
+
+# Entries held while Redis is unreachable, as a multiple of the flush size.
+_MAX_BUFFERED_FLUSHES = 10
+
+
+@dataclass
+class TrackedTask:
+    """A queued insight generation and the user who requested it."""
+
+    celery_task_id: str
+    user_id: str
+
+
+class InsightsState:
+    def __init__(
+        self,
+        client: RedisClient = redis_client,
+        rate_limit: int = settings.INSIGHTS_RATE_LIMIT,
+        rate_window_seconds: int = settings.INSIGHTS_RATE_LIMIT_WINDOW_SECONDS,
+        task_ttl_seconds: int = settings.INSIGHTS_TASK_TTL_SECONDS,
+        usage_flush_size: int = settings.INSIGHTS_USAGE_FLUSH_SIZE,
+        usage_flush_seconds: float = settings.INSIGHTS_USAGE_FLUSH_SECONDS,
+        usage_ttl_seconds: int = settings.INSIGHTS_USAGE_LOG_TTL_SECONDS,
+    ):
+        self.client = client
+        self.rate_limit = rate_limit
+        self.rate_window_seconds = rate_window_seconds
+        self.task_ttl_seconds = task_ttl_seconds
+        self.usage_flush_size = max(1, usage_flush_size)
+        self.usage_flush_seconds = usage_flush_seconds
+        self.usage_ttl_seconds = usage_ttl_seconds
+        self._count_request = client.register_script(RATE_LIMIT_SCRIPT)
+        self._usage: List[Dict[str, Any]] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _rate_key(user_id: Any) -> str:
+        return f"insights:rate_limit:{user_id}"
+
+    @staticmethod
+    def _task_key(task_id: str) -> str:
+        return f"insights:task:{task_id}"
+
+    @staticmethod
+    def _history_key(user_id: Any) -> str:
+        return f"insights:history:{user_id}"
+
+    @staticmethod
+    def _usage_key(moment: datetime) -> str:
+        return f"insights:usage_log:{moment:%Y%m%d%H}"
+
+    # --- Rate limiting ---
+    async def count_request(self, user_id: Any) -> int:
+        """
+        Count a generation request against the user's window; returns the count
+        so far, including this one. Callers reject it when the count exceeds rate_limit.
+        """
+        return int(await self._count_request([self._rate_key(user_id)], [self.rate_window_seconds]))
+
+    # --- Task tracking ---
+    async def track_task(self, task_id: str, celery_task_id: str, user_id: Any) -> None:
+        key = self._task_key(task_id)
+        await self.client.pipelined(lambda pipe: (
+            pipe.hset(key, mapping={"celery_task_id": celery_task_id, "user_id": str(user_id)}),
+            pipe.expire(key, self.task_ttl_seconds),
+        ))
+
+    async def get_task(self, task_id: str) -> Optional[TrackedTask]:
+        record = await self.client.hgetall(self._task_key(task_id))
+        if not record.get("celery_task_id"):
+            return None
+        return TrackedTask(celery_task_id=record["celery_task_id"], user_id=record.get("user_id", ""))
+
+    # --- History ---
+    async def history(self, user_id: Any, offset: int, limit: int) -> List[Dict[str, Any]]:
+        raw = await self.client.lrange(self._history_key(user_id), offset, offset + limit - 1)
+        entries = []
+        for item in raw:
+            try:
+                entries.append(json.loads(item))
+            except (TypeError, ValueError):
+                continue
+        return entries
+
+    # --- Usage log ---
+    def record_usage(self, user_id: Any, focus_area: str, response_length: int) -> None:
+        """Buffer a usage entry; it reaches Redis with the next bulk flush."""
+        if len(self._usage) >= self.usage_flush_size * _MAX_BUFFERED_FLUSHES:
+            logger.warning("Insights usage buffer full, dropping entry for user %s", user_id)
+            return
+        self._usage.append({
+            "user_id": str(user_id),
+            "focus_area": focus_area,
+            "response_length": response_length,
+            "timestamp": datetime.utcnow().isoformat(),
+        })
+        if len(self._usage) >= self.usage_flush_size:
+            self._spawn(self.flush())
+        elif self._timer is None or self._timer.done():
+            self._timer = self._spawn(self._flush_after(self.usage_flush_seconds))
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self.flush()
+
+    def _requeue(self, entries: List[Dict[str, Any]]) -> None:
+        room = self.usage_flush_size * _MAX_BUFFERED_FLUSHES - len(self._usage)
+        if room > 0:
+            self._usage[:0] = entries[-room:]
+
+    async def flush(self) -> int:
+        """Write buffered usage entries; returns how many were written."""
+        entries, self._usage = self._usage, []
+        if not entries:
+            return 0
+        buckets: Dict[str, List[str]] = defaultdict(list)
+        for entry in entries:
+            buckets[self._usage_key(datetime.fromisoformat(entry["timestamp"]))].append(json.dumps(entry))
+
+        def build(pipe):
+            for key, values in buckets.items():
+                pipe.rpush(key, *values)
+                pipe.expire(key, self.usage_ttl_seconds)
+
+        try:
+            await self.client.pipelined(build)
+        except asyncio.CancelledError:
+            self._requeue(entries)
+            raise
+        except Exception as e:
+            logger.warning("Insights usage flush failed, keeping %d entries: %s", len(entries), e)
+            self._requeue(entries)
+            return 0
+        return len(entries)
+
+    async def close(self) -> None:
+        """Stop pending flushes (their entries go back to the buffer) and write it all; call on shutdown."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+
+insights_state = InsightsState()
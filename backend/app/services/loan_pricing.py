@@ -0,0 +1,194 @@
+# backend/app/services/loan_pricing.py
+"""
+Loan pricing engine.
+
+Prices a whole grid of amounts x terms x annual rates in one NumPy pass:
+level monthly payment, full amortization schedules (padded to the longest
+term and masked past each loan's own term), total interest, total cost and
+APR including an upfront origination fee. APR is solved per cell with a
+vectorized Newton iteration on the monthly IRR.
+"""
+
+import calendar
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+MAX_GRID_CELLS = 20000
+APR_MAX_ITERATIONS = 50
+APR_TOLERANCE = 1e-10
+
+
+@dataclass
+class PricingGrid:
+    """Results indexed [amount, term, rate]; schedule arrays add a trailing period axis."""
+    amounts: np.ndarray
+    terms: np.ndarray
+    rates: np.ndarray
+    origination_fee: float
+    monthly_payment: np.ndarray
+    total_interest: np.ndarray
+    total_cost: np.ndarray
+    apr: np.ndarray
+    principal: Optional[np.ndarray] = None
+    interest: Optional[np.ndarray] = None
+    balance: Optional[np.ndarray] = None
+
+    def quotes(self) -> List[Dict[str, Any]]:
+        """Flat list of one quote per grid cell."""
+        a, t, r = np.meshgrid(self.amounts, self.terms, self.rates, indexing="ij")
+        return [
+            {
+                "amount": float(amount),
+                "term_months": int(term),
+                "interest_rate": float(rate),
+                "monthly_payment": round(float(payment), 2),
+                "total_interest": round(float(interest), 2),
+                "total_cost": round(float(cost), 2),
+                "apr": round(float(apr), 4),
+            }
+            for amount, term, rate, payment, interest, cost, apr in zip(
+                a.ravel(), t.ravel(), r.ravel(),
+                self.monthly_payment.ravel(), self.total_interest.ravel(),
+                self.total_cost.ravel(), self.apr.ravel(),
+            )
+        ]
+
+    def schedule(self, amount_index: int, term_index: int, rate_index: int, start_date: date) -> List[Dict[str, Any]]:
+        """Rows for one cell, in the shape of schemas.financing.PaymentSchedule."""
+        if self.balance is None:
+            raise ValueError("Grid was priced without schedules")
+        cell = (amount_index, term_index, rate_index)
+        term = int(self.terms[term_index])
+        payment = self.monthly_payment[cell]
+        return [
+            {
+                "payment_number": k + 1,
+                "due_date": add_months(start_date, k + 1),
+                "principal_amount": round(float(self.principal[cell][k]), 2),
+                "interest_amount": round(float(self.interest[cell][k]), 2),
+                "total_payment": round(float(payment), 2),
+                "remaining_balance": round(max(float(self.balance[cell][k]), 0.0), 2),
+            }
+            for k in range(term)
+        ]
+
+
+def add_months(start: date, months: int) -> date:
+    """Same day `months` later, clamped to the end of shorter months."""
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def monthly_payments(principal: np.ndarray, monthly_rate: np.ndarray, terms: np.ndarray) -> np.ndarray:
+    """Level annuity payment; broadcasts over all three inputs, zero rates included."""
+    growth = np.power(1.0 + monthly_rate, terms)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = principal * monthly_rate * growth / (growth - 1.0)
+    return np.where(monthly_rate == 0, principal / terms, payment)
+
+
+def solve_apr(net_proceeds: np.ndarray, payment: np.ndarray, terms: np.ndarray, guess: np.ndarray) -> np.ndarray:
+    """
+    Annual percentage rate: 12 x the monthly rate i at which the payments'
+    present value equals the proceeds actually received, found by Newton's
+    method on f(i) = payment * (1 - (1 + i)^-n) / i - net_proceeds.
+    """
+    i = np.maximum(np.asarray(guess, dtype=float), 1e-6)
+    for _ in range(APR_MAX_ITERATIONS):
+        discount = np.power(1.0 + i, -terms)
+        annuity = (1.0 - discount) / i
+        f = payment * annuity - net_proceeds
+        d_annuity = (terms * discount / (1.0 + i) - annuity) / i
+        step = f / (payment * d_annuity)
+        i = np.maximum(i - step, 1e-9)
+        if np.all(np.abs(step) < APR_TOLERANCE):
+            break
+    return i * 12 * 100
+
+
+def price_grid(
+    amounts: Sequence[float],
+    terms: Sequence[int],
+    annual_rates: Sequence[float],
+    origination_fee: float = 0.0,
+    include_schedules: bool = False,
+) -> PricingGrid:
+    """
+    Price every combination of amount, term (months) and annual rate (percent).
+    origination_fee is a fraction of the amount withheld at disbursement and
+    only affects APR.
+    """
+    amounts_arr = np.asarray(amounts, dtype=float)
+    terms_arr = np.asarray(terms, dtype=np.int64)
+    rates_arr = np.asarray(annual_rates, dtype=float)
+    if amounts_arr.size * terms_arr.size * rates_arr.size > MAX_GRID_CELLS:
+        raise ValueError(f"Pricing grid exceeds {MAX_GRID_CELLS} cells")
+    if np.any(amounts_arr <= 0) or np.any(terms_arr < 1) or np.any(rates_arr < 0):
+        raise ValueError("Amounts and terms must be positive and rates non-negative")
+    if not 0 <= origination_fee < 1:
+        raise ValueError("origination_fee must be a fraction in [0, 1)")
+
+    principal = amounts_arr[:, None, None]
+    n = terms_arr[None, :, None].astype(float)
+    r = rates_arr[None, None, :] / 100 / 12
+
+    payment = monthly_payments(principal, r, n)
+    total_paid = payment * n
+    total_interest = total_paid - principal
+    total_cost = total_paid + principal * origination_fee
+
+    if origination_fee > 0:
+        apr = solve_apr(principal * (1 - origination_fee), payment, n, np.broadcast_to(r, payment.shape))
+        # A zero-rate loan with a fee still has a cost; with no fee its APR is zero.
+        apr = np.where(np.isfinite(apr), apr, 0.0)
+    else:
+        apr = np.broadcast_to(rates_arr[None, None, :], payment.shape).astype(float)
+
+    grid = PricingGrid(
+        amounts=amounts_arr,
+        terms=terms_arr,
+        rates=rates_arr,
+        origination_fee=origination_fee,
+        monthly_payment=payment,
+        total_interest=total_interest,
+        total_cost=total_cost,
+        apr=apr,
+    )
+    if include_schedules:
+        grid.principal, grid.interest, grid.balance = amortize(principal, r, n, payment, int(terms_arr.max()))
+    return grid
+
+
+def amortize(principal: np.ndarray, monthly_rate: np.ndarray, terms: np.ndarray, payment: np.ndarray, periods: int):
+    """
+    Closed-form schedules for the whole grid: balance after k payments is
+    P(1+r)^k - pmt((1+r)^k - 1)/r. Periods past a loan's term are zeroed.
+    Returns (principal, interest, balance), each shaped grid + (periods,).
+    """
+    k = np.arange(1, periods + 1, dtype=float)
+    P, r, n, pmt = (np.asarray(x, dtype=float)[..., None] for x in (principal, monthly_rate, terms, payment))
+    growth = np.power(1.0 + r, k)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        balance = np.where(r == 0, P - pmt * k, P * growth - pmt * (growth - 1.0) / r)
+    previous = np.concatenate([np.broadcast_to(P, balance.shape[:-1] + (1,)), balance[..., :-1]], axis=-1)
+    interest = previous * r
+    principal_paid = pmt - interest
+
+    active = k <= n
+    return (
+        np.where(active, principal_paid, 0.0),
+        np.where(active, interest, 0.0),
+        np.where(active, np.maximum(balance, 0.0), 0.0),
+    )
+
+
+def payment_schedule(
+    amount: float, annual_rate: float, term_months: int, start_date: Optional[date] = None
+) -> List[Dict[str, Any]]:
+    """Amortization schedule for a single loan."""
+    grid = price_grid([amount], [term_months], [annual_rate], include_schedules=True)
+    return grid.schedule(0, 0, 0, start_date or date.today())
@@ -1,5 +1,7 @@
 import random
 
+from app.services.loan_pricing import price_grid
+
 class LoanProviderService:
     def get_offers(self, credit_score: int, region: str = "DE") -> list:
         """
@@ -54,4 +56,20 @@ class LoanProviderService:
                 "logo_url": "https://ui-avatars.com/api/?name=TechLend&background=00d4ff&color=000"
             })
 
+        for offer in offers:
+            offer["payment_options"] = self._payment_options(offer)
+
         return offers
+
+    @staticmethod
+    def _payment_options(offer: dict) -> list:
+        """Monthly payment and total cost at the maximum amount for each available term."""
+        grid = price_grid([offer["amount_range"]["max"]], offer["term_months"], [offer["interest_rate"]])
+        return [
+            {
+                "term_months": int(term),
+                "monthly_payment": round(float(grid.monthly_payment[0, i, 0]), 2),
+                "total_cost": round(float(grid.total_cost[0, i, 0]), 2),
+            }
+            for i, term in enumerate(grid.terms)
+        ]
@@ -0,0 +1,100 @@
+# backend/app/services/metrics_scheduler.py
+"""
+Debounced business-metrics recomputation.
+
+Writers call `mark_dirty(user_id)` instead of recomputing inline. A mark sets
+a per-user dirty key; the first mark of a burst also takes the per-user
+"scheduled" slot (SET NX) and enqueues one `recompute_business_metrics` task
+with a countdown of the debounce window. Marks arriving while a task is
+scheduled only refresh the dirty key. The task consumes the dirty key,
+recomputes once, frees the slot and, if new marks arrived meanwhile,
+schedules exactly one follow-up.
+"""
+
+import logging
+import time
+from typing import Any, Optional
+
+from app.core.config import settings
+from app.core.instrumentation import track_async
+from app.redis_client import RedisClient, redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsScheduler:
+    def __init__(
+        self,
+        client: RedisClient = redis_client,
+        debounce_seconds: int = settings.METRICS_RECOMPUTE_DEBOUNCE_SECONDS,
+        slot_ttl_seconds: int = settings.METRICS_RECOMPUTE_SLOT_TTL_SECONDS,
+    ):
+        self.client = client
+        self.debounce_seconds = debounce_seconds
+        # The slot expires on its own so a lost task cannot block recomputes forever.
+        self.slot_ttl_seconds = max(slot_ttl_seconds, debounce_seconds * 2)
+
+    @staticmethod
+    def _dirty_key(user_id: str) -> str:
+        return f"metrics:dirty:{user_id}"
+
+    @staticmethod
+    def _full_key(user_id: str) -> str:
+        return f"metrics:dirty:{user_id}:full"
+
+    @staticmethod
+    def _slot_key(user_id: str) -> str:
+        return f"metrics:scheduled:{user_id}"
+
+    async def mark_dirty(self, user_id: Any, full: bool = False) -> bool:
+        """Record that the user's metrics are stale. Returns True if a recompute was enqueued."""
+        user_id = str(user_id)
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.set(self._dirty_key(user_id), time.time(), ex=self.slot_ttl_seconds)
+                if full:
+                    pipe.set(self._full_key(user_id), 1, ex=self.slot_ttl_seconds)
+                async with track_async("redis"):
+                    await pipe.execute()
+            return await self._schedule(user_id)
+        except Exception as e:
+            logger.warning("Failed to mark metrics dirty for user %s: %s", user_id, e)
+            return False
+
+    async def _schedule(self, user_id: str) -> bool:
+        if not await self.client.set(self._slot_key(user_id), time.time(), nx=True, ex=self.slot_ttl_seconds):
+            return False  # A recompute is already pending; it will see this mark.
+        from app.celery_worker import recompute_business_metrics
+        recompute_business_metrics.apply_async(args=[user_id], countdown=self.debounce_seconds)
+        return True
+
+    async def take(self, user_id: str) -> Optional[bool]:
+        """
+        Consume the dirty marker at the start of a recompute. Returns whether a
+        full recompute was requested, or None if there is nothing to do.
+        """
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.get(self._dirty_key(user_id))
+            pipe.get(self._full_key(user_id))
+            pipe.delete(self._dirty_key(user_id), self._full_key(user_id))
+            async with track_async("redis"):
+                dirty, full, _ = await pipe.execute()
+        if dirty is None:
+            return None
+        return full is not None
+
+    async def finish(self, user_id: str) -> bool:
+        """Free the slot; schedule one follow-up if marks arrived during the recompute."""
+        await self.client.delete(self._slot_key(user_id))
+        if await self.client.get(self._dirty_key(user_id)) is None:
+            return False
+        return await self._schedule(user_id)
+
+    async def restore(self, user_id: str, full: bool) -> None:
+        """Put a consumed marker back after a failed recompute so the retry sees it."""
+        await self.client.set(self._dirty_key(user_id), time.time(), ex=self.slot_ttl_seconds)
+        if full:
+            await self.client.set(self._full_key(user_id), 1, ex=self.slot_ttl_seconds)
+
+
+metrics_scheduler = MetricsScheduler()
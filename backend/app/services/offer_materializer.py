@@ -0,0 +1,110 @@
+# backend/app/services/offer_materializer.py
+"""
+Offer materialization.
+
+Raw offers from LoanProviderService are persisted as pending FinancingOffer
+rows with one INSERT ... ON CONFLICT per batch against the
+(user_id, lender_name, status) unique key. The conflict branch is a no-op
+update so RETURNING yields existing rows as well as new ones, and a page load
+costs one statement instead of a lookup per offer.
+"""
+
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.financing import BusinessMetrics, FinancingOffer
+from app.services.loan_provider import LoanProviderService
+
+logger = logging.getLogger(__name__)
+
+OFFER_TTL_DAYS = 30
+
+
+def offer_row(user_id: Any, offer_data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Map a raw provider offer to financing_offers values; max amount and term are the offer limits."""
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "offer_type": "term_loan",
+        "amount": offer_data["amount_range"]["max"],
+        "interest_rate": offer_data["interest_rate"] / 100.0,  # Percentage to decimal
+        "term_months": max(offer_data["term_months"]),
+        "status": "pending",
+        "approval_probability": 0.85,  # Simulated probability
+        "requirements": offer_data["requirements"],
+        "conditions": {"term_options": offer_data["term_months"]},
+        "lender_name": offer_data["provider"],
+        "lender_logo_url": offer_data["logo_url"],
+        "created_at": now,
+        "expires_at": now + timedelta(days=OFFER_TTL_DAYS),
+    }
+
+
+async def materialize_offers(
+    db: AsyncSession,
+    offers_by_user: Mapping[Any, List[Dict[str, Any]]],
+) -> Dict[str, List[FinancingOffer]]:
+    """
+    Upsert raw offers for any number of users and return the persisted rows,
+    existing and new, grouped by user id. The caller commits.
+    """
+    now = datetime.utcnow()
+    rows: Dict[tuple, Dict[str, Any]] = {}
+    for user_id, raw_offers in offers_by_user.items():
+        user_id = user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id))
+        for offer_data in raw_offers:
+            row = offer_row(user_id, offer_data, now)
+            # ON CONFLICT cannot touch the same row twice in one statement.
+            rows[(user_id, row["lender_name"], row["status"])] = row
+
+    persisted: Dict[str, List[FinancingOffer]] = {str(u): [] for u in offers_by_user}
+    values = list(rows.values())
+    batch_size = settings.CREDIT_SCORE_BATCH_SIZE
+    for start in range(0, len(values), batch_size):
+        stmt = pg_insert(FinancingOffer).values(values[start:start + batch_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FinancingOffer.user_id, FinancingOffer.lender_name, FinancingOffer.status],
+            index_where=FinancingOffer.application_id.is_(None),
+            # No-op update: keeps the existing offer as is but makes RETURNING include it.
+            set_={"lender_name": stmt.excluded.lender_name},
+        ).returning(FinancingOffer)
+        result = await db.execute(
+            select(FinancingOffer).from_statement(stmt).execution_options(populate_existing=True)
+        )
+        for offer in result.scalars():
+            persisted[str(offer.user_id)].append(offer)
+    return persisted
+
+
+async def generate_offers(
+    db: AsyncSession,
+    scores_by_user: Mapping[Any, int],
+    provider: LoanProviderService = None,
+) -> Dict[str, List[FinancingOffer]]:
+    """Generate and persist offers for a batch of users from their credit scores."""
+    provider = provider or LoanProviderService()
+    offers = await materialize_offers(
+        db, {user_id: provider.get_offers(score) for user_id, score in scores_by_user.items()}
+    )
+    await db.commit()
+    logger.info("Materialized %s offers for %s users", sum(map(len, offers.values())), len(offers))
+    return offers
+
+
+async def latest_scores(db: AsyncSession, user_ids: Sequence[Any]) -> Dict[str, int]:
+    """Persisted credit score on each user's latest metrics row, for users that have one."""
+    stmt = (
+        select(BusinessMetrics.user_id, BusinessMetrics.credit_score)
+        .where(BusinessMetrics.user_id.in_([uuid.UUID(str(u)) for u in user_ids]))
+        .distinct(BusinessMetrics.user_id)
+        .order_by(BusinessMetrics.user_id, BusinessMetrics.period_start.desc())
+    )
+    rows = (await db.execute(stmt)).all()
+    return {str(user_id): score for user_id, score in rows if score is not None}
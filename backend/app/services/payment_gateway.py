@@ -19,7 +19,7 @@ class ZambiaPaymentGateway:
     }
 
     # MTN MoMo Sandbox Config
-    MOMO_BASE_URL = "https://sandbox.momodeveloper.mtn.com"
+    MOMO_BASE_URL = settings.TELCO_SIMULATOR_URL or "https://sandbox.momodeveloper.mtn.com"
     MOMO_SUBSCRIPTION_KEY = settings.MOMO_SUBSCRIPTION_KEY
     MOMO_API_USER_ID = str(uuid.uuid4()) # For sandbox, we can generate one or use a fixed one
     MOMO_API_KEY = None # Will be generated
@@ -27,7 +27,7 @@ class ZambiaPaymentGateway:
     MOMO_TOKEN_EXPIRY = None
 
     # Airtel Money Sandbox Config
-    AIRTEL_BASE_URL = "https://openapiuat.airtel.africa"
+    AIRTEL_BASE_URL = settings.TELCO_SIMULATOR_URL or "https://openapiuat.airtel.africa"
     AIRTEL_CLIENT_ID = settings.AIRTEL_CLIENT_ID
     AIRTEL_CLIENT_SECRET = settings.AIRTEL_CLIENT_SECRET
     AIRTEL_COUNTRY = "ZM"
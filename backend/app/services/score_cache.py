@@ -0,0 +1,134 @@
+# backend/app/services/score_cache.py
+"""
+Memoized credit scores.
+
+A cached score is keyed by the version of its inputs: the id of the user's
+latest BusinessMetrics row plus a per-user transaction-write generation that
+every transaction write site bumps. Entries live in Redis (shared by all
+workers) with a small in-process LRU in front; both are looked up by the
+versioned key, so an invalidation made by any process is seen by all of them
+without further coordination.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.instrumentation import track_async
+from app.models.financing import BusinessMetrics
+from app.redis_client import RedisClient, redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreVersion(NamedTuple):
+    metrics_id: str
+    tx_generation: int
+    tx_written_at: float  # epoch seconds of the last transaction write, 0 if unknown
+
+    @property
+    def key(self) -> str:
+        return f"{self.metrics_id}:{self.tx_generation}"
+
+
+class ScoreCache:
+    def __init__(
+        self,
+        client: RedisClient = redis_client,
+        ttl_seconds: int = settings.CREDIT_SCORE_CACHE_TTL_SECONDS,
+        local_size: int = settings.CREDIT_SCORE_LOCAL_CACHE_SIZE,
+    ):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.local_size = local_size
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()  # score key -> (expires_at, data)
+
+    @staticmethod
+    def _gen_key(user_id: str) -> str:
+        return f"txgen:{user_id}"
+
+    @staticmethod
+    def _written_key(user_id: str) -> str:
+        return f"txgen:{user_id}:at"
+
+    @staticmethod
+    def _metrics_key(user_id: str) -> str:
+        return f"score:metrics:{user_id}"
+
+    @staticmethod
+    def _score_key(user_id: str, version: ScoreVersion) -> str:
+        return f"score:{user_id}:{version.key}"
+
+    async def version(self, user_id: str, db: AsyncSession) -> Optional[ScoreVersion]:
+        """Current input version; only touches business_metrics if the id isn't cached."""
+        metrics_id, generation, written_at = await self.client.mget(
+            [self._metrics_key(user_id), self._gen_key(user_id), self._written_key(user_id)]
+        )
+
+        if metrics_id is None:
+            metrics_id = (await db.execute(
+                select(BusinessMetrics.id)
+                .where(BusinessMetrics.user_id == user_id)
+                .order_by(BusinessMetrics.period_start.desc())
+                .limit(1)
+            )).scalar()
+            # "none" marks a user without metrics so the lookup isn't repeated.
+            metrics_id = metrics_id or "none"
+            await self.client.set(self._metrics_key(user_id), metrics_id, ex=self.ttl_seconds)
+
+        return ScoreVersion(metrics_id, int(generation or 0), float(written_at or 0))
+
+    async def get(self, user_id: str, version: ScoreVersion) -> Optional[Dict[str, Any]]:
+        key = self._score_key(user_id, version)
+        entry = self._local.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._local.move_to_end(key)
+            return entry[1]
+
+        raw = await self.client.get(key)
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        self._remember(key, data)
+        return data
+
+    async def set(self, user_id: str, version: ScoreVersion, data: Dict[str, Any]) -> None:
+        key = self._score_key(user_id, version)
+        await self.client.set(key, json.dumps(data, default=str), ex=self.ttl_seconds)
+        self._remember(key, data)
+
+    def _remember(self, key: str, data: Dict[str, Any]) -> None:
+        # The local copy never outlives a minute so Redis TTL changes are picked up.
+        self._local[key] = (time.monotonic() + min(self.ttl_seconds, 60), data)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    async def invalidate_transactions(self, user_ids: Iterable[Any]) -> None:
+        """Call after writing transactions: bumps each user's transaction generation."""
+        now = time.time()
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for user_id in {str(u) for u in user_ids}:
+                    pipe.incr(self._gen_key(user_id))
+                    pipe.set(self._written_key(user_id), now)
+                async with track_async("redis"):
+                    await pipe.execute()
+        except Exception as e:
+            logger.warning("Score cache transaction invalidation failed: %s", e)
+
+    async def invalidate_metrics(self, user_id: Any) -> None:
+        """Call after writing business metrics: forgets the cached latest metrics id."""
+        try:
+            await self.client.delete(self._metrics_key(str(user_id)))
+        except Exception as e:
+            logger.warning("Score cache metrics invalidation failed: %s", e)
+
+
+score_cache = ScoreCache()
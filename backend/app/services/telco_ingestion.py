@@ -0,0 +1,296 @@
+# backend/app/services/telco_ingestion.py
+"""
+Telco statement ingestion.
+
+MTN and Airtel return statements in different shapes. Each provider has a
+vectorized parser that turns a page of raw records into a DataFrame with the
+NORMALIZED_COLUMNS below; the engine fetches every statement window of every
+verified wallet of a user concurrently and upserts the normalized rows into
+`transactions`, keyed on (user_id, source, wallet_number, external_id), in
+batches.
+"""
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.clients.airtel_client import AirtelClient
+from app.clients.mtn_client import MTNClient
+from app.core.config import settings
+from app.models.telco import TelcoConnection
+from app.models.transaction import Transaction
+from app.services.anomaly_detector import Observation, anomaly_detector
+from app.services.metrics_scheduler import metrics_scheduler
+from app.services.score_cache import score_cache
+
+logger = logging.getLogger(__name__)
+
+NORMALIZED_COLUMNS = [
+    "external_id", "amount", "currency", "status", "transaction_type", "description", "occurred_at",
+]
+
+MTN_STATUS = {"SUCCESSFUL": "completed", "PENDING": "pending", "FAILED": "failed", "REJECTED": "failed"}
+MTN_TYPE = {"DEPOSIT": "payment", "PAYMENT": "payout", "TRANSFER": "payout", "REFUND": "refund"}
+
+# Airtel status codes: TS success, TF failed, TIP in progress.
+AIRTEL_STATUS = {"TS": "completed", "TF": "failed", "TIP": "pending", "TA": "pending"}
+AIRTEL_TYPE = {"C2B": "payment", "B2B": "payout", "P2P": "transfer", "B2C": "payout"}
+
+
+@dataclass(slots=True)
+class TelcoRecord:
+    """One normalized statement line."""
+    source: str
+    external_id: str
+    amount: float
+    currency: str
+    status: str
+    transaction_type: str
+    description: Optional[str]
+    occurred_at: datetime
+
+
+@dataclass
+class IngestionResult:
+    user_id: str
+    wallets: int = 0
+    windows_fetched: int = 0
+    records_fetched: int = 0
+    records_upserted: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def _col(raw: pd.DataFrame, name: str, default: Any = None) -> pd.Series:
+    """Column `name` of a raw page, or a constant series if the provider omitted it."""
+    if name in raw.columns:
+        return raw[name]
+    return pd.Series(default, index=raw.index, dtype=object)
+
+
+def _finalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Shared cleanup: drop unusable rows and in-page duplicates."""
+    df = df.dropna(subset=["external_id", "amount", "occurred_at"])
+    df = df.drop_duplicates(subset="external_id", keep="last")
+    return df[NORMALIZED_COLUMNS]
+
+
+def parse_mtn(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Normalize MTN MoMo statement records (externalId / amount / date / SUCCESSFUL)."""
+    if not records:
+        return pd.DataFrame(columns=NORMALIZED_COLUMNS)
+    raw = pd.DataFrame.from_records(records)
+    df = pd.DataFrame({
+        "external_id": _col(raw, "externalId"),
+        "amount": pd.to_numeric(_col(raw, "amount"), errors="coerce"),
+        "currency": _col(raw, "currency", "ZMW").fillna("ZMW").astype(str).str.upper(),
+        "status": _col(raw, "status", "").astype(str).str.upper().map(MTN_STATUS).fillna("pending"),
+        "transaction_type": _col(raw, "type", "").astype(str).str.upper().map(MTN_TYPE).fillna("payment"),
+        "description": _col(raw, "payerMessage"),
+        "occurred_at": pd.to_datetime(_col(raw, "date"), errors="coerce", utc=True),
+    })
+    return _finalize(df)
+
+
+def parse_airtel(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Normalize Airtel Money statement records (txn_id / txn_amount / txn_date / TS)."""
+    if not records:
+        return pd.DataFrame(columns=NORMALIZED_COLUMNS)
+    raw = pd.DataFrame.from_records(records)
+    df = pd.DataFrame({
+        "external_id": _col(raw, "txn_id"),
+        "amount": pd.to_numeric(_col(raw, "txn_amount"), errors="coerce"),
+        "currency": _col(raw, "txn_currency", "ZMW").fillna("ZMW").astype(str).str.upper(),
+        "status": _col(raw, "txn_status", "").astype(str).str.upper().map(AIRTEL_STATUS).fillna("pending"),
+        "transaction_type": _col(raw, "txn_type", "").astype(str).str.upper().map(AIRTEL_TYPE).fillna("payment"),
+        "description": _col(raw, "narrative"),
+        "occurred_at": pd.to_datetime(_col(raw, "txn_date"), format="%Y-%m-%d %H:%M:%S", errors="coerce", utc=True),
+    })
+    return _finalize(df)
+
+
+PARSERS: Dict[str, Callable[[List[Dict[str, Any]]], pd.DataFrame]] = {
+    "mtn": parse_mtn,
+    "airtel": parse_airtel,
+}
+
+
+def to_records(df: pd.DataFrame, source: str) -> List[TelcoRecord]:
+    return [
+        TelcoRecord(
+            source=source,
+            external_id=str(row["external_id"]),
+            amount=float(row["amount"]),
+            currency=row["currency"],
+            status=row["status"],
+            transaction_type=row["transaction_type"],
+            description=row["description"] if isinstance(row["description"], str) else None,
+            occurred_at=row["occurred_at"].to_pydatetime(),
+        )
+        for row in df[NORMALIZED_COLUMNS].to_dict("records")
+    ]
+
+
+def statement_windows(start: datetime, end: datetime, window_days: int) -> List[Tuple[datetime, datetime]]:
+    """Split [start, end) into consecutive windows of window_days."""
+    windows = []
+    step = timedelta(days=max(1, window_days))
+    cursor = start
+    while cursor < end:
+        upper = min(cursor + step, end)
+        windows.append((cursor, upper))
+        cursor = upper
+    return windows
+
+
+class TelcoIngestionService:
+    """Imports statement history for all of a user's telco wallets in one parallel pass."""
+
+    def __init__(self, db: AsyncSession, clients: Optional[Dict[str, Any]] = None):
+        self.db = db
+        self.clients = clients or {"mtn": MTNClient(), "airtel": AirtelClient()}
+        self.concurrency = settings.TELCO_FETCH_CONCURRENCY
+        self.window_days = settings.TELCO_STATEMENT_WINDOW_DAYS
+        self.batch_size = settings.TELCO_UPSERT_BATCH_SIZE
+
+    async def ingest_user(
+        self,
+        user_id: str,
+        from_date: Optional[datetime] = None,
+        to_date: Optional[datetime] = None,
+    ) -> IngestionResult:
+        user_id = user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id))
+        to_date = to_date or datetime.utcnow()
+        from_date = from_date or to_date - timedelta(days=settings.TELCO_HISTORY_DAYS)
+        result = IngestionResult(user_id=str(user_id))
+
+        connections = (await self.db.execute(
+            select(TelcoConnection).where(
+                TelcoConnection.user_id == user_id,
+                TelcoConnection.status == "verified",
+            )
+        )).scalars().all()
+        result.wallets = len(connections)
+        if not connections:
+            return result
+
+        windows = statement_windows(from_date, to_date, self.window_days)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        jobs = [
+            self._fetch_window(semaphore, conn, start, end)
+            for conn in connections
+            if conn.provider.lower() in PARSERS
+            for start, end in windows
+        ]
+        pages = await asyncio.gather(*jobs, return_exceptions=True)
+
+        frames: Dict[str, List[pd.DataFrame]] = {}
+        for page in pages:
+            if isinstance(page, Exception):
+                result.errors.append(str(page))
+                continue
+            source, wallet_number, frame = page
+            result.windows_fetched += 1
+            if frame.empty:
+                continue
+            frame = frame.assign(wallet_number=wallet_number)
+            frames.setdefault(source, []).append(frame)
+
+        inserted: List[Observation] = []
+        for source, source_frames in frames.items():
+            # Windows can overlap at their edges; the last copy of a record wins. Both
+            # legs of a transfer between two of the user's wallets are kept.
+            combined = pd.concat(source_frames, ignore_index=True).drop_duplicates(
+                ["wallet_number", "external_id"], keep="last"
+            )
+            result.records_fetched += len(combined)
+            upserted, new = await self._upsert(user_id, source, combined)
+            result.records_upserted += upserted
+            inserted.extend(new)
+
+        await self.db.commit()
+        if result.records_upserted:
+            await score_cache.invalidate_transactions([user_id])
+            await metrics_scheduler.mark_dirty(user_id)
+        # Only first-time inserts are scored; re-fetched records were seen before.
+        await anomaly_detector.observe(self.db, user_id, inserted)
+        logger.info(
+            "Telco ingestion for user %s: %s wallets, %s windows, %s records upserted, %s errors",
+            user_id, result.wallets, result.windows_fetched, result.records_upserted, len(result.errors),
+        )
+        return result
+
+    async def _fetch_window(
+        self, semaphore: asyncio.Semaphore, conn: TelcoConnection, start: datetime, end: datetime
+    ) -> Tuple[str, str, pd.DataFrame]:
+        source = conn.provider.lower()
+        async with semaphore:
+            records = await self.clients[source].fetch_statement(
+                conn.wallet_number, start.isoformat(), end.isoformat()
+            )
+        return source, conn.wallet_number, PARSERS[source](records)
+
+    async def _upsert(self, user_id: str, source: str, df: pd.DataFrame) -> Tuple[int, List[Observation]]:
+        """Upsert the records; returns the row count and the rows that were newly inserted."""
+        now = datetime.utcnow()
+        wallets = df["wallet_number"].tolist()
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "source": rec.source,
+                "wallet_number": wallet,
+                "external_id": rec.external_id,
+                "amount": round(rec.amount, 2),
+                "currency": rec.currency,
+                "status": rec.status,
+                "transaction_type": rec.transaction_type,
+                "description": rec.description,
+                "transaction_metadata": {"provider": source, "wallet_number": wallet},
+                "created_at": rec.occurred_at,
+                "updated_at": now,
+                "processed_at": now,
+            }
+            for rec, wallet in zip(to_records(df, source), wallets)
+        ]
+
+        upserted = 0
+        inserted: List[Observation] = []
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i + self.batch_size]
+            stmt = pg_insert(Transaction).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[
+                    Transaction.user_id, Transaction.source, Transaction.wallet_number, Transaction.external_id
+                ],
+                set_={
+                    "amount": stmt.excluded.amount,
+                    "currency": stmt.excluded.currency,
+                    "status": stmt.excluded.status,
+                    "transaction_type": stmt.excluded.transaction_type,
+                    "description": stmt.excluded.description,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            ).returning(
+                Transaction.id,
+                Transaction.amount,
+                Transaction.currency,
+                Transaction.created_at,
+                Transaction.transaction_type,
+                Transaction.status,
+                literal_column("xmax = 0").label("inserted"),  # False when the conflict branch updated the row
+            )
+            for row in (await self.db.execute(stmt)).all():
+                if row.inserted:
+                    inserted.append(Observation(
+                        str(row.id), float(row.amount), row.currency, row.created_at, row.transaction_type, row.status
+                    ))
+            upserted += len(batch)
+        return upserted, inserted
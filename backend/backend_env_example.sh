@@ -50,6 +50,10 @@ ACCESS_TOKEN_EXPIRE_MINUTES=60
 # SHOPIFY_API_KEY="shpk_..."
 # SHOPIFY_API_SECRET="shpss_..."
 
+# Local MTN/Airtel stand-in (python scripts/telco_simulator.py). When set, telco
+# statement fetches and mobile money payments go to the simulator.
+# TELCO_SIMULATOR_URL="http://localhost:9090"
+
 # QuickBooks API credentials (if integrating with QuickBooks)
 # QUICKBOOKS_CLIENT_ID="your_quickbooks_client_id"
 # QUICKBOOKS_CLIENT_SECRET="your_quickbooks_client_secret"
@@ -68,4 +72,63 @@ OLLAMA_MODEL_NAME="llama3.2"
 
 # --- Logging Settings ---
 # Logging level: DEBUG, INFO, WARNING, ERROR, CRITICAL
-LOG_LEVEL="INFO"
\ No newline at end of file
+LOG_LEVEL="INFO"
+# Fraction of HTTP requests written to the request log (0.0 - 1.0).
+# Requests slower than REQUEST_LOG_SLOW_MS and 5xx responses are always logged.
+REQUEST_LOG_SAMPLE_RATE=0.01
+REQUEST_LOG_SLOW_MS=1000
+
+# Expose request latency histograms at /metrics (Prometheus text format).
+METRICS_ENABLED=true
+
+
+# --- AI Chat Conversation History ---
+# Turns kept verbatim per conversation; older turns are folded into a rolling summary.
+CONVERSATION_WINDOW_TURNS=20
+# Conversation history expires after this many seconds without activity.
+CONVERSATION_TTL_SECONDS=604800
+CONVERSATION_SUMMARY_MAX_CHARS=2000
+
+
+# --- Currency Normalization ---
+# fx_rates hold the value of one unit of each currency in FX_BASE_CURRENCY;
+# totals are reported in FX_REPORTING_CURRENCY.
+FX_BASE_CURRENCY="ZMW"
+FX_REPORTING_CURRENCY="ZMW"
+# CSV (currency,effective_date,rate_to_base) loaded by scripts/load_fx_rates.py
+# FX_RATES_FILE="./data/fx_rates.csv"
+
+
+# --- ML Models ---
+# Versioned model artifacts (global and per-merchant) managed by app/ml/registry.py.
+ML_MODEL_SAVE_PATH="./ml_models"
+ML_MODEL_CACHE_SIZE=32
+# Daily training features cached between retrains (app/ml/feature_store.py).
+ML_TRAINING_CACHE_PATH="./ml_cache"
+# Parallel fits during model search (-1 = all cores available to the worker).
+ML_TRAINING_N_JOBS=-1
+
+
+# --- Anomaly Detection ---
+# Transactions are flagged when at least two of their merchant's baselines
+# (all-time, recent, weekday, hour) put the amount beyond this z-score.
+ANOMALY_Z_THRESHOLD=3.5
+ANOMALY_MIN_HISTORY=30
+
+
+# --- Batch Insights ---
+# Risk and trend insights are scored every 15 minutes from a checkpoint.
+INSIGHT_BATCH_SIZE=5000
+INSIGHT_HIGH_RISK_THRESHOLD=0.7
+
+
+# --- Password Hashing ---
+# Raising the cost rehashes each user's password at their next login.
+PASSWORD_BCRYPT_ROUNDS=12
+PASSWORD_HASH_WORKERS=4
+
+
+# --- AI Insights ---
+# Generations per user per hour; usage is logged to hourly Redis lists in bulk.
+INSIGHTS_RATE_LIMIT=20
+INSIGHTS_USAGE_FLUSH_SIZE=200
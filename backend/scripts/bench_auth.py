@@ -0,0 +1,122 @@
+"""
+Per-request authentication overhead, before and after the fast-path verifier.
+
+Times what an authenticated request pays before its handler runs:
+
+    jose + user row      python-jose decode and a SELECT of the User (previous dependencies)
+    principal (cold)     TokenVerifier HMAC check of a token not seen before
+    principal (warm)     TokenVerifier hit in the verified-token LRU
+    principal + user     warm principal plus the lazy User load (get_current_user)
+
+The database rows are only measured with --db, against the configured
+database, for an existing user (--user-id, or the first user found).
+
+Usage:
+    python scripts/bench_auth.py --iterations 20000
+    python scripts/bench_auth.py --db --db-iterations 500
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from jose import jwt
+from sqlalchemy import select
+
+from app.core.auth import (
+    ALGORITHM,
+    SECRET_KEY,
+    TokenVerifier,
+    create_access_token,
+    get_current_principal,
+    token_verifier,
+)
+from app.database import get_session_maker
+from app.models.user import User
+
+
+def summarize(name: str, samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    row = {
+        "name": name,
+        "mean_us": statistics.fmean(samples) * 1e6,
+        "p50_us": samples[len(samples) // 2] * 1e6,
+        "p99_us": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1e6,
+    }
+    print(f"{name:<22} mean {row['mean_us']:>9.1f} us   p50 {row['p50_us']:>9.1f} us   p99 {row['p99_us']:>9.1f} us")
+    return row
+
+
+async def timed(fn: Callable[[int], Awaitable[None]], iterations: int) -> List[float]:
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def bench(iterations: int, db_iterations: int, use_db: bool, user_id: Optional[str]) -> None:
+    session = get_session_maker()() if use_db else None
+    try:
+        if session is not None and user_id is None:
+            user_id = (await session.execute(select(User.id).limit(1))).scalar()
+            if user_id is None:
+                raise SystemExit("No users in the database; pass --user-id")
+        user_id = str(user_id or uuid.uuid4())
+        # Distinct tokens (different iat) so cold runs never hit the cache.
+        tokens = [create_access_token({"sub": user_id, "iat": 1_700_000_000 + i}) for i in range(iterations)]
+        cold = TokenVerifier(cache_size=0)
+
+        async def jose_only(i: int) -> None:
+            jwt.decode(tokens[i], SECRET_KEY, algorithms=[ALGORITHM])
+
+        async def principal_cold(i: int) -> None:
+            cold.decode(tokens[i])
+
+        async def principal_warm(i: int) -> None:
+            await get_current_principal(tokens[0])
+
+        print(f"{iterations} iterations, {ALGORITHM}")
+        summarize("jose decode", await timed(jose_only, iterations))
+        summarize("principal (cold)", await timed(principal_cold, iterations))
+        token_verifier.decode(tokens[0])
+        summarize("principal (warm)", await timed(principal_warm, iterations))
+
+        if session is not None:
+            async def jose_and_user(i: int) -> None:
+                payload = jwt.decode(tokens[i], SECRET_KEY, algorithms=[ALGORITHM])
+                (await session.execute(select(User).where(User.id == payload["sub"]))).scalar_one()
+                session.expunge_all()
+
+            async def principal_and_user(i: int) -> None:
+                principal = await get_current_principal(tokens[0])
+                await principal.load_user(session)
+                session.expunge_all()
+
+            print(f"\n{db_iterations} iterations with the database")
+            summarize("jose + user row", await timed(jose_and_user, db_iterations))
+            summarize("principal + user", await timed(principal_and_user, db_iterations))
+    finally:
+        if session is not None:
+            await session.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--db", action="store_true", help="also time the User lookup against the configured database")
+    parser.add_argument("--db-iterations", type=int, default=500)
+    parser.add_argument("--user-id", help="existing user to load (default: first user in the database)")
+    args = parser.parse_args(argv)
+    asyncio.run(bench(args.iterations, args.db_iterations, args.db, args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+
+from app.core.config import settings
+from app.database import get_session_maker
+from app.services.fx import read_rates_file, upsert_rates
+
+
+async def load_fx_rates(path: str):
+    rates = read_rates_file(path)
+    async with get_session_maker()() as db:
+        count = await upsert_rates(db, rates, source="file")
+    print(f"Loaded {count} FX rates from {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load FX rates (currency,effective_date,rate_to_base) into fx_rates")
+    parser.add_argument("path", nargs="?", default=settings.FX_RATES_FILE, help="CSV or JSON rates file")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("no rates file given and FX_RATES_FILE is not set")
+    asyncio.run(load_fx_rates(args.path))
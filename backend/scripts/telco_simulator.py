@@ -0,0 +1,406 @@
+"""
+Local MTN MoMo / Airtel Money stand-in server for load testing without network.
+
+Serves deterministic, paginated wallet statements of any size (records are
+derived from a hash of seed, wallet and index, so nothing is held in memory),
+OAuth token endpoints, requesttopay/payment status flows with webhook callbacks,
+and injects configurable latency, 429s and timeouts.
+
+Usage:
+    python scripts/telco_simulator.py --port 9090 --records 2000000 --profile flaky
+
+Then point the backend at it with TELCO_SIMULATOR_URL=http://localhost:9090.
+The fault profile can be changed at runtime via PUT /__sim/config.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger("telco_simulator")
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+MTN_TYPES = ("DEPOSIT", "PAYMENT")
+MTN_MESSAGES = ("Payment Received", "Payment Sent")
+AIRTEL_TYPES = ("C2B", "B2B", "P2P")
+
+
+@dataclass
+class SimConfig:
+    seed: int = 42
+    records_per_wallet: int = 100_000
+    span_days: int = 365
+    page_size_max: int = 5000
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    rate_429: float = 0.0
+    rate_timeout: float = 0.0
+    timeout_s: float = 30.0
+    payment_settle_s: float = 2.0
+    payment_failure_rate: float = 0.1
+    airtel_callback_url: Optional[str] = None
+
+
+PROFILES: Dict[str, Dict[str, float]] = {
+    "clean": {"latency_ms": 0, "jitter_ms": 0, "rate_429": 0, "rate_timeout": 0},
+    "realistic": {"latency_ms": 120, "jitter_ms": 80, "rate_429": 0.01, "rate_timeout": 0.002},
+    "flaky": {"latency_ms": 250, "jitter_ms": 250, "rate_429": 0.05, "rate_timeout": 0.02},
+    "degraded": {"latency_ms": 1500, "jitter_ms": 1000, "rate_429": 0.2, "rate_timeout": 0.05},
+}
+
+config = SimConfig()
+# Separate RNG for fault injection so a given request sequence replays identically.
+fault_rng = random.Random(config.seed)
+tokens: Dict[str, float] = {}  # access token -> expiry (epoch seconds)
+api_users: Dict[str, str] = {}  # MTN api user -> api key
+payments: Dict[str, Dict[str, Any]] = {}  # reference -> payment state
+
+app = FastAPI(title="Telco Simulator", docs_url="/__sim/docs")
+
+
+# --- Deterministic statement generation ---
+
+def _digest(*parts: Any) -> bytes:
+    key = ":".join(str(p) for p in parts).encode()
+    return hashlib.blake2b(key, digest_size=16).digest()
+
+
+def _record_fields(provider: str, wallet: str, index: int) -> Dict[str, Any]:
+    """Provider-neutral fields of record `index`; identical for every request."""
+    h = _digest(config.seed, provider, wallet, index)
+    step = config.span_days * 86400 / config.records_per_wallet
+    offset = (index + int.from_bytes(h[0:2], "big") / 65536) * step
+    return {
+        "id": str(uuid.UUID(bytes=h)),
+        "timestamp": EPOCH + timedelta(seconds=offset),
+        "amount": 20 + int.from_bytes(h[2:6], "big") % 4980,
+        "kind": h[6],
+        "failed": h[7] < 8,  # ~3% failures
+    }
+
+
+def _mtn_record(wallet: str, index: int) -> Dict[str, Any]:
+    f = _record_fields("mtn", wallet, index)
+    credit = f["kind"] % 2 == 0
+    return {
+        "externalId": f["id"],
+        "amount": str(f["amount"]),
+        "currency": "ZMW",
+        "payerMessage": MTN_MESSAGES[0 if credit else 1],
+        "payeeNote": "Services",
+        "status": "FAILED" if f["failed"] else "SUCCESSFUL",
+        "date": f["timestamp"].replace(tzinfo=None).isoformat(),
+        "type": MTN_TYPES[0 if credit else 1],
+    }
+
+
+def _airtel_record(wallet: str, index: int) -> Dict[str, Any]:
+    f = _record_fields("airtel", wallet, index)
+    return {
+        "txn_id": f["id"],
+        "txn_amount": f["amount"],
+        "txn_currency": "ZMW",
+        "narrative": "Airtel Money Tx",
+        "txn_status": "TF" if f["failed"] else "TS",
+        "txn_date": f["timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
+        "txn_type": AIRTEL_TYPES[f["kind"] % len(AIRTEL_TYPES)],
+    }
+
+
+def _index_range(from_date: str, to_date: str) -> range:
+    """Record indexes whose slot lies in [from_date, to_date); records are evenly spaced."""
+    def parse(value: str) -> datetime:
+        dt = datetime.fromisoformat(value)
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+    step = config.span_days * 86400 / config.records_per_wallet
+    lo = math.ceil((parse(from_date) - EPOCH).total_seconds() / step)
+    hi = math.ceil((parse(to_date) - EPOCH).total_seconds() / step)
+    return range(max(lo, 0), min(max(hi, 0), config.records_per_wallet))
+
+
+def _statement_page(provider: str, wallet: str, from_date: str, to_date: str, offset: int, limit: int) -> Dict[str, Any]:
+    indexes = _index_range(from_date, to_date)
+    limit = max(1, min(limit, config.page_size_max))
+    page = indexes[offset:offset + limit]
+    build = _mtn_record if provider == "mtn" else _airtel_record
+    next_offset = offset + len(page) if offset + len(page) < len(indexes) else None
+    return {
+        "data": [build(wallet, i) for i in page],
+        "total": len(indexes),
+        "offset": offset,
+        "next_offset": next_offset,
+    }
+
+
+# --- Fault injection ---
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    if request.url.path.startswith("/__sim"):
+        return await call_next(request)
+
+    delay = config.latency_ms + fault_rng.uniform(0, config.jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    roll = fault_rng.random()
+    if roll < config.rate_429:
+        return JSONResponse(
+            status_code=429,
+            content={"code": "429", "message": "Rate limit is exceeded."},
+            headers={"Retry-After": "1"},
+        )
+    if roll < config.rate_429 + config.rate_timeout:
+        await asyncio.sleep(config.timeout_s)
+        return JSONResponse(status_code=504, content={"message": "Gateway timeout"})
+    return await call_next(request)
+
+
+def _issue_token() -> Dict[str, Any]:
+    token = uuid.uuid4().hex
+    tokens[token] = time.time() + 3600
+    return {"access_token": token, "token_type": "access_token", "expires_in": 3600}
+
+
+def _require_token(authorization: Optional[str]):
+    token = (authorization or "").removeprefix("Bearer ").strip()
+    if tokens.get(token, 0) < time.time():
+        raise HTTPException(status_code=401, detail="Access token is missing, invalid or expired")
+
+
+# --- MTN MoMo ---
+
+@app.post("/v1_0/apiuser", status_code=201)
+async def mtn_create_api_user(x_reference_id: str = Header(...)):
+    api_users.setdefault(x_reference_id, "")
+    return None
+
+
+@app.post("/v1_0/apiuser/{user_id}/apikey", status_code=201)
+async def mtn_create_api_key(user_id: str):
+    if user_id not in api_users:
+        raise HTTPException(status_code=404, detail="Api user not found")
+    api_users[user_id] = uuid.uuid4().hex
+    return {"apiKey": api_users[user_id]}
+
+
+@app.post("/collection/token/")
+async def mtn_token():
+    return _issue_token()
+
+
+@app.get("/collection/v1_0/statement/{wallet}")
+async def mtn_statement(
+    wallet: str,
+    fromDate: str = Query(...),
+    toDate: str = Query(...),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1),
+    authorization: Optional[str] = Header(None),
+):
+    _require_token(authorization)
+    return _statement_page("mtn", wallet, fromDate, toDate, offset, limit)
+
+
+@app.post("/collection/v1_0/requesttopay", status_code=202)
+async def mtn_request_to_pay(
+    request: Request,
+    x_reference_id: str = Header(...),
+    x_callback_url: Optional[str] = Header(None),
+    authorization: Optional[str] = Header(None),
+):
+    _require_token(authorization)
+    body = await request.json()
+    _register_payment("mtn", x_reference_id, body.get("amount"), body.get("currency", "ZMW"), x_callback_url, body)
+    return None
+
+
+@app.get("/collection/v1_0/requesttopay/{reference}")
+async def mtn_payment_status(reference: str, authorization: Optional[str] = Header(None)):
+    _require_token(authorization)
+    payment = _payment(reference)
+    return {
+        "amount": payment["amount"],
+        "currency": payment["currency"],
+        "externalId": payment["body"].get("externalId", reference),
+        "payer": payment["body"].get("payer"),
+        "status": {"settled_ok": "SUCCESSFUL", "settled_failed": "FAILED"}.get(payment["state"], "PENDING"),
+    }
+
+
+# --- Airtel Money ---
+
+@app.post("/auth/oauth2/token")
+async def airtel_token():
+    token = _issue_token()
+    return {"access_token": token["access_token"], "expires_in": "3600", "token_type": "bearer"}
+
+
+@app.get("/merchant/v1/statement/{wallet}")
+async def airtel_statement(
+    wallet: str,
+    from_date: str = Query(...),
+    to_date: str = Query(...),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1),
+    authorization: Optional[str] = Header(None),
+):
+    _require_token(authorization)
+    return _statement_page("airtel", wallet, from_date, to_date, offset, limit)
+
+
+@app.post("/merchant/v1/payments/")
+async def airtel_payment(request: Request, authorization: Optional[str] = Header(None)):
+    _require_token(authorization)
+    body = await request.json()
+    txn = body.get("transaction", {})
+    reference = txn.get("id") or uuid.uuid4().hex
+    _register_payment("airtel", reference, txn.get("amount"), txn.get("currency", "ZMW"), config.airtel_callback_url, body)
+    return {
+        "data": {"transaction": {"id": reference, "status": "TIP"}},
+        "status": {"code": "200", "message": "SUCCESS", "result_code": "ESB000010", "success": True},
+    }
+
+
+@app.get("/merchant/v1/payments/{reference}")
+async def airtel_payment_status(reference: str, authorization: Optional[str] = Header(None)):
+    _require_token(authorization)
+    payment = _payment(reference)
+    status = {"settled_ok": "TS", "settled_failed": "TF"}.get(payment["state"], "TIP")
+    return {
+        "data": {"transaction": {"id": reference, "amount": payment["amount"], "status": status}},
+        "status": {"code": "200", "message": "SUCCESS", "success": True},
+    }
+
+
+# --- Payment lifecycle ---
+
+def _register_payment(provider: str, reference: str, amount: Any, currency: str, callback_url: Optional[str], body: Dict[str, Any]):
+    if reference in payments:
+        raise HTTPException(status_code=409, detail="Duplicated reference id")
+    # The outcome depends only on the reference, so reruns settle the same way.
+    failed = _digest(config.seed, "payment", reference)[0] / 256 < config.payment_failure_rate
+    payments[reference] = {
+        "provider": provider,
+        "amount": amount,
+        "currency": currency,
+        "body": body,
+        "state": "pending",
+        "outcome": "settled_failed" if failed else "settled_ok",
+        "settle_at": time.time() + config.payment_settle_s,
+    }
+    asyncio.create_task(_settle(reference, callback_url))
+
+
+def _payment(reference: str) -> Dict[str, Any]:
+    payment = payments.get(reference)
+    if payment is None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    if payment["state"] == "pending" and time.time() >= payment["settle_at"]:
+        payment["state"] = payment["outcome"]
+    return payment
+
+
+async def _settle(reference: str, callback_url: Optional[str]):
+    await asyncio.sleep(config.payment_settle_s)
+    payment = payments[reference]
+    payment["state"] = payment["outcome"]
+    if not callback_url:
+        return
+    if payment["provider"] == "mtn":
+        body = {
+            "financialTransactionId": reference,
+            "externalId": payment["body"].get("externalId", reference),
+            "amount": payment["amount"],
+            "currency": payment["currency"],
+            "status": "SUCCESSFUL" if payment["state"] == "settled_ok" else "FAILED",
+        }
+    else:
+        body = {"transaction": {
+            "id": reference,
+            "status_code": "TS" if payment["state"] == "settled_ok" else "TF",
+            "message": "Transaction processed",
+        }}
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            await client.post(callback_url, json=body)
+    except httpx.HTTPError as e:
+        logger.warning("Callback to %s failed: %s", callback_url, e)
+
+
+# --- Simulator control ---
+
+@app.get("/__sim/config")
+async def get_config():
+    return {**asdict(config), "payments": len(payments), "tokens": len(tokens)}
+
+
+@app.put("/__sim/config")
+async def update_config(changes: Dict[str, Any]):
+    profile = changes.pop("profile", None)
+    if profile:
+        if profile not in PROFILES:
+            raise HTTPException(status_code=400, detail=f"Unknown profile {profile}; choose from {sorted(PROFILES)}")
+        changes = {**PROFILES[profile], **changes}
+    for key, value in changes.items():
+        if not hasattr(config, key):
+            raise HTTPException(status_code=400, detail=f"Unknown setting {key}")
+        setattr(config, key, type(getattr(config, key))(value) if getattr(config, key) is not None else value)
+    if "seed" in changes:
+        fault_rng.seed(config.seed)
+    return asdict(config)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("SIM_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SIM_PORT", "9090")))
+    parser.add_argument("--seed", type=int, default=config.seed)
+    parser.add_argument("--records", type=int, default=config.records_per_wallet, help="statement records per wallet")
+    parser.add_argument("--span-days", type=int, default=config.span_days, help="days covered by each statement from 2024-01-01")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="clean")
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float)
+    parser.add_argument("--rate-429", type=float)
+    parser.add_argument("--rate-timeout", type=float)
+    parser.add_argument("--timeout-s", type=float, default=config.timeout_s)
+    parser.add_argument("--settle-s", type=float, default=config.payment_settle_s)
+    parser.add_argument("--airtel-callback-url", default=os.getenv("SIM_AIRTEL_CALLBACK_URL"))
+    args = parser.parse_args(argv)
+
+    config.seed = args.seed
+    config.records_per_wallet = args.records
+    config.span_days = args.span_days
+    config.timeout_s = args.timeout_s
+    config.payment_settle_s = args.settle_s
+    config.airtel_callback_url = args.airtel_callback_url
+    for key, value in PROFILES[args.profile].items():
+        setattr(config, key, value)
+    for key in ("latency_ms", "jitter_ms", "rate_429", "rate_timeout"):
+        if getattr(args, key) is not None:
+            setattr(config, key, getattr(args, key))
+    fault_rng.seed(config.seed)
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Telco simulator config: %s", asdict(config))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,7 @@ async def force_update():
         analytics = AnalyticsEngine(session, ai_service)
         
         try:
-            metrics = await analytics.update_business_metrics(user_id)
+            metrics = await analytics.update_business_metrics(user_id, full=True)
             print("Successfully updated metrics!")
             print(f"New Monthly Revenue (USD): {metrics.monthly_revenue}")
             print(f"New Cash Flow (USD): {metrics.cash_flow}")